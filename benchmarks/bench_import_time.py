@@ -0,0 +1,95 @@
+# This python file is the import-time regression benchmark: it imports each module (or loads each script
+# without running its main) in a fresh interpreter under -X importtime, reports the total import time,
+# and fails when a heavy library is imported at startup or a module goes over its time budget
+# Run from the repository root with: python -m benchmarks.bench_import_time
+import argparse
+import subprocess
+import sys
+import time
+
+# Libraries that must only be imported on the code path that needs them
+HEAVY_MODULES = ("pandas", "numpy", "matplotlib", "nltk", "pyarrow")
+
+# Modules and scripts to check, with their import time budget in milliseconds
+TARGETS = {
+    "corpus_statistics.py": 150,
+    "inter-transcriber_similarity.py": 150,
+    "csv_inter.py": 150,
+    "file_reader.py": 150,
+    "pipeline.py": 150,
+    "preprocessing": 100,
+    "hit_data": 100,
+    "inter": 100,
+    "levenshtein": 100,
+    "corpus_stats": 100,
+    "zipf": 100,
+    "transcript_cache": 100,
+    "lexicon": 100,
+    "error_rates": 100,
+    "vocabulary": 100,
+    "pruning": 100,
+    "result_sinks": 100,
+    "incremental_state": 100,
+    "worker_agreement": 100,
+    "profiling": 100,
+    "parallel_preprocessing": 100,
+    "corpus_store": 100,
+    "sketches": 100,
+}
+
+
+# This method returns the python code that loads a target: scripts are run without their __main__ block
+def load_code(target):
+    if target.endswith(".py"):
+        return f"import runpy; runpy.run_path({target!r}, run_name='__import_check__')"
+    return f"import {target}"
+
+
+# This method loads a target in a fresh interpreter and returns (milliseconds, top-level packages imported)
+def measure(target):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", load_code(target)],
+                            capture_output=True, text=True)
+    elapsed = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"loading {target} failed:\n{result.stderr}")
+
+    imported = set()
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if line.startswith("import time:") and "|" in line:
+            name = line.rsplit("|", 1)[1].strip()
+            imported.add(name.split(".")[0])
+    return elapsed, imported
+
+
+# This method measures the start-up cost of the interpreter alone, subtracted from every target
+def interpreter_baseline():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-X", "importtime", "-c", "pass"], capture_output=True)
+    return (time.perf_counter() - start) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import time regression benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per target, the fastest counts (default: 3)")
+    args = parser.parse_args()
+
+    baseline = min(interpreter_baseline() for _ in range(args.repeat))
+    failures = []
+    for target, budget in TARGETS.items():
+        runs = [measure(target) for _ in range(args.repeat)]
+        elapsed = min(run[0] for run in runs) - baseline
+        heavy = sorted(set(HEAVY_MODULES) & runs[0][1])
+
+        status = "ok"
+        if heavy:
+            status = "imports " + ", ".join(heavy)
+            failures.append(target)
+        elif elapsed > budget:
+            status = f"over budget ({budget} ms)"
+            failures.append(target)
+        print(f"{target:35s} {elapsed:8.1f} ms  {status}")
+
+    if failures:
+        sys.exit(1)
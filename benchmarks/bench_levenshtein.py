@@ -0,0 +1,92 @@
+# This python file compares the Levenshtein engine against the previous pure-Python
+# implementation and textdistance on the transcript pairs from the Data directory
+# Run from the repository root with: python -m benchmarks.bench_levenshtein
+import argparse
+import glob
+import time
+from collections import defaultdict
+
+import pandas as pd
+
+from levenshtein import levenshtein_distance
+
+try:
+    import textdistance
+except ImportError:
+    textdistance = None
+
+
+# This method is the double loop that inter.levenshtein_distance used before the engine, kept as the baseline
+def baseline_levenshtein_distance(s1, s2):
+    if len(s1) < len(s2):
+        return baseline_levenshtein_distance(s2, s1)
+
+    if len(s2) == 0:
+        return len(s1)
+
+    previous_row = range(len(s2) + 1)
+    for i, c1 in enumerate(s1):
+        current_row = [i + 1]
+        for j, c2 in enumerate(s2):
+            insertions = previous_row[j + 1] + 1
+            deletions = current_row[j] + 1
+            substitutions = previous_row[j] + (c1 != c2)
+            current_row.append(min(insertions, deletions, substitutions))
+        previous_row = current_row
+
+    return previous_row[-1]
+
+
+# This method collects every transcript pair that the similarity scripts compare
+def load_pairs(pattern="Data/*.csv"):
+    audio_url_to_transcripts = defaultdict(list)
+    for csv_file in sorted(glob.glob(pattern)):
+        df = pd.read_csv(csv_file, usecols=["Input.audio_url", "Answer.transcript"], dtype=str, keep_default_na=False)
+        for audio_url, transcript in zip(df["Input.audio_url"], df["Answer.transcript"]):
+            # Same shape of input the scripts compare: lowercased alphanumeric words joined by spaces
+            tokens = [token for token in transcript.lower().split() if token.isalnum()]
+            audio_url_to_transcripts[audio_url].append(' '.join(tokens))
+
+    pairs = []
+    for transcripts in audio_url_to_transcripts.values():
+        for i in range(len(transcripts)):
+            for j in range(i + 1, len(transcripts)):
+                pairs.append((transcripts[i], transcripts[j]))
+    return pairs
+
+
+# This method times one distance function over all pairs and returns the seconds taken and the distances
+def time_distance(distance_function, pairs, repeat=1):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        distances = [distance_function(s1, s2) for s1, s2 in pairs]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, distances
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Levenshtein engine on the Data/ transcript pairs")
+    # The pure-Python baselines take minutes on the full set of long transcripts
+    parser.add_argument("--limit", type=int, default=None, help="only time the first N pairs")
+    args = parser.parse_args()
+
+    pairs = load_pairs()[:args.limit]
+    print(f"Pairs: {len(pairs)}")
+
+    # (name, function, repeats, exact): the slow pure-Python paths are only timed once
+    candidates = [("levenshtein (bit-parallel)", levenshtein_distance, 3, True)]
+    # Cutoff at 10% of the longer transcript, the early exit path
+    candidates.append(("levenshtein (max_distance)",
+                       lambda s1, s2: levenshtein_distance(s1, s2, max(len(s1), len(s2)) // 10), 3, False))
+    if textdistance is not None:
+        candidates.append(("textdistance.levenshtein", textdistance.levenshtein, 1, True))
+    candidates.append(("baseline inter.levenshtein_distance", baseline_levenshtein_distance, 1, True))
+
+    reference_time, reference = time_distance(levenshtein_distance, pairs, repeat=3)
+    for name, distance_function, repeat, exact in candidates:
+        elapsed, distances = time_distance(distance_function, pairs, repeat=repeat)
+        if exact:
+            assert distances == reference, name
+        print(f"{name:40s} {elapsed:9.4f}s  {elapsed / reference_time:7.1f}x", flush=True)
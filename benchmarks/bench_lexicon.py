@@ -0,0 +1,77 @@
+# This python file compares the English-word filter on a set rebuilt from the word list on every run
+# against the prebuilt lexicon index of a Preprocessor: the time to get the lexicon ready and to filter
+# the tokens of the Data transcripts
+# Without the NLTK word list a synthetic one of the same size is used
+# Run from the repository root with: python -m benchmarks.bench_lexicon
+import argparse
+import glob
+import os
+import random
+import string
+import tempfile
+import time
+
+from hit_data import iter_assignments
+from lexicon import LexiconIndex
+from preprocessing import Preprocessor, regex_tokenize
+
+
+# This method returns the NLTK word list, or a synthetic list of about the same size and word lengths,
+# and whether it is the NLTK one
+def word_list(size):
+    try:
+        import resources
+        resources.require("words")
+        from nltk.corpus import words
+        return words.words(), True
+    except LookupError:
+        generator = random.Random(0)
+        return ["".join(generator.choices(string.ascii_lowercase, k=generator.randint(2, 16))) for _ in range(size)], False
+
+
+# This method returns the seconds taken by function() and its result
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="English-word filter: rebuilt set against the prebuilt lexicon index")
+    parser.add_argument("csv_files", nargs="*", help="csv exports to take the transcripts from (default: Data/*.csv)")
+    parser.add_argument("--size", type=int, default=236736, help="size of the synthetic word list (default: 236736)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="transcripts per batch (default: 1000)")
+    args = parser.parse_args()
+
+    csv_files = args.csv_files or sorted(glob.glob("Data/*.csv"))
+    words_ready, (words, from_nltk) = timed(lambda: word_list(args.size))
+    texts = [entry.transcript for entry in iter_assignments(csv_files)]
+    # Add some English words so both filters have work to do
+    texts.append(" ".join(words[::100]))
+    token_lists = [[token.lower() for token in regex_tokenize(text)] for text in texts]
+    num_tokens = sum(len(tokens) for tokens in token_lists)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "english_words.txt")
+        LexiconIndex.from_words(words).save(path)
+
+        # The old way: a set of the whole word list, every token tested on its own
+        set_ready, english_words = timed(lambda: frozenset(words))
+        set_filter, expected = timed(lambda: [[token for token in tokens if token not in english_words]
+                                              for tokens in token_lists])
+
+        # The index: the saved frozenset loaded from disk, filtered a batch at a time as the Preprocessor does
+        index_ready, preprocessor = timed(lambda: Preprocessor(remove_stopwords=False, remove_english=True,
+                                                               tokenizer="regex", lexicon_path=path))
+        batches = [token_lists[start:start + args.batch_size] for start in range(0, len(token_lists), args.batch_size)]
+        filter_index = lambda: [tokens for batch in batches for tokens in preprocessor._remove_english(batch)]
+        index_filter, filtered = timed(filter_index)
+
+    assert filtered == expected, "the lexicon index and the set disagree"
+    print(f"{len(words)} words, {num_tokens} tokens in {len(token_lists)} transcripts")
+    if from_nltk:
+        print(f"word list read by NLTK: {words_ready * 1000:8.1f} ms")
+    else:
+        print("synthetic word list, NLTK's word list was not found")
+    print(f"set:   ready {set_ready * 1000:8.1f} ms + the word list   filter {set_filter * 1000:8.1f} ms")
+    print(f"index: ready {index_ready * 1000:8.1f} ms                   filter {index_filter * 1000:8.1f} ms")
@@ -0,0 +1,142 @@
+# This python file times every stage of the scripts separately on synthetic exports of growing size:
+# ingestion (streaming the csv), preprocessing, corpus statistics, the Zipf fits and the pairwise similarity.
+# The results can be written as JSON, tagged with the commit, to compare runs across commits
+# Run from the repository root with: python -m benchmarks.bench_pipeline --sizes 1k,10k,100k --json bench.json
+# Scaling to 10M rows needs short transcripts to fit in memory, e.g. --sizes 1k,100k,1M,10M --words 20
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+from benchmarks.synthetic_data import write_hit_csv
+from corpus_statistics import least_common_words, most_common_words
+from hit_data import iter_assignments
+from inter import parallel_similarity_matrices
+from preprocessing import Preprocessor, TOKENIZERS
+from vocabulary import EncodedCorpus
+from zipf import fit_zipf
+
+# The stages, in the order they run; each one works on the output of the one before
+STAGES = ("ingestion", "preprocessing", "corpus_statistics", "zipf", "similarity")
+
+_SUFFIXES = {"k": 1000, "m": 1000000}
+
+
+# This method parses a number of rows such as 1000, 10k or 10M
+def parse_size(text):
+    text = text.strip().lower()
+    if text[-1:] in _SUFFIXES:
+        return int(float(text[:-1]) * _SUFFIXES[text[-1]])
+    return int(text)
+
+
+# This method returns the seconds taken by function() and its result
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+# This method runs the stages once on a csv file and returns the seconds of each and what was processed
+def run_stages(csv_file, tokenizer, workers):
+    seconds = {}
+    seconds["ingestion"], assignments = timed(lambda: list(iter_assignments([csv_file])))
+
+    # A new Preprocessor each run, so the token cache starts cold
+    preprocessor = Preprocessor(remove_stopwords=False, tokenizer=tokenizer)
+    seconds["preprocessing"], token_lists = timed(
+        lambda: preprocessor.process_many([entry.transcript for entry in assignments]))
+
+    def corpus_statistics():
+        stats = EncodedCorpus.from_token_lists(token_lists).stats()
+        stats.token_to_type_ratio()
+        most_common_words(stats, num_words=5)
+        least_common_words(stats, num_words=5)
+        return stats
+    seconds["corpus_statistics"], stats = timed(corpus_statistics)
+
+    def zipf():
+        frequencies, num_types = stats.frequency_spectrum()
+        return {method: fit_zipf(frequencies, num_types, method)[0] for method in ("lsq", "mle")}
+    seconds["zipf"], _ = timed(zipf)
+
+    def similarity():
+        groups = {}
+        for entry, tokens in zip(assignments, token_lists):
+            groups.setdefault(entry.audio_url, []).append(" ".join(tokens))
+        return groups, parallel_similarity_matrices(groups, workers)
+    seconds["similarity"], (groups, _) = timed(similarity)
+
+    counts = {"rows": len(assignments), "clips": len(groups), "tokens": stats.size, "types": stats.num_types}
+    return seconds, counts
+
+
+# This method returns the short hash of the checked out commit, or None outside a git checkout
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time every stage of the scripts on synthetic exports")
+    parser.add_argument("--sizes", default="1k,10k,100k",
+                        help="comma separated numbers of rows, with k/M suffixes (default: 1k,10k,100k)")
+    parser.add_argument("--transcribers", type=int, default=3, help="assignments per audio clip (default: 3)")
+    parser.add_argument("--words", type=int, default=100, help="mean words per transcript (default: 100)")
+    parser.add_argument("--vocabulary", type=int, default=20000, help="distinct words (default: 20000)")
+    parser.add_argument("--tokenizer", choices=sorted(TOKENIZERS), default="regex",
+                        help="tokenizer of the preprocessing (default: regex, nltk needs the punkt data)")
+    parser.add_argument("--workers", type=int, default=1, help="processes of the similarity stage (default: 1)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per size, the fastest is kept (default: 1)")
+    parser.add_argument("--data-dir", metavar="DIR",
+                        help="keep the synthetic csv files here and reuse them in later runs (default: a temporary directory)")
+    parser.add_argument("--json", metavar="PATH", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+    import numpy
+    import pandas
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "parameters": {"transcribers": args.transcribers, "words": args.words, "vocabulary": args.vocabulary,
+                       "tokenizer": args.tokenizer, "workers": args.workers, "repeat": args.repeat},
+        "runs": [],
+    }
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        data_dir = args.data_dir or temporary_directory
+        os.makedirs(data_dir, exist_ok=True)
+        print(f"{'rows':>10} " + " ".join(f"{stage:>18}" for stage in STAGES) + f" {'total':>10}")
+        for rows in sizes:
+            csv_file = os.path.join(data_dir, f"synthetic_{rows}_{args.transcribers}x{args.words}w_{args.vocabulary}v.csv")
+            generate_seconds = 0.0
+            if not os.path.exists(csv_file):
+                generate_seconds, _ = timed(lambda: write_hit_csv(csv_file, rows, args.transcribers, args.words,
+                                                                  args.vocabulary))
+
+            best = None
+            for _ in range(args.repeat):
+                seconds, counts = run_stages(csv_file, args.tokenizer, args.workers)
+                best = seconds if best is None else {stage: min(best[stage], seconds[stage]) for stage in STAGES}
+
+            report["runs"].append({**counts, "generate_seconds": generate_seconds, "file_bytes": os.path.getsize(csv_file),
+                                   "seconds": best, "rows_per_second": {stage: rows / max(best[stage], 1e-9)
+                                                                        for stage in STAGES}})
+            print(f"{rows:>10} " + " ".join(f"{best[stage]:>16.3f} s" for stage in STAGES)
+                  + f" {sum(best.values()):>8.3f} s")
+
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump(report, json_file, indent=2)
+        print(f"Results written to {args.json}")
@@ -0,0 +1,61 @@
+# This python file measures the memory of one million assignments stored as Assignment records
+# against the 14-key dictionaries the scripts used to build with DataFrame.iterrows
+# Run from the repository root with: python -m benchmarks.bench_records
+import argparse
+import gc
+import tracemalloc
+
+from hit_data import Assignment
+
+# Shared by both layouts so the transcript text itself is not part of the comparison
+TRANSCRIPT = "molweni nonke aphekhaya sisamkela nani babukeli bethu"
+
+
+# This method builds the row dictionary of the old read_csv_and_store_lines
+def dict_record(i):
+    return {
+        "HITId": str(i // 3),
+        "HITTypeId": "3",
+        "Title": "Project",
+        "CreationTime": "Sat Aug 12 17:23:07 UTC 2023",
+        "MaxAssignments": "3",
+        "AssignmentDurationInSeconds": "86400",
+        "AssignmentId": str(i),
+        "WorkerId": str(i % 500),
+        "AcceptTime": "Sat Aug 12 21:33:28 UTC 2023",
+        "SubmitTime": "Sat Aug 12 23:25:46 UTC 2023",
+        "WorkTimeInSeconds": str(i % 7000),
+        "Input.audio_url": f"https://structured-audio.s3.eu-north-1.amazonaws.com/{i // 3}.mp3",
+        "Answer.transcript": TRANSCRIPT,
+        "Turkle.Username": f"USER{i % 500:03d}",
+    }
+
+
+# This method builds the same assignment as an Assignment record
+def slots_record(i):
+    return Assignment(str(i), str(i % 500), f"https://structured-audio.s3.eu-north-1.amazonaws.com/{i // 3}.mp3",
+                      TRANSCRIPT, f"USER{i % 500:03d}")
+
+
+# This method returns the bytes still allocated after building n records with make_record
+def measure(make_record, n):
+    gc.collect()
+    tracemalloc.start()
+    records = [make_record(i) for i in range(n)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return current
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory per assignment: dict rows against Assignment records")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    dict_bytes = measure(dict_record, args.rows)
+    slots_bytes = measure(slots_record, args.rows)
+    print(f"Rows: {args.rows}")
+    print(f"dict rows:          {dict_bytes / 2**20:8.1f} MiB  {dict_bytes / args.rows:6.0f} bytes/row")
+    print(f"Assignment records: {slots_bytes / 2**20:8.1f} MiB  {slots_bytes / args.rows:6.0f} bytes/row")
+    print(f"Reduction: {dict_bytes / slots_bytes:.1f}x")
@@ -0,0 +1,70 @@
+# This python file checks the approximate corpus statistics (--approximate) against the exact ones on the
+# transcripts in Data: the error of the type count and the TTR against the HyperLogLog standard error, and
+# the most common words and their counts against the Count-Min bound, for a range of sketch sizes
+# Run from the repository root with: python -m benchmarks.check_approximate_stats
+import argparse
+import glob
+import sys
+import time
+
+from corpus_statistics import create_approximate_stats, create_corpus_stats
+from hit_data import iter_assignments
+from preprocessing import Preprocessor, TOKENIZERS
+
+
+# This method returns how many of the top num_words exact words the approximate top num_words also holds,
+# and the largest overcount of their estimated counts
+def compare_most_common(exact, approximate, num_words):
+    exact_top = exact.most_common(num_words)
+    approximate_counts = dict(approximate.most_common(num_words))
+    found = sum(word in approximate_counts for word, _ in exact_top)
+    overcount = max((approximate_counts[word] - count for word, count in exact_top if word in approximate_counts),
+                    default=0)
+    return found, overcount
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Accuracy of the approximate corpus statistics against the exact ones")
+    parser.add_argument("csv_files", nargs="*", help="csv exports to check (default: Data/*.csv)")
+    parser.add_argument("--tokenizer", choices=TOKENIZERS, default="regex", help="tokenizer (default: regex)")
+    parser.add_argument("--precisions", default="11,12,14,16",
+                        help="comma separated HyperLogLog precisions to check (default: 11,12,14,16)")
+    parser.add_argument("--epsilon", type=float, default=1e-4, help="Count-Min epsilon (default: 0.0001)")
+    parser.add_argument("--delta", type=float, default=0.01, help="Count-Min delta (default: 0.01)")
+    parser.add_argument("--top", type=int, default=20, help="most common words compared (default: 20)")
+    parser.add_argument("--max-errors", type=float, default=3.0,
+                        help="fail when the type count is off by more than this many standard errors (default: 3)")
+    args = parser.parse_args()
+
+    csv_files = args.csv_files or sorted(glob.glob("Data/*.csv"))
+    data = list(iter_assignments(csv_files))
+    # The variant of the corpus statistics: without stopwords and English words
+    preprocessor = Preprocessor(remove_stopwords=True, remove_english=True, tokenizer=args.tokenizer)
+
+    start = time.perf_counter()
+    exact = create_corpus_stats(data, preprocessor)
+    exact_time = time.perf_counter() - start
+    print(f"Exact: {exact.size} tokens, {exact.num_types} types, TTR {exact.token_to_type_ratio():.4f} "
+          f"({exact_time:.3f}s)")
+
+    failed = False
+    for precision in (int(precision) for precision in args.precisions.split(",")):
+        start = time.perf_counter()
+        approximate = create_approximate_stats(data, preprocessor, precision=precision, epsilon=args.epsilon,
+                                               delta=args.delta, heavy_hitters=max(1000, args.top))
+        approximate_time = time.perf_counter() - start
+
+        type_error = approximate.num_types / exact.num_types - 1
+        ttr_error = approximate.token_to_type_ratio() / exact.token_to_type_ratio() - 1
+        found, overcount = compare_most_common(exact, approximate, args.top)
+        print(f"Precision {precision}: {approximate.num_types} types ({type_error:+.2%}, standard error "
+              f"{approximate.type_error:.2%}), TTR {ttr_error:+.2%}; top {args.top}: {found} found, largest "
+              f"overcount {overcount} (bound {approximate.count_error:.1f}); sketches "
+              f"{approximate.nbytes / 2**20:.1f} MiB ({approximate_time:.3f}s)")
+
+        if approximate.size != exact.size or overcount > approximate.count_error:
+            failed = True
+        if abs(type_error) > args.max_errors * approximate.type_error:
+            failed = True
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,66 @@
+# This python file checks the regex tokenizer against word_tokenize on the transcripts in Data
+# and compares their throughput. Both sides are compared after the isalnum() filter the scripts apply.
+# The reference is the real word_tokenize, sentence splitting included, so the Punkt models must be installed
+# (see resources.py); the check stops rather than falling back to anything else when they are missing.
+# Run from the repository root with: python -m benchmarks.check_tokenizer
+import argparse
+import difflib
+import glob
+import sys
+import time
+
+from nltk.tokenize import word_tokenize
+
+import resources
+from hit_data import iter_assignments
+from preprocessing import regex_tokenize
+
+
+# This method returns the tokens of word_tokenize that the preprocessing keeps
+def reference_tokenize(text):
+    return [token for token in word_tokenize(text) if token.isalnum()]
+
+
+# This method runs tokenize over every text and returns the seconds taken and the token lists
+def time_tokenizer(tokenize, texts):
+    start = time.perf_counter()
+    tokens = [tokenize(text) for text in texts]
+    return time.perf_counter() - start, tokens
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Conformance and speed of the regex tokenizer against word_tokenize")
+    parser.add_argument("csv_files", nargs="*", help="csv exports to check (default: Data/*.csv)")
+    parser.add_argument("--nltk-data", metavar="DIR",
+                        help=f"local directory with the NLTK data (default: ${resources.DATA_PATH_ENV} or NLTK's own paths)")
+    parser.add_argument("--min-agreement", type=float, default=0.0,
+                        help="fail when fewer than this fraction of reference tokens match (default: report only)")
+    args = parser.parse_args()
+    if args.nltk_data:
+        resources.set_data_path(args.nltk_data)
+    try:
+        resources.require("punkt")
+    except resources.MissingResourceError as error:
+        parser.exit(2, f"{error}\n")
+
+    csv_files = args.csv_files or sorted(glob.glob("Data/*.csv"))
+    texts = [entry.transcript for entry in iter_assignments(csv_files)]
+
+    reference_time, reference = time_tokenizer(reference_tokenize, texts)
+    regex_time, candidate = time_tokenizer(regex_tokenize, texts)
+
+    total = 0
+    matched = 0
+    for text, expected, actual in zip(texts, reference, candidate):
+        total += len(expected)
+        matcher = difflib.SequenceMatcher(None, expected, actual, autojunk=False)
+        matched += sum(block.size for block in matcher.get_matching_blocks())
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag != "equal":
+                print(f"{tag}: word_tokenize {expected[i1:i2]} regex {actual[j1:j2]}")
+
+    agreement = matched / total if total else 1.0
+    print(f"Transcripts: {len(texts)}  tokens: {total}  agreement: {agreement:.4%}")
+    print(f"word_tokenize: {reference_time:.3f}s  regex: {regex_time:.3f}s  speedup: {reference_time / regex_time:.1f}x")
+    if agreement < args.min_agreement:
+        sys.exit(1)
@@ -0,0 +1,99 @@
+# This python file writes synthetic HIT assignment exports with the columns of Data/Structured*.csv, so the
+# benchmarks can run at any size: every audio clip gets a reference transcript of Zipf-distributed words and
+# each of its transcribers writes a noisy copy of it (words substituted or dropped, some punctuation)
+# Run from the repository root with: python -m benchmarks.synthetic_data synthetic.csv --rows 100000
+import argparse
+import csv
+import datetime
+
+# The columns of the exports, in their order
+HEADER = ("HITId", "HITTypeId", "Title", "CreationTime", "MaxAssignments", "AssignmentDurationInSeconds",
+          "AssignmentId", "WorkerId", "AcceptTime", "SubmitTime", "WorkTimeInSeconds", "Input.audio_url",
+          "Answer.transcript", "Turkle.Username")
+
+# Syllables the synthetic words are made of, so the words look like the transcripts' words
+SYLLABLES = ("ba", "be", "bo", "ka", "ke", "ku", "la", "le", "lo", "ma", "me", "mi", "na", "ne", "ni", "nga",
+             "ngu", "pha", "phi", "si", "sa", "tha", "the", "wa", "we", "ya", "ye", "yo", "za", "zi", "ntu", "mbu")
+
+# Rows generated and written at a time
+_CHUNK_ROWS = 10000
+
+# This method returns vocabulary_size distinct words of two to five syllables
+def make_words(vocabulary_size, generator):
+    import numpy as np
+
+    words = {}
+    while len(words) < vocabulary_size:
+        lengths = generator.integers(2, 6, size=vocabulary_size)
+        syllables = generator.integers(0, len(SYLLABLES), size=(vocabulary_size, 5))
+        for length, row in zip(lengths.tolist(), syllables.tolist()):
+            words.setdefault("".join(SYLLABLES[s] for s in row[:length]), None)
+            if len(words) == vocabulary_size:
+                break
+    return np.array(list(words), dtype=object)
+
+# This method writes rows synthetic assignments to path:
+#   transcribers   assignments per audio clip (the last clip may have fewer)
+#   words          mean words per transcript (each transcript has 75% to 125% of it)
+#   vocabulary     number of distinct words, drawn with Zipf exponent zipf_exponent
+#   noise          share of a reference's words each transcriber substitutes; half as many are dropped
+#   workers        size of the worker pool the assignments are spread over
+def write_hit_csv(path, rows, transcribers=3, words=100, vocabulary=20000, zipf_exponent=1.1, noise=0.1,
+                  workers=None, seed=0):
+    import numpy as np
+
+    generator = np.random.default_rng(seed)
+    vocabulary_words = make_words(vocabulary, generator)
+    # Words are drawn by inverting the Zipf distribution's cumulative sum, many at once
+    cumulative = np.cumsum(1.0 / np.arange(1, vocabulary + 1) ** zipf_exponent)
+    cumulative /= cumulative[-1]
+    draw = lambda size: np.minimum(np.searchsorted(cumulative, generator.random(size)), vocabulary - 1)
+    if workers is None:
+        workers = max(transcribers, rows // 50)
+
+    submit_time = datetime.datetime(2023, 8, 12, 23, 25, 46)
+    with open(path, "w", newline="") as csv_file:
+        writer = csv.writer(csv_file, quoting=csv.QUOTE_ALL)
+        writer.writerow(HEADER)
+        # Whole clips per chunk, so the transcribers of a clip share its reference
+        chunk_size = max(_CHUNK_ROWS // transcribers, 1) * transcribers
+        for start in range(0, rows, chunk_size):
+            chunk_rows = range(start, min(start + chunk_size, rows))
+            first_clip = start // transcribers
+            num_clips = (chunk_rows[-1] // transcribers) - first_clip + 1
+            lengths = np.maximum((words * generator.uniform(0.75, 1.25, num_clips)).astype(int), 1)
+            references = np.split(draw(int(lengths.sum())), np.cumsum(lengths)[:-1])
+
+            chunk = []
+            for row in chunk_rows:
+                clip, transcriber = divmod(row, transcribers)
+                ids = references[clip - first_clip].copy()
+                substituted = generator.random(len(ids)) < noise
+                ids[substituted] = draw(int(substituted.sum()))
+                kept = generator.random(len(ids)) >= noise / 2
+                transcript_words = vocabulary_words[ids[kept]]
+                # A full stop every dozen words or so, for the tokenizer to split off
+                stops = np.flatnonzero(generator.random(len(transcript_words)) < 1 / 12)
+                transcript_words[stops] = transcript_words[stops] + "."
+                transcript = " ".join(transcript_words.tolist())
+
+                worker = (clip * transcribers + transcriber * 7919) % workers
+                time = submit_time + datetime.timedelta(seconds=row)
+                chunk.append((clip, 3, "Project", "Sat Aug 12 17:23:07 UTC 2023", transcribers, 86400, row, worker,
+                              "Sat Aug 12 21:33:28 UTC 2023", time.strftime("%a %b %d %H:%M:%S UTC %Y"), 600,
+                              f"https://synthetic-audio.example.com/{clip + 1}.mp3", transcript, f"USER{worker:05d}"))
+            writer.writerows(chunk)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic HIT assignment export")
+    parser.add_argument("path", help="csv file to write")
+    parser.add_argument("--rows", type=int, default=10000, help="number of assignments (default: 10000)")
+    parser.add_argument("--transcribers", type=int, default=3, help="assignments per audio clip (default: 3)")
+    parser.add_argument("--words", type=int, default=100, help="mean words per transcript (default: 100)")
+    parser.add_argument("--vocabulary", type=int, default=20000, help="distinct words (default: 20000)")
+    parser.add_argument("--noise", type=float, default=0.1,
+                        help="share of the words each transcriber gets wrong (default: 0.1)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    write_hit_csv(args.path, args.rows, args.transcribers, args.words, args.vocabulary, noise=args.noise, seed=args.seed)
@@ -1,187 +1,133 @@
 # Author: Mosamat Sabiha Shaikh
 # This code performs takes in transcriptions from csv files, preprocesses them, and performs statistical anaylisis on the corpus
 
-import pandas as pd
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords, words
-from nltk.stem import PorterStemmer
-from collections import defaultdict, Counter
-import matplotlib.pyplot as plt
-import numpy as np
+import argparse
+import profiling
+from corpus_stats import ApproximateCorpusStats, CorpusStats
+from parallel_preprocessing import (DEFAULT_CHUNK_SIZE, parallel_chunk_counts, parallel_corpus_stats,
+                                    parallel_encoded_corpus, parallel_token_lists)
+from preprocessing import Preprocessor
+from transcript_cache import TranscriptCache
+from vocabulary import EncodedCorpus
+from zipf import fit_zipf, plot_zipf
 
-# Download the 'punkt','stopwords' and 'word' resource
-nltk.download('punkt')
-nltk.download('stopwords')
-nltk.download('words')
+# This method returns the Preprocessor of the corpus statistics, unless one is given
+def _corpus_preprocessor(preprocessor, tokenizer):
+    # Lowercase, remove punctuation and stopwords, and filter out English words
+    if preprocessor is None:
+        preprocessor = Preprocessor(remove_stopwords=True, remove_english=True, tokenizer=tokenizer)
+    return preprocessor
 
-# This method combines 2 csv files
-def combine_csv_files(file1, file2, output_file):
-    # Read both CSV files into DataFrames
-    df1 = pd.read_csv(file1)
-    df2 = pd.read_csv(file2)
-    
-    # Combine the DataFrames
-    combined_df = pd.concat([df1, df2], ignore_index=True)
-    
-    # Save the combined DataFrame to a new CSV file
-    combined_df.to_csv(output_file, index=False)
-
-# This method reads in a csv file and extracts relevant information from the file
-def read_csv_and_store_lines(csv_file):
-    data = []
-    
-    # Read the CSV file into a DataFrame
-    df = pd.read_csv(csv_file)
-    
-    # Convert each row of the DataFrame into a dictionary and store in the 'data' list
-    for index, row in df.iterrows():
-        data_item = {
-            "HITId": row["HITId"],
-            "HITTypeId": row["HITTypeId"],
-            "Title": row["Title"],
-            "CreationTime": row["CreationTime"],
-            "MaxAssignments": row["MaxAssignments"],
-            "AssignmentDurationInSeconds": row["AssignmentDurationInSeconds"],
-            "AssignmentId": row["AssignmentId"],
-            "WorkerId": row["WorkerId"],
-            "AcceptTime": row["AcceptTime"],
-            "SubmitTime": row["SubmitTime"],
-            "WorkTimeInSeconds": row["WorkTimeInSeconds"],
-            "Input.audio_url": row["Input.audio_url"],
-            "Answer.transcript": row["Answer.transcript"],
-            "Turkle.Username": row["Turkle.Username"]
-        }
-        data.append(data_item)
-    
-    return data
-
-# This methods performs pre-processing techniques on the corpus
-def preprocess_text(text):
-    # Tokenize the text
-    tokens = word_tokenize(text)
-    
-    # Convert to lowercase
-    tokens = [token.lower() for token in tokens]
-    
-    # Remove punctuation and stopwords
-    stop_words = set(stopwords.words('english')) # This is a problem
-    tokens = [token for token in tokens if token.isalnum() and token not in stop_words]  
-    
-    return tokens
+# This method preprocesses the transcripts of data, one token list per transcript
+# With cache_path, preprocessed transcripts are kept on disk and only new or changed ones are processed
+# With workers > 1, chunks of chunk_size transcripts are preprocessed in a process pool (without a cache)
+def preprocess_transcripts(data, preprocessor=None, tokenizer="nltk", cache_path=None, workers=1,
+                           chunk_size=DEFAULT_CHUNK_SIZE):
+    preprocessor = _corpus_preprocessor(preprocessor, tokenizer)
+    
+    transcripts = (entry.transcript for entry in data)
+    if cache_path is None:
+        if workers > 1:
+            return parallel_token_lists(transcripts, preprocessor, workers, chunk_size)
+        # Lazily, so the transcripts stream through a batch at a time
+        return preprocessor.iter_process(transcripts)
+    with TranscriptCache(cache_path, preprocessor.fingerprint()) as disk_cache:
+        return preprocessor.process_many(transcripts, disk_cache)
 
 # This method builds the corpus
-def create_corpus(data):
+def create_corpus(data, preprocessor=None, tokenizer="nltk", cache_path=None, workers=1, chunk_size=DEFAULT_CHUNK_SIZE):
     corpus = []
-    english_words = set(words.words())  # Set of English words
-    
-    for entry in data:
-        transcript = entry["Answer.transcript"]
-        # Preprocess text
-        preprocessed_transcript = preprocess_text(transcript)
-        
-        # Filter out English words
-        filtered_transcript = [word for word in preprocessed_transcript if word not in english_words]
-        
-        corpus.extend(filtered_transcript)
+    for preprocessed_transcript in preprocess_transcripts(data, preprocessor, tokenizer, cache_path, workers, chunk_size):
+        corpus.extend(preprocessed_transcript)
     return corpus
 
+# This method builds the statistics of the corpus in one pass, without keeping the corpus itself
+# With workers > 1 the workers count their chunks and only the frequency tables are merged
+def create_corpus_stats(data, preprocessor=None, tokenizer="nltk", cache_path=None, workers=1,
+                        chunk_size=DEFAULT_CHUNK_SIZE):
+    if workers > 1 and cache_path is None:
+        return parallel_corpus_stats((entry.transcript for entry in data), _corpus_preprocessor(preprocessor, tokenizer),
+                                     workers, chunk_size)
+    stats = CorpusStats()
+    for preprocessed_transcript in preprocess_transcripts(data, preprocessor, tokenizer, cache_path):
+        stats.update(preprocessed_transcript)
+    return stats
+
+# This method builds approximate statistics of the corpus in fixed memory (see ApproximateCorpusStats), streaming
+# data a transcript at a time; sketch_options are the parameters of ApproximateCorpusStats
+# With workers > 1 the workers count their chunks and the chunk frequency tables are added to the sketches
+@profiling.profiled("corpus_statistics.create_approximate_stats")
+def create_approximate_stats(data, preprocessor=None, tokenizer="nltk", workers=1, chunk_size=DEFAULT_CHUNK_SIZE,
+                             **sketch_options):
+    preprocessor = _corpus_preprocessor(preprocessor, tokenizer)
+    stats = ApproximateCorpusStats(**sketch_options)
+    transcripts = (entry.transcript for entry in data)
+    if workers > 1:
+        for tokens, counts in parallel_chunk_counts(transcripts, preprocessor, workers, chunk_size):
+            stats.update_counts(tokens, counts)
+    else:
+        for preprocessed_transcript in preprocessor.iter_process(transcripts):
+            stats.update(preprocessed_transcript)
+    return stats
+
+# This method builds the corpus as int32 token ids of a shared Vocabulary, one id array per transcript
+# Its stats() are counted with a bincount over the ids
+# With workers > 1 the workers send their chunks back as id arrays, which are mapped onto the vocabulary
+def create_encoded_corpus(data, preprocessor=None, tokenizer="nltk", cache_path=None, vocabulary=None, workers=1,
+                          chunk_size=DEFAULT_CHUNK_SIZE):
+    if workers > 1 and cache_path is None:
+        return parallel_encoded_corpus((entry.transcript for entry in data), _corpus_preprocessor(preprocessor, tokenizer),
+                                       workers, chunk_size, vocabulary)
+    return EncodedCorpus.from_token_lists(preprocess_transcripts(data, preprocessor, tokenizer, cache_path),
+                                          vocabulary)
+
+# The statistics below take either a list of tokens or a CorpusStats (the TTR and the most common words also
+# an ApproximateCorpusStats)
+def _as_stats(tokens):
+    if isinstance(tokens, (CorpusStats, ApproximateCorpusStats)):
+        return tokens
+    return CorpusStats.from_tokens(tokens)
+
 # Calculates the token-to-type ratio for the corpus
 def calculate_token_to_type_ratio(tokens):
-    num_tokens = len(tokens)
-    num_types = len(set(tokens))
     # Calculate the token-to-type ratio (TTR)
-    ttr =  num_tokens / num_types 
+    ttr = _as_stats(tokens).token_to_type_ratio()
     
     return ttr
  
-# Calculates and plots a zipf's law graph for the corpus    
-def calculate_zipfs_law(tokens):   
-    # Frequency calculation
-    word_counts = Counter(tokens)
-     
-    # Sort words by frequency in descending order
-    sorted_words = sorted(word_counts.items(), key=lambda item: item[1], reverse=True)
-    
-    # Extract ranks and frequencies for plotting
-    ranks = np.arange(1, len(sorted_words) + 1)
-    frequencies = [count for word, count in sorted_words]
-    
-    # Log-log plot
-    plt.figure(figsize=(10, 6))
-    plt.loglog(ranks, frequencies, marker='o', linestyle='None')
-    plt.xlabel('Rank')
-    plt.ylabel('Frequency')
-    plt.title("Zipf's Law")
-    plt.grid(True)
-    
-    # Save the plot as an image file (e.g., PNG) 
-    plt.savefig('structured.png')  #  uncomment for structured corpus 
-    #plt.savefig('unstructured.png') # uncomment for unstructured corpus
-    
-    # Close the plot (optional)
-    plt.close()
+# Calculates and plots a zipf's law graph for the corpus and returns the fitted Zipf exponent
+# The plot is decimated to at most max_points points spaced evenly in log space
+# With plot=False only the exponent is calculated: no sort of the vocabulary and no matplotlib
+@profiling.profiled("corpus_statistics.calculate_zipfs_law")
+def calculate_zipfs_law(tokens, plot=True, output_path='structured.png', method="lsq", max_points=1000):   
+    # Frequency spectrum: the distinct frequencies in descending order and how many words have each
+    frequencies, num_types = _as_stats(tokens).frequency_spectrum()
+    
+    # Fit the exponent s of frequency ~ rank^-s
+    fit = fit_zipf(frequencies, num_types, method)
+    
+    # Log-log plot with the fitted line, saved as an image file (e.g., PNG)
+    if plot:
+        plot_zipf(frequencies, num_types, output_path, max_points=max_points, fit=fit)
+    
+    return fit[0]
 
 # Finds the most appeared word in the corpus
 def most_common_words(words, num_words=10):
-    # Count the occurrences of each word
-    word_counts = Counter(words)
-    
     # Get the most common words
-    most_common = word_counts.most_common(num_words)
+    most_common = _as_stats(words).most_common(num_words)
     
     return most_common
 
 # Finds the least appeared word in the corpus
 def least_common_words(words, num_words=10):
-    # Count the occurrences of each word
-    word_counts = Counter(words)
-    
     # Get the least common words by sorting in ascending order of frequencies
-    least_common = word_counts.most_common()[:-num_words-1:-1]
+    least_common = _as_stats(words).least_common(num_words)
     
     return least_common 
 
+# The analysis runs as the corpus statistics stage of pipeline.py; the corpus is chosen with --corpus
 if __name__ == "__main__":
-    # Comment/Uncomment depending on which corpus you want to evaluate
-    csv_file1 = "Data/Structured1.csv"  
-    csv_file2 = "Data/Structured2.csv"
-    #csv_file1 = "Data/Unstructured1.csv"  
-    #csv_file2 = "Data/Unstructured2.csv"
-    csv_file_path = "combined.csv"
-    
-    combine_csv_files(csv_file1, csv_file2, csv_file_path)
-    
-    stored_data = read_csv_and_store_lines(csv_file_path)
-        
-    corpus = create_corpus(stored_data)
-    # print the size of the corpus
-    print("Corpus Size:", len(corpus))  
-    
-    # calculate the TTR
-    token_to_type_ratio = calculate_token_to_type_ratio(corpus)    
-    print(f"Token-to-Type Ratio (TTR): {token_to_type_ratio:.2f}")   
-    
-    # cacluclate Zipf's law 
-    calculate_zipfs_law(corpus)
-    
-    # Find and print the top 5 common words
-    result = most_common_words(corpus, num_words=5)
-    
-    print("Most appeared words")
-    for word, count in result:
-        print(f'{word}: {count}')
-        
-    # Find and print the bottom 5 common words
-    result = least_common_words(corpus, num_words=5)
-    
-    print("Least appeared words")
-    for word, count in result:
-        print(f'{word}: {count}')    
-        
-    # Print the number of unique words in the corpus    
-    print("Number of distinct words:")
-    print(len(set(corpus)))    
-    
-        
+    from pipeline import main
     
+    main(argparse.ArgumentParser(description="Statistical analysis of the transcription corpus"), ["corpus-stats"])
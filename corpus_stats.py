@@ -0,0 +1,216 @@
+# This python file holds the single-pass corpus statistics accumulator
+import heapq
+from collections import Counter
+
+# Frequency table of a corpus that is fed tokens incrementally (per transcript, per shard...).
+# Every statistic is derived from the one table: corpus size, number of types, TTR, Zipf ranks and
+# the most/least common words, so the token list never has to be materialized or counted twice.
+# Partial results of shards are combined with merge()
+class CorpusStats:
+    def __init__(self, counts=None):
+        self.counts = Counter(counts) if counts is not None else Counter()
+
+    # This method builds the statistics of a list (or any iterable) of tokens
+    @classmethod
+    def from_tokens(cls, tokens):
+        stats = cls()
+        stats.update(tokens)
+        return stats
+
+    # This method builds the statistics from an array of counts indexed by the ids of a Vocabulary,
+    # e.g. the bincount of an EncodedCorpus. Words with a count of 0 are left out
+    @classmethod
+    def from_counts(cls, counts, vocabulary):
+        return cls({token: count for token, count in zip(vocabulary.tokens, counts.tolist()) if count})
+
+    # This method adds the tokens of one transcript (or any iterable of tokens)
+    def update(self, tokens):
+        self.counts.update(tokens)
+
+    # This method adds the counts of another CorpusStats, e.g. the result of another shard
+    def merge(self, other):
+        self.counts.update(other.counts)
+        return self
+
+    # Number of tokens in the corpus
+    @property
+    def size(self):
+        return sum(self.counts.values())
+
+    # Number of distinct words (types) in the corpus
+    @property
+    def num_types(self):
+        return len(self.counts)
+
+    # This method calculates the number of tokens per type, as reported by corpus_statistics.py
+    def token_to_type_ratio(self):
+        return self.size / self.num_types
+
+    # This method calculates the number of types per token, the usual type-token ratio
+    def type_token_ratio(self):
+        return self.num_types / self.size
+
+    # This method returns the frequency spectrum: the distinct frequencies in descending order and how
+    # many types have each. It is a bincount of the counts, O(V + max count), with no sort of the vocabulary
+    def frequency_spectrum(self):
+        import numpy as np
+
+        counts = np.fromiter(self.counts.values(), dtype=np.int64, count=len(self.counts))
+        types_per_frequency = np.bincount(counts)
+        frequencies = np.flatnonzero(types_per_frequency)[::-1]
+        return frequencies, types_per_frequency[frequencies]
+
+    # This method returns the Zipf ranks (1..V) and the frequencies in descending order as arrays
+    def rank_frequencies(self):
+        import numpy as np
+
+        frequencies, num_types = self.frequency_spectrum()
+        frequencies = np.repeat(frequencies, num_types)
+        ranks = np.arange(1, len(frequencies) + 1)
+        return ranks, frequencies
+
+    # This method fits Zipf's law to the frequency spectrum and returns the exponent s
+    # (method "lsq": least squares on the log-log ranks, "mle": maximum likelihood, "mandelbrot":
+    # Zipf-Mandelbrot least squares; see zipf.py)
+    def zipf_exponent(self, method="lsq"):
+        from zipf import fit_zipf
+
+        frequencies, num_types = self.frequency_spectrum()
+        return fit_zipf(frequencies, num_types, method)[0]
+
+    # This method returns the num_words most common (word, count) pairs; Counter.most_common already uses a
+    # heap (O(V log k)) and keeps ties in the order the words were first seen
+    def most_common(self, num_words=10):
+        return self.counts.most_common(num_words)
+
+    # This method returns the num_words least common (word, count) pairs, least common first, with a heap.
+    # Ties come out latest seen first, the same order as reversing Counter.most_common()
+    def least_common(self, num_words=10):
+        ranked = heapq.nsmallest(num_words, enumerate(self.counts.items()),
+                                 key=lambda item: (item[1][1], -item[0]))
+        return [word_count for _, word_count in ranked]
+
+# Fixed-memory stand-in for CorpusStats, for corpora whose frequency table does not fit in memory. The
+# corpus size is exact; the number of types comes from a HyperLogLog, and the most common words are the
+# heavy_hitters words with the highest Count-Min estimates, kept as the tokens stream by (see sketches.py).
+# Tokens are gathered in a Counter of at most buffer_size words, so each distinct word of a buffer is hashed
+# once. The least common words and the frequency spectrum (Zipf) need the exact table and are not offered
+class ApproximateCorpusStats:
+    def __init__(self, precision=14, epsilon=1e-4, delta=0.01, heavy_hitters=1000, buffer_size=1 << 16):
+        from sketches import CountMinSketch, HyperLogLog
+
+        self.types = HyperLogLog(precision)
+        self.frequencies = CountMinSketch(epsilon, delta)
+        self.heavy_hitters = heavy_hitters
+        self.buffer_size = buffer_size
+        # The candidate most common words (word -> hash), in the order they were first kept
+        self._candidates = {}
+        self._pending = Counter()
+
+    # This method adds the tokens of one transcript (or any iterable of tokens)
+    def update(self, tokens):
+        self._pending.update(tokens)
+        if len(self._pending) >= self.buffer_size:
+            self._flush()
+
+    # This method adds distinct tokens with an array of their counts, e.g. a chunk counted by a worker
+    def update_counts(self, tokens, counts):
+        import numpy as np
+        from sketches import hash_tokens
+
+        tokens = list(tokens)
+        if tokens:
+            self._add(tokens, hash_tokens(tokens), np.asarray(counts))
+
+    # This method adds the buffered tokens to the sketches
+    def _flush(self):
+        import numpy as np
+        from sketches import hash_tokens
+
+        if self._pending:
+            tokens = list(self._pending)
+            counts = np.fromiter(self._pending.values(), dtype=np.int64, count=len(tokens))
+            self._pending.clear()
+            self._add(tokens, hash_tokens(tokens), counts)
+
+    def _add(self, tokens, hashes, counts):
+        self.types.add_hashes(hashes)
+        self.frequencies.add_hashes(hashes, counts)
+        self._candidates.update(zip(tokens, hashes.tolist()))
+        self._prune()
+
+    # This method keeps the heavy_hitters candidates with the highest estimated counts
+    def _prune(self):
+        import numpy as np
+
+        if len(self._candidates) > self.heavy_hitters:
+            words = list(self._candidates)
+            estimates = self._estimates()
+            kept = np.sort(np.argpartition(-estimates, self.heavy_hitters - 1)[:self.heavy_hitters])
+            self._candidates = {words[i]: self._candidates[words[i]] for i in kept.tolist()}
+
+    # This method returns the estimated counts of the candidates, in their order
+    def _estimates(self):
+        import numpy as np
+
+        hashes = np.fromiter(self._candidates.values(), dtype=np.uint64, count=len(self._candidates))
+        return self.frequencies.estimate_hashes(hashes)
+
+    # This method adds the sketches of another ApproximateCorpusStats with the same parameters
+    def merge(self, other):
+        self._flush()
+        other._flush()
+        self.types.merge(other.types)
+        self.frequencies.merge(other.frequencies)
+        for word, token_hash in other._candidates.items():
+            self._candidates.setdefault(word, token_hash)
+        self._prune()
+        return self
+
+    # Number of tokens in the corpus (exact)
+    @property
+    def size(self):
+        self._flush()
+        return self.frequencies.total
+
+    # Estimated number of distinct words (types) in the corpus
+    @property
+    def num_types(self):
+        self._flush()
+        return round(self.types.estimate())
+
+    # This method calculates the number of tokens per type, as reported by corpus_statistics.py
+    def token_to_type_ratio(self):
+        return self.size / self.num_types
+
+    # This method calculates the number of types per token, the usual type-token ratio
+    def type_token_ratio(self):
+        return self.num_types / self.size
+
+    # This method returns the num_words most common (word, estimated count) pairs, up to heavy_hitters of them
+    # Ties keep the order in which the words were first kept
+    def most_common(self, num_words=10):
+        self._flush()
+        ranked = sorted(zip(range(len(self._candidates)), self._candidates, self._estimates().tolist()),
+                        key=lambda item: (-item[2], item[0]))
+        return [(word, count) for _, word, count in ranked[:num_words]]
+
+    # Relative standard error of num_types and of the TTR
+    @property
+    def type_error(self):
+        return self.types.relative_error
+
+    # Largest overcount of the estimated counts, with probability 1 - count_error_probability
+    @property
+    def count_error(self):
+        self._flush()
+        return self.frequencies.error_bound
+
+    @property
+    def count_error_probability(self):
+        return self.frequencies.delta
+
+    # Size of the sketches in bytes; with the buffer and the candidates, the memory does not grow with the corpus
+    @property
+    def nbytes(self):
+        return self.types.nbytes + self.frequencies.nbytes
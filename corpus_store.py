@@ -0,0 +1,126 @@
+# This python file saves a preprocessed corpus (an EncodedCorpus) as a directory of flat binary files and
+# maps it back with numpy.memmap, so the statistics can be recomputed without reading the csv exports again:
+#   vocabulary.txt  the tokens, one per line, line i holding the token with id i
+#   ids.i4          the token ids of all transcripts back to back, little-endian int32
+#   offsets.i8      where each transcript starts in ids, plus the number of tokens, little-endian int64
+#   meta.json       format version, sizes, and the preprocessing fingerprint and tokenizer the corpus was built with
+# Loading parses no text but the vocabulary; the arrays are paged in from disk as they are read
+import argparse
+import json
+import os
+
+# Bump whenever the layout of the files changes
+FORMAT_VERSION = 1
+
+VOCABULARY_FILE = "vocabulary.txt"
+IDS_FILE = "ids.i4"
+OFFSETS_FILE = "offsets.i8"
+META_FILE = "meta.json"
+
+# Tokens counted at a time: bincount converts its input to int64, so the whole id array is never converted at once
+COUNT_CHUNK_SIZE = 1 << 24
+
+# This method saves an EncodedCorpus to directory; fingerprint and tokenizer record the preprocessing it was
+# built with, so a load can check it against the current one
+def save_corpus(corpus, directory, fingerprint=None, tokenizer=None):
+    os.makedirs(directory, exist_ok=True)
+    tokens = corpus.vocabulary.tokens
+    if any("\n" in token for token in tokens):
+        raise ValueError("Tokens with a line break cannot be stored in the vocabulary file")
+    with open(os.path.join(directory, VOCABULARY_FILE), "w", encoding="utf-8") as vocabulary_file:
+        vocabulary_file.write("".join(token + "\n" for token in tokens))
+    corpus.ids.astype("<i4", copy=False).tofile(os.path.join(directory, IDS_FILE))
+    corpus.offsets.astype("<i8", copy=False).tofile(os.path.join(directory, OFFSETS_FILE))
+
+    # The meta file is written last, so a directory without it holds no complete corpus
+    meta = {"version": FORMAT_VERSION, "num_transcripts": len(corpus), "num_tokens": corpus.num_tokens,
+            "vocabulary_size": len(tokens), "fingerprint": fingerprint, "tokenizer": tokenizer}
+    with open(os.path.join(directory, META_FILE), "w") as meta_file:
+        json.dump(meta, meta_file, indent=2)
+    return meta
+
+# A corpus saved by save_corpus, mapped read-only from its directory. It offers the reading side of
+# EncodedCorpus (ids, offsets, transcripts, tokens, counts, stats); ids and offsets are numpy memmaps
+class MappedCorpus:
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE)) as meta_file:
+            self.meta = json.load(meta_file)
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{directory} holds corpus format version {self.meta.get('version')}, "
+                             f"expected {FORMAT_VERSION}")
+        self.fingerprint = self.meta["fingerprint"]
+        # None for a corpus saved before the tokenizer was recorded
+        self.tokenizer = self.meta.get("tokenizer")
+
+        self.ids = self._map(IDS_FILE, "<i4", self.meta["num_tokens"])
+        self.offsets = self._map(OFFSETS_FILE, "<i8", self.meta["num_transcripts"] + 1)
+        with open(os.path.join(directory, VOCABULARY_FILE), encoding="utf-8") as vocabulary_file:
+            self.tokens_by_id = vocabulary_file.read().split("\n")[:-1]
+        if len(self.tokens_by_id) != self.meta["vocabulary_size"]:
+            raise ValueError(f"{directory}: the vocabulary file does not match {META_FILE}")
+
+    # This method maps one of the arrays; numpy.memmap cannot map an empty file, so an empty array is returned
+    def _map(self, name, dtype, length):
+        import numpy as np
+
+        path = os.path.join(self.directory, name)
+        if os.path.getsize(path) != length * np.dtype(dtype).itemsize:
+            raise ValueError(f"{path} does not hold the {length} items {META_FILE} announces")
+        if length == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=(length,))
+
+    # Number of transcripts
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    # This method returns the ids of transcript i as a view into ids
+    def __getitem__(self, i):
+        return self.ids[self.offsets[i]:self.offsets[i + 1]]
+
+    def __iter__(self):
+        for start, end in zip(self.offsets[:-1].tolist(), self.offsets[1:].tolist()):
+            yield self.ids[start:end]
+
+    # This method returns the tokens of transcript i
+    def tokens(self, i):
+        tokens_by_id = self.tokens_by_id
+        return [tokens_by_id[token_id] for token_id in self[i].tolist()]
+
+    # This method returns the text of transcript i, its tokens joined with spaces
+    def text(self, i):
+        return " ".join(self.tokens(i))
+
+    # Number of tokens in the corpus
+    @property
+    def num_tokens(self):
+        return len(self.ids)
+
+    # This method returns how often each id occurs, as an array indexed by id, counted a chunk at a time
+    def counts(self):
+        import numpy as np
+
+        counts = np.zeros(len(self.tokens_by_id), dtype=np.int64)
+        for start in range(0, len(self.ids), COUNT_CHUNK_SIZE):
+            counts += np.bincount(self.ids[start:start + COUNT_CHUNK_SIZE], minlength=len(counts))
+        return counts
+
+    # This method returns the CorpusStats of the corpus
+    def stats(self):
+        from corpus_stats import CorpusStats
+
+        return CorpusStats({token: count for token, count in zip(self.tokens_by_id, self.counts().tolist()) if count})
+
+# This method maps the corpus saved in directory
+def load_corpus(directory):
+    return MappedCorpus(directory)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show what a saved corpus directory holds")
+    parser.add_argument("directory")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.directory)
+    for name, value in corpus.meta.items():
+        print(f"{name}: {value}")
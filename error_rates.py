@@ -0,0 +1,304 @@
+# This python file calculates word and character error rates (WER/CER) between two transcripts: how many
+# words or characters were substituted, inserted and deleted, and the alignment behind them when it is
+# asked for. One dynamic programming pass over integer ids gives the distance and the operation counts.
+# Each row of the table is computed with NumPy, the insertions along the row with a running minimum.
+# count_edits keeps two rows and carries the counts of the chosen moves along them, in memory linear in
+# the length; align keeps every move in a uint8 table for the backtrace, quadratic, for the alignments
+import profiling
+from levenshtein import levenshtein_distance
+
+# The operations of an alignment, one character per aligned position
+MATCH = "="
+SUBSTITUTION = "S"
+INSERTION = "I"
+DELETION = "D"
+
+_MOVE_CODES = (MATCH, SUBSTITUTION, INSERTION, DELETION)
+_MATCH, _SUBSTITUTION, _INSERTION, _DELETION = range(4)
+
+# The operation counts of a minimum cost alignment of a hypothesis against a reference
+class EditCounts:
+    __slots__ = ("hits", "substitutions", "insertions", "deletions")
+
+    def __init__(self, hits, substitutions, insertions, deletions):
+        self.hits = hits
+        self.substitutions = substitutions
+        self.insertions = insertions
+        self.deletions = deletions
+
+    # The Levenshtein distance: the number of edits
+    @property
+    def distance(self):
+        return self.substitutions + self.insertions + self.deletions
+
+    @property
+    def reference_length(self):
+        return self.hits + self.substitutions + self.deletions
+
+    @property
+    def hypothesis_length(self):
+        return self.hits + self.substitutions + self.insertions
+
+    # This method returns the edits per reference item, the WER or CER
+    # An empty reference counts as one item, so every inserted item is one full error
+    def error_rate(self):
+        return self.distance / max(self.reference_length, 1)
+
+    # This method returns 1 - distance / max(len), the similarity the scripts report
+    def similarity(self):
+        longest = max(self.reference_length, self.hypothesis_length)
+        if longest == 0:
+            return 1.0
+        return 1 - self.distance / longest
+
+    def __repr__(self):
+        return (f"{type(self).__name__}(hits={self.hits}, substitutions={self.substitutions}, "
+                f"insertions={self.insertions}, deletions={self.deletions})")
+
+# The result of aligning a hypothesis against a reference: the counts and the operations behind them
+class Alignment(EditCounts):
+    __slots__ = ("operations",)
+
+    def __init__(self, operations):
+        # One of MATCH, SUBSTITUTION, INSERTION, DELETION per aligned position, in order
+        self.operations = operations
+        super().__init__(operations.count(MATCH), operations.count(SUBSTITUTION), operations.count(INSERTION),
+                         operations.count(DELETION))
+
+    # This method returns (operation, reference index, hypothesis index) for every aligned position
+    # The index on the side that has a gap is None
+    def pairs(self):
+        i = j = 0
+        pairs = []
+        for operation in self.operations:
+            if operation == INSERTION:
+                pairs.append((operation, None, j))
+                j += 1
+            elif operation == DELETION:
+                pairs.append((operation, i, None))
+                i += 1
+            else:
+                pairs.append((operation, i, j))
+                i += 1
+                j += 1
+        return pairs
+
+# This method returns the length of the common prefix of two integer arrays
+def _common_prefix(a, b):
+    import numpy as np
+
+    length = min(len(a), len(b))
+    differences = np.flatnonzero(a[:length] != b[:length])
+    return int(differences[0]) if len(differences) else length
+
+# This method returns the edit operations of a minimum cost alignment of two integer arrays
+def _align_core(reference, hypothesis):
+    import numpy as np
+
+    n = len(reference)
+    m = len(hypothesis)
+    if n == 0 or m == 0:
+        return DELETION * n + INSERTION * m
+
+    profiling.count("alignment_cells", n * m)
+    moves = np.empty((n + 1, m + 1), dtype=np.uint8)
+    moves[0, 1:] = _INSERTION
+    moves[1:, 0] = _DELETION
+
+    columns = np.arange(m + 1, dtype=np.int32)
+    previous = columns.copy()
+    current = np.empty(m + 1, dtype=np.int32)
+    diagonal = np.empty(m, dtype=np.int32)
+    up = np.empty(m, dtype=np.int32)
+    for i in range(1, n + 1):
+        row = moves[i, 1:]
+        # _MATCH is 0 and _SUBSTITUTION is 1, so the comparison is the diagonal move
+        np.not_equal(hypothesis, reference[i - 1], out=row.view(bool))
+        np.add(previous[:-1], row, out=diagonal)
+        np.add(previous[1:], 1, out=up)
+        row[up < diagonal] = _DELETION
+
+        # current[j] = min(best[j], current[j - 1] + 1): subtract the column, take the running minimum
+        # and add the column back
+        current[0] = i
+        np.minimum(diagonal, up, out=current[1:])
+        best = current[1:].copy()
+        current -= columns
+        np.minimum.accumulate(current, out=current)
+        current += columns
+        row[current[1:] < best] = _INSERTION
+        previous, current = current, previous
+
+    # Walk back from the bottom right corner
+    operations = []
+    i = n
+    j = m
+    while i > 0 or j > 0:
+        move = moves[i, j]
+        operations.append(_MOVE_CODES[move])
+        if move == _INSERTION:
+            j -= 1
+        elif move == _DELETION:
+            i -= 1
+        else:
+            i -= 1
+            j -= 1
+    operations.reverse()
+    return "".join(operations)
+
+# This method returns the number of substitutions of the alignment _align_core finds, given the distance
+# (from the bit-parallel engine). Two rows of the table are kept, and only the band of diagonals a path of
+# that cost can reach: a path through (i, j) costs at least |j - i| + |(m - n) - (j - i)|. Every cell on a
+# minimum cost path, and every predecessor tied with it, is inside the band, so the moves chosen there are
+# the ones of the full table. Each cell carries the substitutions of the path its move continues: the
+# diagonal or the cell above, or, for an insertion, the last cell of the row that is not one.
+# Row i is kept as cost - j + i, so the running minimum of the insertions needs no column offsets: the
+# diagonal is then the previous row + the mismatch and the cell above the previous row + 2
+def _count_substitutions(reference, hypothesis, distance):
+    import numpy as np
+
+    n = len(reference)
+    m = len(hypothesis)
+    if n == 0 or m == 0:
+        return 0
+
+    # The diagonals j - i of the band
+    lowest = -((distance - (m - n)) // 2)
+    highest = (distance + (m - n)) // 2
+    # Cells outside the band hold a cost no path reaches and that cannot overflow
+    unreachable = np.int32(2 * (n + m + 1))
+    columns = np.arange(m + 1, dtype=np.int32)
+    previous = np.full(m + 1, unreachable, dtype=np.int32)
+    current = np.full(m + 1, unreachable, dtype=np.int32)
+    previous[:highest + 1] = 0
+    # Substitutions on the path to each cell of the previous and the current row
+    substitutions = np.zeros(m + 1, dtype=np.int32)
+    current_substitutions = np.zeros(m + 1, dtype=np.int32)
+    width = min(m, distance + 1)
+    differs = np.empty(width, dtype=bool)
+    up = np.empty(width, dtype=np.int32)
+    deletion = np.empty(width, dtype=bool)
+    insertion = np.empty(width, dtype=bool)
+    best = np.empty(width, dtype=np.int32)
+    cells = 0
+    for i in range(1, n + 1):
+        start = max(1, i + lowest)
+        end = min(m, i + highest) + 1
+        size = end - start
+        cells += size
+        # This buffer last held row i - 2, whose band started up to two columns to the left
+        current[max(0, start - 3):start] = unreachable
+        # Column 0 costs i
+        current[0] = 2 * i if i + lowest <= 0 else unreachable
+
+        row_differs = np.not_equal(hypothesis[start - 1:end - 1], reference[i - 1], out=differs[:size])
+        row = current[start - 1:end]
+        diagonal = np.add(previous[start - 1:end - 1], row_differs, out=row[1:])
+        row_up = np.add(previous[start:end], 2, out=up[:size])
+        row_deletion = np.less(row_up, diagonal, out=deletion[:size])
+        row_substitutions = current_substitutions[start:end]
+        np.add(substitutions[start - 1:end - 1], row_differs, out=row_substitutions)
+        np.copyto(row_substitutions, substitutions[start:end], where=row_deletion)
+
+        # An insertion continues the cell to its left at the same cost - j + i
+        row_best = np.minimum(diagonal, row_up, out=best[:size])
+        row[1:] = row_best
+        np.minimum.accumulate(row, out=row)
+        row_insertion = np.less(row[1:], row_best, out=insertion[:size])
+        if row_insertion.any():
+            # The last column up to each cell whose move is not an insertion
+            source = np.where(row_insertion, 0, columns[start:end])
+            np.maximum.accumulate(source, out=source)
+            row_substitutions[:] = current_substitutions[source]
+        previous, current = current, previous
+        substitutions, current_substitutions = current_substitutions, substitutions
+
+    profiling.count("alignment_cells", cells)
+    return int(substitutions[m])
+
+# This method returns the lengths of the common prefix and suffix of two sequences of integer ids and the
+# arrays in between, which are all the dynamic programming table needs
+def _strip_common_ends(reference, hypothesis):
+    import numpy as np
+
+    reference = np.asarray(reference)
+    hypothesis = np.asarray(hypothesis)
+
+    prefix = _common_prefix(reference, hypothesis)
+    reference = reference[prefix:]
+    hypothesis = hypothesis[prefix:]
+    suffix = _common_prefix(reference[::-1], hypothesis[::-1])
+    return prefix, suffix, reference[:len(reference) - suffix], hypothesis[:len(hypothesis) - suffix]
+
+# This method aligns two sequences of integer ids (lists or NumPy arrays) and returns the Alignment
+# A common prefix and suffix are matched directly and left out of the dynamic programming table
+def align(reference, hypothesis):
+    prefix, suffix, reference, hypothesis = _strip_common_ends(reference, hypothesis)
+    return Alignment(MATCH * prefix + _align_core(reference, hypothesis) + MATCH * suffix)
+
+# This method returns the EditCounts of the alignment align would return, without keeping its moves
+# distance is the Levenshtein distance of the two when it is already known
+def count_edits(reference, hypothesis, distance=None):
+    prefix, suffix, reference, hypothesis = _strip_common_ends(reference, hypothesis)
+    if distance is None:
+        distance = levenshtein_distance(reference.tolist(), hypothesis.tolist())
+    substitutions = _count_substitutions(reference, hypothesis, distance)
+    # Any path has as many more insertions than deletions as the hypothesis is longer than the reference
+    insertions = (distance - substitutions + len(hypothesis) - len(reference)) // 2
+    # The hypothesis is hits + substitutions + insertions long, the reference hits + substitutions + deletions
+    hits = prefix + suffix + len(hypothesis) - substitutions - insertions
+    deletions = len(reference) - len(hypothesis) + insertions
+    return EditCounts(hits, substitutions, insertions, deletions)
+
+# This method returns the code points of a string as integer ids
+def encode_characters(text):
+    import numpy as np
+
+    return np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+
+# The word and character edit counts of one pair of transcripts, words an Alignment when it was asked for
+class PairErrorRates:
+    __slots__ = ("words", "characters")
+
+    def __init__(self, words, characters):
+        self.words = words
+        self.characters = characters
+
+    @property
+    def wer(self):
+        return self.words.error_rate()
+
+    @property
+    def cer(self):
+        return self.characters.error_rate()
+
+    # The character similarity of the joined transcripts, levenshtein_similarity of the same distance
+    @property
+    def similarity(self):
+        return self.characters.similarity()
+
+# This method counts the edits between two preprocessed transcripts at word level, over their token ids
+# (see vocabulary.py), and at character level over their text, the tokens joined with spaces the similarity
+# is computed on. Only the word level keeps its Alignment, and only with alignment=True. The character
+# distance comes from the bit-parallel engine on the text, as for the similarity of the other modes
+def pair_error_rates(reference_ids, hypothesis_ids, reference_text, hypothesis_text, alignment=False):
+    words = (align if alignment else count_edits)(reference_ids, hypothesis_ids)
+    characters = count_edits(encode_characters(reference_text), encode_characters(hypothesis_text),
+                             levenshtein_distance(reference_text, hypothesis_text))
+    return PairErrorRates(words, characters)
+
+# This method lays out a word alignment as REF, HYP and OPS lines, gaps shown as ***
+def format_alignment(alignment, reference_tokens, hypothesis_tokens):
+    reference_line = []
+    hypothesis_line = []
+    operations_line = []
+    for operation, i, j in alignment.pairs():
+        reference_word = "***" if i is None else reference_tokens[i]
+        hypothesis_word = "***" if j is None else hypothesis_tokens[j]
+        width = max(len(reference_word), len(hypothesis_word))
+        reference_line.append(reference_word.ljust(width))
+        hypothesis_line.append(hypothesis_word.ljust(width))
+        operations_line.append(("" if operation == MATCH else operation).ljust(width))
+    return "\n".join(["REF: " + " ".join(reference_line).rstrip(),
+                      "HYP: " + " ".join(hypothesis_line).rstrip(),
+                      "OPS: " + " ".join(operations_line).rstrip()])
@@ -1,86 +1,19 @@
-import pandas as pd
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords, words
-from nltk.stem import PorterStemmer
-from collections import defaultdict, Counter
-import matplotlib.pyplot as plt
-import numpy as np
+import argparse
+from collections import Counter
 
-# Download the 'punkt' resource
-#nltk.download('punkt')
-#nltk.download('stopwords')
-#nltk.download('words')
+import resources
+from pipeline import (DEFAULT_TOKENIZER, Pipeline, add_pipeline_arguments, corpus_files, default_zipf_plot,
+                      finish_profile, start_profile)
+from preprocessing import Preprocessor
 
-def read_csv_and_store_lines(csv_file):
-    data = []
+def create_corpus(data, preprocessor=None):
+    # Remove punctuation and stopwords, apply stemming, then filter out English words
+    if preprocessor is None:
+        preprocessor = Preprocessor(remove_stopwords=True, stem=True, remove_english=True)
     
-    # Read the CSV file into a DataFrame
-    df = pd.read_csv(csv_file)
-    
-    # Convert each row of the DataFrame into a dictionary and store in the 'data' list
-    for index, row in df.iterrows():
-        data_item = {
-            "HITId": row["HITId"],
-            "HITTypeId": row["HITTypeId"],
-            "Title": row["Title"],
-            "CreationTime": row["CreationTime"],
-            "MaxAssignments": row["MaxAssignments"],
-            "AssignmentDurationInSeconds": row["AssignmentDurationInSeconds"],
-            "AssignmentId": row["AssignmentId"],
-            "WorkerId": row["WorkerId"],
-            "AcceptTime": row["AcceptTime"],
-            "SubmitTime": row["SubmitTime"],
-            "WorkTimeInSeconds": row["WorkTimeInSeconds"],
-            "Input.audio_url": row["Input.audio_url"],
-            "Answer.transcript": row["Answer.transcript"],
-            "Turkle.Username": row["Turkle.Username"]
-        }
-        data.append(data_item)
-    
-    return data
-
-def combine_csv_files(file1, file2, output_file):
-    # Read both CSV files into DataFrames
-    df1 = pd.read_csv(file1)
-    df2 = pd.read_csv(file2)
-    
-    # Combine the DataFrames
-    combined_df = pd.concat([df1, df2], ignore_index=True)
-    
-    # Save the combined DataFrame to a new CSV file
-    combined_df.to_csv(output_file, index=False)
-
-def preprocess_text(text):
-    # Tokenize the text
-    tokens = word_tokenize(text)
-    
-    # Convert to lowercase
-    tokens = [token.lower() for token in tokens]
-    
-    # Remove punctuation and stopwords
-    stop_words = set(stopwords.words('english')) # This is a problem
-    tokens = [token for token in tokens if token.isalnum() and token not in stop_words]
-    
-    
-    # Apply stemming
-    stemmer = PorterStemmer()
-    tokens = [stemmer.stem(token) for token in tokens]
-    
-    return tokens
-
-def create_corpus(data):
     corpus = []
-    english_words = set(words.words())  # Set of English words
-    
-    for entry in data:
-        transcript = entry["Answer.transcript"]
-        preprocessed_transcript = preprocess_text(transcript)
-        
-        # Filter out English words
-        filtered_transcript = [word for word in preprocessed_transcript if word not in english_words]
-        
-        corpus.extend(filtered_transcript)
+    for preprocessed_transcript in preprocessor.process_many(entry.transcript for entry in data):
+        corpus.extend(preprocessed_transcript)
     return corpus
 
 def calculate_token_to_type_ratio(tokens):
@@ -91,7 +24,10 @@ def calculate_token_to_type_ratio(tokens):
     
     return ttr
     
-def calculate_zipfs_law(tokens):   
+def calculate_zipfs_law(tokens, output_path='structured.png'):   
+    import matplotlib.pyplot as plt
+    import numpy as np
+    
     # Frequency calculation
     word_counts = Counter(tokens)
      
@@ -111,42 +47,36 @@ def calculate_zipfs_law(tokens):
     plt.grid(True)
     
     # Save the plot as an image file (e.g., PNG) 
-    plt.savefig('structured.png')  # for structured uncomment
-    #plt.savefig('unstructured.png') # for unstructured uncomment
+    plt.savefig(output_path)
     
     # Close the plot (optional)
     plt.close()
 
 if __name__ == "__main__":
-    # Uncomment as needed
-    csv_file1 = "Data/Structured1.csv"  
-    csv_file2 = "Data/Structured2.csv"
-    #csv_file1 = "Data/Unstructured1.csv"  
-    #csv_file2 = "Data/Unstructured2.csv"
-    csv_file_path = "combined.csv"
-    
-    combine_csv_files(csv_file1, csv_file2, csv_file_path)
-    
-    stored_data = read_csv_and_store_lines(csv_file_path)
-    
-    #for entry in stored_data:
-    #    print(entry)
-
-    #for entry in stored_data:
-    #    #print("HIT ID:", entry["HITId"])
-    #    print("User:", entry["Turkle.Username"])
-    #    print("Audio URL:", entry["Input.audio_url"])
-    #    print("Transcript:", entry["Answer.transcript"])
-    #    print("=" * 30)  # Separator for better readability
+    # The corpus is chosen with --corpus (default: structured), see pipeline.py
+    parser = argparse.ArgumentParser(description="Corpus size, TTR and Zipf plot of the stemmed corpus")
+    add_pipeline_arguments(parser)
+    args = parser.parse_args()
+    if args.nltk_data:
+        resources.set_data_path(args.nltk_data)
+    start_profile(args)
+    pipeline = Pipeline(args.csv_files or corpus_files(args.corpus, args.data_dir),
+                        args.tokenizer or DEFAULT_TOKENIZER, args.cache, args.preprocess_workers, args.chunk_size)
         
-    corpus = create_corpus(stored_data)
+    # Remove punctuation and stopwords, apply stemming, then filter out English words
+    try:
+        encoded = pipeline.encoded_corpus(remove_stopwords=True, stem=True, remove_english=True)
+        corpus = encoded.vocabulary.decode(encoded.ids)
+    except resources.MissingResourceError as error:
+        parser.exit(1, f"{parser.prog}: error: {error}\n")
     #print("Corpus:", corpus)
     print("Corpus Size:", len(corpus))  
     
     token_to_type_ratio = calculate_token_to_type_ratio(corpus)
     print(f"Token-to-Type Ratio (TTR): {token_to_type_ratio:.2f}")
     
-    calculate_zipfs_law(corpus)
+    calculate_zipfs_law(corpus, output_path=default_zipf_plot(args))
+    finish_profile(args)
     
         
     
@@ -0,0 +1,35 @@
+# This python file reads the HIT assignment exports (the csv files in Data) for the analysis scripts
+import sys
+
+# The csv columns the scripts use, in the order of the arguments of Assignment
+# The rest of the export (HIT ids, titles, accept and submit times...) is never loaded
+COLUMNS = ("AssignmentId", "WorkerId", "Input.audio_url", "Answer.transcript", "Turkle.Username")
+
+# One HIT assignment: a transcript of an audio file by a worker
+# Worker ids, audio urls and usernames repeat across many rows, so they are interned and shared
+class Assignment:
+    __slots__ = ("assignment_id", "worker_id", "audio_url", "transcript", "username")
+
+    def __init__(self, assignment_id, worker_id, audio_url, transcript, username):
+        self.assignment_id = assignment_id
+        self.worker_id = sys.intern(worker_id)
+        self.audio_url = sys.intern(audio_url)
+        self.transcript = transcript
+        self.username = sys.intern(username)
+
+    def __repr__(self):
+        return (f"Assignment(assignment_id={self.assignment_id!r}, worker_id={self.worker_id!r}, "
+                f"audio_url={self.audio_url!r}, username={self.username!r})")
+
+# This method streams the assignments of any number of csv files, chunk by chunk
+# Only the needed columns are parsed and every row is yielded as an Assignment,
+# so memory stays flat however large the exports are and no combined file is written
+def iter_assignments(csv_files, chunksize=10000):
+    import pandas as pd
+
+    for csv_file in csv_files:
+        # Everything is read as text; empty cells become "" rather than NaN
+        reader = pd.read_csv(csv_file, usecols=list(COLUMNS), dtype=str, keep_default_na=False, chunksize=chunksize)
+        for chunk in reader:
+            for row in zip(*(chunk[column] for column in COLUMNS)):
+                yield Assignment(*row)
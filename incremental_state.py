@@ -0,0 +1,170 @@
+# This python file holds the persisted state of the incremental mode of the scripts (--state PATH), so
+# a new batch of HITs only costs the new assignments: the assignments already processed, the pair
+# similarities already computed per audio file and the corpus frequency table live in a SQLite file,
+# and a run only preprocesses the AssignmentIds it has not seen and only compares the pairs they create
+import argparse
+import sqlite3
+
+from inter import parallel_similarity_matrices
+
+# Bump whenever the similarity definition changes, so states with old scores are rebuilt
+SIMILARITY_VERSION = 1
+
+# Assignments, pair similarities and token counts accumulated over runs, in a SQLite file.
+# The state belongs to one configuration, given as a fingerprint (e.g. the preprocessing fingerprint);
+# opening it with another fingerprint starts it over. Changes are only saved by commit(), so a run
+# that fails halfway leaves the state of the previous run
+class IncrementalState:
+    def __init__(self, path, fingerprint):
+        self.path = path
+        self.fingerprint = fingerprint
+
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS assignments (
+                assignment_id TEXT PRIMARY KEY,
+                audio_url TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                worker_id TEXT NOT NULL,
+                transcript TEXT,
+                UNIQUE (audio_url, position)
+            );
+            CREATE TABLE IF NOT EXISTS pairs (
+                audio_url TEXT NOT NULL,
+                i INTEGER NOT NULL,
+                j INTEGER NOT NULL,
+                similarity REAL NOT NULL,
+                PRIMARY KEY (audio_url, i, j)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS token_counts (
+                id INTEGER PRIMARY KEY,
+                token TEXT NOT NULL UNIQUE,
+                count INTEGER NOT NULL
+            );
+        """)
+
+        stored = self.connection.execute("SELECT value FROM meta WHERE name = 'fingerprint'").fetchone()
+        # The fingerprint the state had before this run, None for a new state
+        self.previous_fingerprint = stored[0] if stored is not None else None
+        # Whether the state was started over because it belonged to another configuration
+        self.reset = stored is not None and stored[0] != fingerprint
+        if stored is None or self.reset:
+            with self.connection:
+                self.connection.executescript("DELETE FROM assignments; DELETE FROM pairs; DELETE FROM token_counts;")
+                self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)", (fingerprint,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # This method returns the assignments (Assignment records) whose AssignmentId is not in the state yet
+    def new_assignments(self, assignments):
+        known = {assignment_id for assignment_id, in self.connection.execute("SELECT assignment_id FROM assignments")}
+        new = []
+        for assignment in assignments:
+            if assignment.assignment_id not in known:
+                known.add(assignment.assignment_id)
+                new.append(assignment)
+        return new
+
+    # This method adds new assignments with their preprocessed transcripts (None when only counts are kept)
+    # Each gets the next transcript number of its audio file; the numbers are returned in order
+    def add_assignments(self, assignments, transcripts=None):
+        if transcripts is None:
+            transcripts = [None] * len(assignments)
+        last_positions = dict(self.connection.execute(
+            "SELECT audio_url, MAX(position) FROM assignments GROUP BY audio_url"))
+
+        rows = []
+        positions = []
+        for assignment, transcript in zip(assignments, transcripts):
+            position = last_positions.get(assignment.audio_url, 0) + 1
+            last_positions[assignment.audio_url] = position
+            positions.append(position)
+            rows.append((assignment.assignment_id, assignment.audio_url, position, assignment.worker_id, transcript))
+        self.connection.executemany("INSERT INTO assignments VALUES (?, ?, ?, ?, ?)", rows)
+        return positions
+
+    # This method returns the audio urls in the order their first assignment arrived
+    def audio_urls(self):
+        return [audio_url for audio_url, in self.connection.execute(
+            "SELECT audio_url FROM assignments GROUP BY audio_url ORDER BY MIN(rowid)")]
+
+    # This method returns the worker ids and the preprocessed transcripts of an audio file, in transcript order
+    def transcripts(self, audio_url):
+        rows = self.connection.execute(
+            "SELECT worker_id, transcript FROM assignments WHERE audio_url = ? ORDER BY position", (audio_url,))
+        workers = []
+        transcripts = []
+        for worker_id, transcript in rows:
+            workers.append(worker_id)
+            transcripts.append(transcript)
+        return workers, transcripts
+
+    # This method stores pair similarities given as (audio_url, i, j, similarity), transcript numbers from 1
+    def add_pair_scores(self, rows):
+        self.connection.executemany("INSERT OR REPLACE INTO pairs VALUES (?, ?, ?, ?)", rows)
+
+    # This method returns the similarities of an audio file in condensed order (i < j, row by row)
+    def pair_scores(self, audio_url):
+        return [similarity for similarity, in self.connection.execute(
+            "SELECT similarity FROM pairs WHERE audio_url = ? ORDER BY i, j", (audio_url,))]
+
+    # This method adds token counts (a dict or Counter, in the order the tokens were first seen)
+    def add_token_counts(self, counts):
+        self.connection.executemany(
+            "INSERT INTO token_counts (token, count) VALUES (?, ?) "
+            "ON CONFLICT (token) DO UPDATE SET count = count + excluded.count", counts.items())
+
+    # This method returns the accumulated token counts as a dict, in the order the tokens were first seen
+    def token_counts(self):
+        return dict(self.connection.execute("SELECT token, count FROM token_counts ORDER BY id"))
+
+    # This method saves the changes of this run
+    def commit(self):
+        self.connection.commit()
+
+    # Closing without commit() drops the changes of this run
+    def close(self):
+        self.connection.close()
+
+# This method adds new assignments and their preprocessed transcripts (tokens joined with spaces) to the
+# state and computes only the pairs they create: each new transcript against every earlier transcript of
+# its audio file, old or new. The pairs go through parallel_similarity_matrices, over workers processes
+# and with identical transcripts compared once, as in a full run. Returns the number of pairs compared
+def update_pair_scores(state, assignments, transcripts, workers=1):
+    positions = state.add_assignments(assignments, transcripts)
+    new_positions = {}
+    for assignment, position in zip(assignments, positions):
+        new_positions.setdefault(assignment.audio_url, []).append(position)
+
+    groups = {}
+    pairs = {}
+    for audio_url, added in new_positions.items():
+        groups[audio_url] = state.transcripts(audio_url)[1]
+        # Positions start at 1, the indexes of the transcripts at 0
+        pairs[audio_url] = [(i - 1, j - 1) for j in added for i in range(1, j)]
+    similarities = parallel_similarity_matrices(groups, workers, pairs=pairs)
+
+    compared = 0
+    for audio_url, audio_pairs in pairs.items():
+        # Stored as float32 values, the precision of the full run, so both write the same results
+        state.add_pair_scores([(audio_url, i + 1, j + 1, similarity)
+                               for (i, j), similarity in zip(audio_pairs, similarities[audio_url].tolist())])
+        compared += len(audio_pairs)
+    return compared
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect an incremental state file")
+    parser.add_argument("path")
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.path)
+    for name, value in connection.execute("SELECT name, value FROM meta"):
+        print(f"{name}: {value}")
+    for table in ("assignments", "pairs", "token_counts"):
+        print(f"{table}: {connection.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]}")
+    connection.close()
@@ -1,34 +1,261 @@
-def levenshtein_distance(s1, s2):
-    if len(s1) < len(s2):
-        return levenshtein_distance(s2, s1)
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations, repeat
 
-    if len(s2) == 0:
-        return len(s1)
+import profiling
+from error_rates import pair_error_rates
+from levenshtein import levenshtein_distance, levenshtein_similarity
+from pruning import PruningStats, TranscriptProfile, is_below
 
-    previous_row = range(len(s2) + 1)
-    for i, c1 in enumerate(s1):
-        current_row = [i + 1]
-        for j, c2 in enumerate(s2):
-            insertions = previous_row[j + 1] + 1
-            deletions = current_row[j] + 1
-            substitutions = previous_row[j] + (c1 != c2)
-            current_row.append(min(insertions, deletions, substitutions))
-        previous_row = current_row
+# This method returns the number of pairs of the groups, the items of the profiled batch functions
+# With pairs (see parallel_similarity_matrices) only the listed pairs are counted
+def _group_pairs(groups, *args, pairs=None, **kwargs):
+    if pairs is not None:
+        return sum(len(group_pairs) for group_pairs in pairs.values())
+    return sum(num_pairs(len(strings)) for strings in groups.values())
 
-    return previous_row[-1]
+# This method returns the number of pairs in a condensed vector of n items
+def num_pairs(n):
+    return n * (n - 1) // 2
 
-def inter_transcriber_similarity(strings):
-    num_strings = len(strings)
-    similarity_matrix = [[0] * num_strings for _ in range(num_strings)]
+# This method fills out with the similarities of the (i, j) index pairs of strings, in their order
+def _fill_pairs(strings, pairs, out, min_similarity=None):
+    # Identical transcripts are only compared once: map each string to its first occurrence
+    unique_strings = {}
+    codes = [unique_strings.setdefault(string, len(unique_strings)) for string in strings]
+    uniques = list(unique_strings)
+    computed = {}
+
+    for k, (i, j) in enumerate(pairs):
+        code_i = codes[i]
+        code_j = codes[j]
+        if code_i == code_j:
+            out[k] = 1.0
+        else:
+            key = (code_i, code_j) if code_i < code_j else (code_j, code_i)
+            similarity = computed.get(key)
+            if similarity is None:
+                similarity = levenshtein_similarity(uniques[key[0]], uniques[key[1]], min_similarity)
+                computed[key] = similarity
+            out[k] = similarity
+
+# This method fills out with the similarities of every pair i < j of strings, in condensed order
+def _fill_condensed(strings, out, min_similarity=None):
+    _fill_pairs(strings, combinations(range(len(strings)), 2), out, min_similarity)
+
+# This method calculates the similarities of the (i, j) index pairs of strings as a float32 array
+def pair_similarities(strings, pairs, min_similarity=None):
+    import numpy as np
+
+    out = np.empty(len(pairs), dtype=np.float32)
+    _fill_pairs(strings, pairs, out, min_similarity)
+    return out
+
+# This method expands a condensed vector into the full symmetric matrix with ones on the diagonal
+def squareform(condensed, n):
+    import numpy as np
+
+    matrix = np.ones((n, n), dtype=np.float32)
+    rows, cols = np.triu_indices(n, k=1)
+    matrix[rows, cols] = condensed
+    matrix[cols, rows] = condensed
+    return matrix
+
+# This method calculates the pairwise similarities of a list of transcripts as a float32 array
+# With condensed=True only the upper triangle (i < j, row by row) is returned
+def similarity_matrix(strings, condensed=False, min_similarity=None):
+    import numpy as np
+
+    out = np.empty(num_pairs(len(strings)), dtype=np.float32)
+    _fill_condensed(strings, out, min_similarity)
+    if condensed:
+        return out
+    return squareform(out, len(strings))
+
+# This method calculates the condensed similarity vectors of many groups of transcripts in one call
+# groups maps a key (e.g. the audio url) to its transcripts; one float32 buffer backs all the results
+# With pairs, a dict mapping each key to (i, j) index pairs, only those pairs are computed, in their order
+@profiling.profiled("inter.batch_similarity_matrices", items=_group_pairs)
+def batch_similarity_matrices(groups, min_similarity=None, pairs=None):
+    import numpy as np
+
+    if pairs is None:
+        sizes = [num_pairs(len(strings)) for strings in groups.values()]
+    else:
+        sizes = [len(pairs[key]) for key in groups]
+    buffer = np.empty(sum(sizes), dtype=np.float32)
+
+    results = {}
+    offset = 0
+    for (key, strings), size in zip(groups.items(), sizes):
+        view = buffer[offset:offset + size]
+        if pairs is None:
+            _fill_condensed(strings, view, min_similarity)
+        else:
+            _fill_pairs(strings, pairs[key], view, min_similarity)
+        results[key] = view
+        offset += size
+    return results
+
+# This method estimates the work of one group: the number of transcripts squared times their mean length
+def estimate_group_cost(strings):
+    if not strings:
+        return 0
+    mean_length = sum(len(string) for string in strings) / len(strings)
+    return len(strings) ** 2 * max(mean_length, 1)
+
+# This method splits the groups into num_shards shards of roughly equal estimated cost
+# Longest processing time first: the costliest remaining group goes to the currently lightest shard
+def shard_groups(groups, num_shards, cost=estimate_group_cost):
+    items = list(groups.items())
+    costs = [cost(group) for _, group in items]
+    order = sorted(range(len(items)), key=lambda index: costs[index], reverse=True)
+
+    shards = [[] for _ in range(min(num_shards, len(items)))]
+    loads = [(0, shard) for shard in range(len(shards))]
+    for index in order:
+        load, shard = heapq.heappop(loads)
+        shards[shard].append(items[index])
+        heapq.heappush(loads, (load + costs[index], shard))
+    return shards
+
+# This method runs in a worker process: shard_function over a shard, with the counters (e.g. the DP cells)
+# counted meanwhile, so they are not lost with the worker
+def _counted_shard(shard_function, shard, *args):
+    return shard_function(shard, *args), profiling.collect_counters()
+
+# This method runs shard_function over the groups, sharded by estimated cost across a process pool
+# shard_function takes a shard and args and returns (key, result) pairs; the result keeps the order of groups
+def _run_sharded(groups, workers, shard_function, *args, cost=estimate_group_cost):
+    # A few shards per worker so one badly estimated shard does not hold up the whole pool
+    shards = shard_groups(groups, workers * 4, cost)
+
+    computed = {}
+    # The workers only count (see profiling.init_worker); their counters are added to the parent's
+    with ProcessPoolExecutor(max_workers=workers, initializer=profiling.init_worker,
+                             initargs=(profiling.active() is not None,)) as executor:
+        for shard_results, counters in executor.map(_counted_shard, repeat(shard_function), shards,
+                                                     *(repeat(arg) for arg in args)):
+            computed.update(shard_results)
+            profiling.add_counters(counters)
+    return {key: computed[key] for key in groups}
 
-    for i in range(num_strings):
-        for j in range(i, num_strings):
-            distance = levenshtein_distance(strings[i], strings[j])
-            similarity = 1 - distance / max(len(strings[i]), len(strings[j]))
-            similarity_matrix[i][j] = similarity
-            similarity_matrix[j][i] = similarity
+# This method runs in a worker process and calculates the condensed vectors of one shard
+def _similarity_shard(shard, min_similarity):
+    return [(key, similarity_matrix(strings, condensed=True, min_similarity=min_similarity))
+            for key, strings in shard]
 
-    return similarity_matrix
+# This method estimates the work of a (strings, pairs) group: the pairs times the mean length of the strings
+def _pairs_cost(group):
+    strings, pairs = group
+    return len(pairs) * max(sum(len(string) for string in strings) / max(len(strings), 1), 1)
+
+# This method runs in a worker process and calculates the listed pairs of one shard
+def _pairs_shard(shard, min_similarity):
+    return [(key, pair_similarities(strings, pairs, min_similarity)) for key, (strings, pairs) in shard]
+
+# This method is the multi-process version of batch_similarity_matrices, pairs included
+@profiling.profiled("inter.parallel_similarity_matrices", items=_group_pairs)
+def parallel_similarity_matrices(groups, workers, min_similarity=None, pairs=None):
+    if workers <= 1 or len(groups) <= 1:
+        return batch_similarity_matrices(groups, min_similarity, pairs=pairs)
+    if pairs is None:
+        return _run_sharded(groups, workers, _similarity_shard, min_similarity)
+    paired = {key: (strings, pairs[key]) for key, strings in groups.items()}
+    return _run_sharded(paired, workers, _pairs_shard, min_similarity, cost=_pairs_cost)
+
+# This method tells for every pair i < j of strings, in condensed order, whether its similarity is below
+# min_similarity, as a bool array. Cheap exact bounds decide most pairs without a Levenshtein (see
+# pruning.py); how each pair was decided is counted in stats
+def condensed_below_threshold(strings, min_similarity, stats=None):
+    import numpy as np
+
+    profiles = {}
+    for string in strings:
+        if string not in profiles:
+            profiles[string] = TranscriptProfile(string)
+    profiles = [profiles[string] for string in strings]
+
+    out = np.empty(num_pairs(len(strings)), dtype=bool)
+    k = 0
+    n = len(strings)
+    for i in range(n):
+        for j in range(i + 1, n):
+            out[k] = is_below(profiles[i], profiles[j], min_similarity, stats)
+            k += 1
+    return out
+
+# This method decides the pairs of one group, returning the condensed bool array and the group's PruningStats
+def _below_threshold_group(strings, min_similarity):
+    stats = PruningStats()
+    return condensed_below_threshold(strings, min_similarity, stats), stats
+
+# This method runs in a worker process and decides the pairs of one shard
+def _below_threshold_shard(shard, min_similarity):
+    return [(key, _below_threshold_group(strings, min_similarity)) for key, strings in shard]
+
+# This method decides which pairs of many groups of strings are below min_similarity, over workers processes
+# Returns a dict of condensed bool arrays in the order of groups and the PruningStats of all the pairs
+@profiling.profiled("inter.parallel_below_threshold", items=_group_pairs)
+def parallel_below_threshold(groups, min_similarity, workers=1):
+    if workers <= 1 or len(groups) <= 1:
+        decided = {key: _below_threshold_group(strings, min_similarity) for key, strings in groups.items()}
+    else:
+        decided = _run_sharded(groups, workers, _below_threshold_shard, min_similarity)
+
+    stats = PruningStats()
+    results = {}
+    for key, (below, group_stats) in decided.items():
+        results[key] = below
+        stats.merge(group_stats)
+    return results, stats
+
+# This method compares every pair i < j of transcripts in condensed order, at word level over token_ids
+# (int arrays from one Vocabulary) and at character level over strings (the tokens joined with spaces)
+# Each pair gets one PairErrorRates (WER, CER, operation counts, similarity), transcript i as the reference,
+# with the word Alignment when alignments is true. Identical transcripts are compared once
+def condensed_error_rates(strings, token_ids, alignments=False):
+    unique_strings = {}
+    codes = [unique_strings.setdefault(string, len(unique_strings)) for string in strings]
+    first = {}
+    for index, code in enumerate(codes):
+        first.setdefault(code, index)
+    computed = {}
+
+    results = []
+    n = len(strings)
+    for i in range(n):
+        for j in range(i + 1, n):
+            key = (codes[i], codes[j])
+            error_rates = computed.get(key)
+            if error_rates is None:
+                a = first[key[0]]
+                b = first[key[1]]
+                error_rates = pair_error_rates(token_ids[a], token_ids[b], strings[a], strings[b], alignments)
+                computed[key] = error_rates
+            results.append(error_rates)
+    return results
+
+# This method estimates the work of a (strings, token_ids) group of parallel_error_rates
+def _error_rates_cost(group):
+    return estimate_group_cost(group[0])
+
+# This method runs in a worker process and compares the pairs of one shard
+def _error_rates_shard(shard, alignments):
+    return [(key, condensed_error_rates(strings, token_ids, alignments)) for key, (strings, token_ids) in shard]
+
+# This method compares the pairs of many groups of transcripts, over workers processes
+# groups maps a key (e.g. the audio url) to its strings and token_ids maps it to their id arrays;
+# the result maps the key to condensed_error_rates
+@profiling.profiled("inter.parallel_error_rates", items=_group_pairs)
+def parallel_error_rates(groups, token_ids, workers=1, alignments=False):
+    if workers <= 1 or len(groups) <= 1:
+        return {key: condensed_error_rates(strings, token_ids[key], alignments) for key, strings in groups.items()}
+    paired = {key: (strings, token_ids[key]) for key, strings in groups.items()}
+    return _run_sharded(paired, workers, _error_rates_shard, alignments, cost=_error_rates_cost)
+
+def inter_transcriber_similarity(strings):
+    return similarity_matrix(strings).tolist()
 
 if __name__ == "__main__":
     input_strings = [
@@ -38,10 +265,9 @@ if __name__ == "__main__":
         "hola world"
     ]
 
-    similarity_matrix = inter_transcriber_similarity(input_strings)
+    matrix = inter_transcriber_similarity(input_strings)
 
     for i, string in enumerate(input_strings):
         print(f"Similarity with '{string}':")
-        for j, similarity in enumerate(similarity_matrix[i]):
+        for j, similarity in enumerate(matrix[i]):
             print(f"   '{input_strings[j]}': {similarity:.2f}")
-
@@ -0,0 +1,110 @@
+# This python file is the shared edit distance engine used by the similarity scripts.
+# It uses the bit-parallel algorithm of Myers (1999) in the formulation of Hyyro (2003):
+# each column of the dynamic programming table is held as bit vectors in a Python int,
+# so one character of the text costs a handful of big-int operations instead of a loop
+# over the whole pattern.
+import profiling
+
+
+# This method builds the match masks for the pattern: bit i is set in peq[c] when pattern[i] == c
+def _pattern_masks(pattern):
+    peq = {}
+    bit = 1
+    for c in pattern:
+        peq[c] = peq.get(c, 0) | bit
+        bit <<= 1
+    return peq
+
+
+# This method runs the bit-parallel algorithm over text with pattern as the bit vector
+# Returns max_distance + 1 as soon as the distance is known to exceed max_distance
+def _bit_parallel_distance(text, pattern, max_distance=None):
+    m = len(pattern)
+    n = len(text)
+    peq = _pattern_masks(pattern)
+
+    mask = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv = mask  # positive vertical deltas
+    mv = 0     # negative vertical deltas
+    score = m
+    # Neighbouring cells in the bottom row differ by at most one, so the final distance is at least the
+    # score of column j minus the n - j - 1 columns still to come: it exceeds max_distance once
+    # score + j > max_distance + n - 1
+    limit = None if max_distance is None else max_distance + n - 1
+
+    for j, c in enumerate(text):
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+
+        # Track the value of the bottom row cell for this column
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+
+        if limit is not None and score + j > limit:
+            profiling.count("levenshtein_cells", (j + 1) * m)
+            return max_distance + 1
+
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv & mask
+
+    # The cells of the DP table the bit vectors stood for, with --profile
+    profiling.count("levenshtein_cells", n * m)
+    return score
+
+
+# This method calculates the Levenshtein distance between two strings (or any sequences of hashable items)
+# If max_distance is given, any distance above it is reported as max_distance + 1 without finishing the computation
+def levenshtein_distance(s1, s2, max_distance=None):
+    # Make s2 the shorter one, it becomes the bit vector
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+
+    # The length difference is a lower bound on the distance
+    if max_distance is not None and len(s1) - len(s2) > max_distance:
+        return max_distance + 1
+
+    # A common prefix and suffix never change the distance
+    start = 0
+    end_1 = len(s1)
+    end_2 = len(s2)
+    while start < end_2 and s1[start] == s2[start]:
+        start += 1
+    while end_2 > start and s1[end_1 - 1] == s2[end_2 - 1]:
+        end_1 -= 1
+        end_2 -= 1
+    s1 = s1[start:end_1]
+    s2 = s2[start:end_2]
+
+    if len(s2) == 0:
+        distance = len(s1)
+        if max_distance is not None and distance > max_distance:
+            return max_distance + 1
+        return distance
+
+    return _bit_parallel_distance(s1, s2, max_distance)
+
+
+# This method calculates the similarity 1 - distance / max(len) used throughout the scripts
+# If min_similarity is given, pairs that are certainly less similar than it return 0.0 early
+def levenshtein_similarity(s1, s2, min_similarity=None):
+    longest = max(len(s1), len(s2))
+    if longest == 0:
+        return 1.0
+
+    if min_similarity is None:
+        return 1 - levenshtein_distance(s1, s2) / longest
+
+    # The small epsilon keeps thresholds like 0.9 * 10 from rounding down a whole edit
+    max_distance = int((1 - min_similarity) * longest + 1e-9)
+    distance = levenshtein_distance(s1, s2, max_distance)
+    if distance > max_distance:
+        return 0.0
+    return 1 - distance / longest
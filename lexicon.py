@@ -0,0 +1,123 @@
+# This python file holds the English lexicon used to filter out English words as a prebuilt index.
+# The NLTK word list (~236k words) is read by NLTK's corpus reader once and saved to disk as a plain sorted
+# word file, so later runs load it straight into a frozenset: membership is then one hash lookup per token.
+# The saved index records the size and modification time of the NLTK word list files it was built from,
+# and is rebuilt on its own when they change (e.g. after updating the NLTK data)
+# Build or rebuild the index with: python lexicon.py --rebuild
+import argparse
+import hashlib
+import json
+import os
+
+import resources
+
+# Environment variable with the file the index is kept in
+INDEX_PATH_ENV = "TRANSCRIPT_LEXICON_INDEX"
+
+# Where the index is kept when INDEX_PATH_ENV is not set
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".cache", "transcript_analysis", "english_words.txt")
+
+# Bump whenever the layout of the saved index changes, so old files are rebuilt
+INDEX_VERSION = 2
+
+# Set of words with the digest of the word list and the key of the source it was built from
+class LexiconIndex:
+    def __init__(self, words, digest=None, source=None):
+        self.words = frozenset(words)
+        if digest is None:
+            digest = hashlib.sha1("\n".join(sorted(self.words)).encode()).hexdigest()
+        # Identifies the word list, e.g. for the disk cache fingerprint of a Preprocessor
+        self.digest = digest
+        # Identifies the files the words were read from (see source_key), None when they came from elsewhere
+        self.source = source
+
+    # This method builds the index from any iterable of words
+    @classmethod
+    def from_words(cls, words, source=None):
+        return cls(words, source=source)
+
+    # This method loads an index written by save(): a JSON header line, then one word per line
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as file:
+            header = json.loads(file.readline())
+            if header.get("version") != INDEX_VERSION:
+                raise ValueError(f"{path} holds a lexicon index of version {header.get('version')}, "
+                                 f"expected {INDEX_VERSION}")
+            words = file.read().split("\n")
+        if words == [""]:
+            words = []
+        if len(words) != header["size"]:
+            raise ValueError(f"{path} is truncated: {len(words)} words, expected {header['size']}")
+        return cls(words, header["digest"], header["source"])
+
+    # This method writes the index to path; the file is replaced atomically
+    def save(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        header = {"version": INDEX_VERSION, "size": len(self.words), "digest": self.digest, "source": self.source}
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.write(json.dumps(header) + "\n")
+            file.write("\n".join(sorted(self.words)))
+        os.replace(temporary_path, path)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.words
+
+# This method returns the file the English lexicon index is kept in
+def index_path():
+    return os.environ.get(INDEX_PATH_ENV) or DEFAULT_INDEX_PATH
+
+# This method returns the key of the installed NLTK word list: the path, size and modification time of each
+# of its files. Reading it stats a few files, the word list itself is not read
+def source_key():
+    location = resources.locate("words")
+    if os.path.isdir(location):
+        paths = sorted(os.path.join(location, name) for name in os.listdir(location))
+    else:
+        paths = [location]
+    stats = [(path, os.stat(path)) for path in paths]
+    return ";".join(f"{path}:{stat.st_size}:{stat.st_mtime_ns}" for path, stat in stats)
+
+# This method builds the English lexicon index from the NLTK word list and saves it to path
+def build_english_lexicon(path=None):
+    source = source_key()
+    from nltk.corpus import words
+
+    lexicon = LexiconIndex.from_words(words.words(), source)
+    lexicon.save(path or index_path())
+    return lexicon
+
+# This method loads the English lexicon index, building it from the NLTK word list the first time and
+# again whenever the word list files changed since. Without the NLTK word list a saved index is used as is
+def load_english_lexicon(path=None):
+    path = path or index_path()
+    try:
+        lexicon = LexiconIndex.load(path)
+    except (OSError, ValueError, KeyError):
+        # Missing, unreadable or outdated: build it again
+        return build_english_lexicon(path)
+    try:
+        source = source_key()
+    except resources.MissingResourceError:
+        return lexicon
+    if lexicon.source != source:
+        return build_english_lexicon(path)
+    return lexicon
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the English lexicon index used to filter out English words")
+    parser.add_argument("path", nargs="?", help=f"index file (default: ${INDEX_PATH_ENV} or {DEFAULT_INDEX_PATH})")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="rebuild from the NLTK word list even when it has not changed")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        lexicon = build_english_lexicon(args.path)
+    else:
+        lexicon = load_english_lexicon(args.path)
+    print(f"{len(lexicon)} words in {args.path or index_path()} (digest {lexicon.digest})")
@@ -0,0 +1,121 @@
+# This python file spreads the preprocessing of many transcripts over a process pool. Every worker builds
+# its Preprocessor once, in the pool initializer (the stopword set, the stemmer and the lexicon index are
+# loaded there, never pickled per task), so only chunks of transcript texts travel to the workers. A worker
+# sends each chunk back compactly, as the chunk's own vocabulary with either the int32 ids and offsets of
+# its transcripts or the count of each word; the parent maps the chunk vocabularies onto one Vocabulary
+# and merges the chunks in order, so the result is the same as preprocessing in one process
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import profiling
+import resources
+from preprocessing import Preprocessor
+from vocabulary import EncodedCorpus, Vocabulary
+
+# Transcripts per task sent to a worker
+DEFAULT_CHUNK_SIZE = 1000
+# Chunks per worker submitted ahead of the one being merged
+CHUNKS_IN_FLIGHT = 2
+
+# The Preprocessor of a worker process, built by _init_worker
+_preprocessor = None
+
+# This method returns what a worker needs to build the same Preprocessor, as picklable settings
+def preprocessor_config(preprocessor):
+    return {"remove_stopwords": preprocessor.remove_stopwords, "stem": preprocessor.stem,
+            "remove_english": preprocessor.remove_english, "tokenizer": preprocessor.tokenizer,
+            "cache_size": preprocessor.cache_size, "lexicon_path": preprocessor.lexicon_path}
+
+# This method runs once in every worker process and builds its Preprocessor; counters tells whether the
+# parent profiles (see profiling.init_worker)
+def _init_worker(config, nltk_data, counters):
+    global _preprocessor
+    profiling.init_worker(counters)
+    if nltk_data is not None:
+        resources.set_data_path(nltk_data)
+    _preprocessor = Preprocessor(**config)
+
+# This method preprocesses a chunk in a worker: the chunk's tokens and, per transcript, their ids and offsets
+def _encode_chunk(texts):
+    corpus = EncodedCorpus.from_token_lists(_preprocessor.process_many(texts))
+    return corpus.vocabulary.tokens, corpus.ids, corpus.offsets
+
+# This method preprocesses a chunk in a worker and only counts it: the chunk's tokens and the count of each
+def _count_chunk(texts):
+    corpus = EncodedCorpus.from_token_lists(_preprocessor.process_many(texts))
+    return corpus.vocabulary.tokens, corpus.counts()
+
+# This method runs in a worker process: chunk_function over a chunk, with the counters counted meanwhile
+def _counted_chunk(chunk_function, texts):
+    return chunk_function(texts), profiling.collect_counters()
+
+# This method yields the texts chunk_size at a time
+def _chunks(texts, chunk_size):
+    chunk = []
+    for text in texts:
+        chunk.append(text)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# This method runs chunk_function over the chunks of texts in a pool of workers, yielding the results in order
+# At most CHUNKS_IN_FLIGHT chunks per worker are submitted ahead (executor.map would read every text
+# up front), so texts can be a stream of any length. The counters of the workers are added to the parent's
+def _map_chunks(chunk_function, texts, preprocessor, workers, chunk_size):
+    initargs = (preprocessor_config(preprocessor), resources.data_path(), profiling.active() is not None)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as executor:
+        pending = deque()
+        for chunk in _chunks(texts, chunk_size):
+            pending.append(executor.submit(_counted_chunk, chunk_function, chunk))
+            if len(pending) > CHUNKS_IN_FLIGHT * workers:
+                yield _chunk_result(pending.popleft())
+        while pending:
+            yield _chunk_result(pending.popleft())
+
+# This method returns the result of a finished chunk, adding its counters
+def _chunk_result(future):
+    result, counters = future.result()
+    profiling.add_counters(counters)
+    return result
+
+# This method preprocesses texts over workers processes into an EncodedCorpus (of vocabulary, if given)
+@profiling.profiled("parallel_preprocessing.encoded_corpus")
+def parallel_encoded_corpus(texts, preprocessor, workers, chunk_size=DEFAULT_CHUNK_SIZE, vocabulary=None):
+    corpus = EncodedCorpus(vocabulary)
+    for tokens, ids, offsets in _map_chunks(_encode_chunk, texts, preprocessor, workers, chunk_size):
+        # Chunk id -> corpus id; new tokens get their ids in the order the chunk first saw them
+        mapping = corpus.vocabulary.encode(tokens)
+        corpus.extend_encoded(mapping[ids], offsets)
+    return corpus
+
+# This method preprocesses texts over workers processes into one token list per transcript
+def parallel_token_lists(texts, preprocessor, workers, chunk_size=DEFAULT_CHUNK_SIZE):
+    corpus = parallel_encoded_corpus(texts, preprocessor, workers, chunk_size)
+    return [corpus.tokens(i) for i in range(len(corpus))]
+
+# This method preprocesses texts over workers processes and yields, for each chunk in order, its distinct
+# tokens and the count of each
+def parallel_chunk_counts(texts, preprocessor, workers, chunk_size=DEFAULT_CHUNK_SIZE):
+    return _map_chunks(_count_chunk, texts, preprocessor, workers, chunk_size)
+
+# This method preprocesses and counts texts over workers processes into a CorpusStats; the workers only
+# send back a frequency table per chunk
+@profiling.profiled("parallel_preprocessing.corpus_stats")
+def parallel_corpus_stats(texts, preprocessor, workers, chunk_size=DEFAULT_CHUNK_SIZE):
+    import numpy as np
+    from corpus_stats import CorpusStats
+
+    vocabulary = Vocabulary()
+    counts = np.zeros(0, dtype=np.int64)
+    for tokens, chunk_counts in parallel_chunk_counts(texts, preprocessor, workers, chunk_size):
+        mapping = vocabulary.encode(tokens)
+        if len(vocabulary) > len(counts):
+            # The table at least doubles when it grows, so it is copied a logarithmic number of times
+            grown = np.zeros(max(len(vocabulary), 2 * len(counts)), dtype=np.int64)
+            grown[:len(counts)] = counts
+            counts = grown
+        # The ids of a chunk are distinct, so a fancy-indexed add is safe
+        counts[mapping] += chunk_counts
+    return CorpusStats.from_counts(counts[:len(vocabulary)], vocabulary)
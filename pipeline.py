@@ -0,0 +1,675 @@
+# This python file is the shared entry point of the analyses. The csv exports of a corpus are read once
+# and every transcript is tokenized once; the stages (corpus statistics, pairwise similarity) take what
+# they need from the Pipeline, which preprocesses each variant (with or without stopwords, stemming or the
+# English filter) at most once, from the shared tokens. The corpus is chosen on the command line
+# Run with: python pipeline.py --corpus unstructured corpus-stats similarity
+# corpus_statistics.py, inter-transcriber_similarity.py and csv_inter.py run one stage each
+import abc
+import argparse
+import contextlib
+import os
+import sys
+from collections import Counter
+
+import profiling
+import resources
+from corpus_store import load_corpus, save_corpus
+from error_rates import format_alignment
+from hit_data import iter_assignments
+from incremental_state import SIMILARITY_VERSION, IncrementalState, update_pair_scores
+from inter import parallel_below_threshold, parallel_error_rates, parallel_similarity_matrices
+from parallel_preprocessing import DEFAULT_CHUNK_SIZE, parallel_encoded_corpus, parallel_token_lists
+from preprocessing import Preprocessor, TOKENIZERS
+from result_sinks import ERROR_RATE_FIELDS, PAIR_FIELDS, THRESHOLD_FIELDS, add_sink_arguments, check_sinks, open_sinks
+from transcript_cache import TranscriptCache
+from vocabulary import EncodedCorpus
+from zipf import FIT_METHODS
+
+# The csv exports of each corpus, in the data directory
+CORPORA = {
+    "structured": ("Structured1.csv", "Structured2.csv"),
+    "unstructured": ("Unstructured1.csv", "Unstructured2.csv"),
+}
+DEFAULT_CORPUS = "structured"
+DEFAULT_DATA_DIR = "Data"
+# The tokenizer when --tokenizer is not given
+DEFAULT_TOKENIZER = "nltk"
+
+# This method returns the paths of the csv exports of a corpus
+def corpus_files(corpus, data_dir=DEFAULT_DATA_DIR):
+    if corpus not in CORPORA:
+        raise ValueError(f"Unknown corpus {corpus!r}, expected one of {sorted(CORPORA)}")
+    return [os.path.join(data_dir, csv_file) for csv_file in CORPORA[corpus]]
+
+# This method returns where the Zipf plot goes when --zipf-plot is not given, named after the input actually
+# read: the directory of --load-corpus, the first --csv export (Data/batch.csv -> batch.png) or the corpus
+def default_zipf_plot(args):
+    if getattr(args, "load_corpus", None) is not None:
+        source = os.path.normpath(args.load_corpus)
+    elif args.csv_files:
+        source = args.csv_files[0]
+    else:
+        return f"{args.corpus}.png"
+    return os.path.splitext(os.path.basename(source))[0] + ".png"
+
+# This method returns the key of a preprocessing variant, the same however it is spelled
+def _variant_key(remove_stopwords=False, stem=False, remove_english=False):
+    return (remove_stopwords, stem, remove_english)
+
+# This method returns the name of a preprocessing variant in the profile, e.g. "stopwords+english"
+def _variant_name(remove_stopwords=False, stem=False, remove_english=False):
+    steps = [step for step, on in (("stopwords", remove_stopwords), ("stem", stem), ("english", remove_english)) if on]
+    return "+".join(steps) or "plain"
+
+# This methods allows the display of the name of the file from the url from the csv file
+def extract_audio_name(url):
+    # Extract the part after the last '/' and before '.mp3'
+    audio_name = url.split("/")[-1].split(".mp3")[0]
+    return audio_name
+
+# This method is the argparse type of the options that take a count: an int of at least 1
+def _positive_int(value):
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}") from None
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {number}")
+    return number
+
+# This method opens an incremental state, warning on stderr when the state was started over because it was
+# built with other preprocessing options, another tokenizer or word list, or an older similarity definition
+def open_state(path, fingerprint):
+    state = IncrementalState(path, fingerprint)
+    if state.reset:
+        print(f"Warning: {path} was built with another configuration (fingerprint {state.previous_fingerprint}, "
+              f"this run {fingerprint}); it is started over and every assignment is processed again",
+              file=sys.stderr)
+    return state
+
+# Raw tokens of the transcripts by text, tokenized the first time a text is looked up, so the variants
+# preprocessed from the same texts share one tokenization
+class _RawTokens(dict):
+    def __init__(self, tokenize):
+        super().__init__()
+        self._tokenize = tokenize
+
+    def __missing__(self, text):
+        tokens = self[text] = self._tokenize(text)
+        return tokens
+
+# The data the stages share: the assignments of the csv files, read once, and per preprocessing variant the
+# Preprocessor and the EncodedCorpus, each built once. A variant is given as the keyword arguments
+# remove_stopwords, stem and remove_english of Preprocessor.
+# expect() tells the pipeline what the stages to come take from it and release() what a stage is done with,
+# so it only keeps what a stage still to run uses: an encoded corpus until its last stage ran, and the
+# assignments while a stage still reads them; otherwise the texts stream from the csv files into the corpus.
+# While two variants or more are still to be built, their preprocessing shares one tokenization
+class Pipeline:
+    def __init__(self, csv_files, tokenizer="nltk", cache_path=None, workers=1, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.csv_files = list(csv_files)
+        self.tokenizer = tokenizer
+        self.cache_path = cache_path
+        # With workers > 1, the preprocessing of each variant runs in a process pool, chunk_size transcripts a task
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._assignments = None
+        self._preprocessors = {}
+        self._corpora = {}
+        # What the stages still to run take: the uses of each variant's encoded corpus, and the number of
+        # stages reading the assignments
+        self._corpus_uses = Counter()
+        self._assignment_uses = 0
+        # The raw tokens shared by the variants still to be built, see _shared_tokenize
+        self._raw_tokens = None
+
+    # The assignments of the csv files, streamed from them the first time they are needed
+    @property
+    def assignments(self):
+        if self._assignments is None:
+            with profiling.section("ingest") as section:
+                self._assignments = list(iter_assignments(self.csv_files))
+                section.add_items(len(self._assignments))
+        return self._assignments
+
+    # Whether the csv files have been read
+    @property
+    def ingested(self):
+        return self._assignments is not None
+
+    # This method streams the assignments: the ones already read, or else straight from the csv files,
+    # without keeping them
+    def iter_assignments(self):
+        if self._assignments is not None:
+            return iter(self._assignments)
+        return iter_assignments(self.csv_files)
+
+    # This method records that a stage to come takes the encoded corpora of variants (a list of keyword
+    # dicts) and, with assignments, reads the assignments
+    def expect(self, variants=(), assignments=False):
+        for variant in variants:
+            self._corpus_uses[_variant_key(**variant)] += 1
+        if assignments:
+            self._assignment_uses += 1
+
+    # This method records that a stage is done with what it expected, and drops what no stage to come uses
+    def release(self, variants=(), assignments=False):
+        for variant in variants:
+            key = _variant_key(**variant)
+            self._corpus_uses[key] -= 1
+            if self._corpus_uses[key] <= 0:
+                del self._corpus_uses[key]
+                self._corpora.pop(key, None)
+        if assignments:
+            self._assignment_uses -= 1
+            if self._assignment_uses <= 0:
+                self._assignments = None
+
+    # This method returns the Preprocessor of a variant; all of them share the tokenizer of the pipeline
+    def preprocessor(self, remove_stopwords=False, stem=False, remove_english=False):
+        key = _variant_key(remove_stopwords, stem, remove_english)
+        if key not in self._preprocessors:
+            self._preprocessors[key] = Preprocessor(remove_stopwords=remove_stopwords, stem=stem,
+                                                    remove_english=remove_english, tokenizer=self.tokenizer)
+        return self._preprocessors[key]
+
+    # This method opens the disk cache of a preprocessor, or nothing without a cache path
+    def _disk_cache(self, preprocessor):
+        if self.cache_path is None:
+            return contextlib.nullcontext()
+        return TranscriptCache(self.cache_path, preprocessor.fingerprint())
+
+    # This method returns the tokenize function for process_many: a memo of the raw tokens shared with the
+    # other variants while two or more expected ones are still to be built, else None (the preprocessor's own)
+    def _shared_tokenize(self):
+        unbuilt = [key for key in self._corpus_uses if key not in self._corpora]
+        if self._raw_tokens is None and len(unbuilt) >= 2:
+            self._raw_tokens = _RawTokens(self.preprocessor().tokenize)
+        return self._raw_tokens.__getitem__ if self._raw_tokens is not None else None
+
+    # This method preprocesses some assignments (e.g. the new ones of the incremental mode) on their own,
+    # one token list per assignment. With a cache path, the transcripts the cache holds are not processed
+    def preprocess(self, assignments, **variant):
+        preprocessor = self.preprocessor(**variant)
+        texts = [entry.transcript for entry in assignments]
+        if self.cache_path is None and self.workers > 1:
+            return parallel_token_lists(texts, preprocessor, self.workers, self.chunk_size)
+        with self._disk_cache(preprocessor) as disk_cache:
+            return preprocessor.process_many(texts, disk_cache)
+
+    # This method returns the transcripts of every assignment preprocessed by a variant and encoded as int32
+    # ids of one shared Vocabulary. The token lists stream into the corpus a batch at a time, never kept
+    def encoded_corpus(self, **variant):
+        key = _variant_key(**variant)
+        if key not in self._corpora:
+            preprocessor = self.preprocessor(**variant)
+            # Kept for the stages that read the assignments, else streamed from the csv files
+            assignments = self.assignments if self._assignment_uses > 0 else self.iter_assignments()
+            texts = (entry.transcript for entry in assignments)
+            with profiling.section(f"preprocess {_variant_name(**variant)}") as section:
+                if self.cache_path is None and self.workers > 1:
+                    # Preprocessed and encoded in the workers, straight from the texts
+                    corpus = parallel_encoded_corpus(texts, preprocessor, self.workers, self.chunk_size)
+                else:
+                    tokenize = self._shared_tokenize()
+                    with self._disk_cache(preprocessor) as disk_cache:
+                        corpus = EncodedCorpus.from_token_lists(
+                            preprocessor.iter_process(texts, disk_cache=disk_cache, tokenize=tokenize))
+                section.add_items(len(corpus))
+            self._corpora[key] = corpus
+            # The shared raw tokens go once every expected variant is built
+            if all(other in self._corpora for other in self._corpus_uses):
+                self._raw_tokens = None
+        return self._corpora[key]
+
+# Base class of the stages. add_arguments adds the stage's options to the parser (standalone: the stage is
+# the whole script, so its options need no prefix); prepare checks them and opens the outputs before any
+# data is read, so a mistake is reported before the long work; run does the work on the Pipeline
+class Stage(abc.ABC):
+    name = None
+
+    def add_arguments(self, parser, standalone=False):
+        pass
+
+    def prepare(self, parser, args):
+        pass
+
+    # This method returns what run takes from the pipeline: the variants whose encoded corpus it uses and
+    # whether it reads the assignments (see Pipeline.expect)
+    def needs(self, args):
+        return [], False
+
+    @abc.abstractmethod
+    def run(self, pipeline, args):
+        pass
+
+# The corpus statistics of corpus_statistics.py: size, TTR, Zipf exponent and plot, most/least common words
+class CorpusStatisticsStage(Stage):
+    name = "corpus-stats"
+    # Lowercase, remove punctuation and stopwords, and filter out English words
+    variant = {"remove_stopwords": True, "remove_english": True}
+
+    def add_arguments(self, parser, standalone=False):
+        parser.add_argument("--zipf-plot", metavar="PATH",
+                            help="where to save the Zipf plot (default: named after the input, e.g. structured.png, "
+                                 "batch.png for --csv Data/batch.csv)")
+        parser.add_argument("--no-plot", action="store_true", help="only fit the Zipf exponent, do not plot")
+        parser.add_argument("--zipf-fit", choices=FIT_METHODS, default="lsq",
+                            help="least squares on the log-log plot, maximum likelihood, or a least squares "
+                                 "Zipf-Mandelbrot fit with a rank offset (default: lsq)")
+        self.state_option = "--state" if standalone else "--corpus-state"
+        parser.add_argument(self.state_option, dest="corpus_state", metavar="PATH",
+                            help="incremental mode: keep the frequency table in this file, so a run only "
+                                 "preprocesses and counts the AssignmentIds it has not seen")
+        parser.add_argument("--export-corpus", metavar="DIR",
+                            help="also save the preprocessed corpus (vocabulary, int32 ids and offsets) to DIR")
+        parser.add_argument("--load-corpus", metavar="DIR",
+                            help="compute the statistics from a corpus saved with --export-corpus instead of "
+                                 "reading and preprocessing the csv files")
+        parser.add_argument("--approximate", action="store_true",
+                            help="approximate mode in fixed memory for corpora whose frequency table does not fit: "
+                                 "HyperLogLog number of types and TTR, Count-Min estimates of the most common "
+                                 "words, with their error bounds; no Zipf fit and no least common words")
+        parser.add_argument("--hll-precision", type=int, default=14, metavar="P",
+                            help="approximate mode: 2^P HyperLogLog registers, relative standard error "
+                                 "1.04/sqrt(2^P) (default: 14, 0.81%%)")
+        parser.add_argument("--cms-epsilon", type=float, default=1e-4,
+                            help="approximate mode: the word counts overestimate by at most epsilon * corpus size "
+                                 "(default: 0.0001)")
+        parser.add_argument("--cms-delta", type=float, default=0.01,
+                            help="approximate mode: probability that a count exceeds that bound (default: 0.01)")
+        parser.add_argument("--heavy-hitters", type=int, default=1000, metavar="K",
+                            help="approximate mode: candidate most common words kept (default: 1000)")
+
+    def prepare(self, parser, args):
+        corpus_options = [option for option, value in (("--export-corpus", args.export_corpus),
+                                                       ("--load-corpus", args.load_corpus),
+                                                       (self.state_option, args.corpus_state),
+                                                       ("--approximate", args.approximate or None)) if value is not None]
+        if len(corpus_options) > 1:
+            parser.error(f"{' and '.join(corpus_options)} cannot be combined")
+        if args.approximate:
+            from sketches import MAX_PRECISION, MIN_PRECISION
+
+            if not MIN_PRECISION <= args.hll_precision <= MAX_PRECISION:
+                parser.error(f"--hll-precision must be between {MIN_PRECISION} and {MAX_PRECISION}")
+            if not 0 < args.cms_epsilon < 1 or not 0 < args.cms_delta < 1:
+                parser.error("--cms-epsilon and --cms-delta must be between 0 and 1")
+            if args.heavy_hitters < 5:
+                parser.error("--heavy-hitters must be at least 5, the number of most common words printed")
+        # A saved corpus is already preprocessed: the preprocessing options would be silently ignored, unless
+        # another stage of the run reads the csv files
+        other_stages = set(getattr(args, "stages", ())) - {self.name}
+        if args.load_corpus is not None and not other_stages:
+            ignored = [option for option, value in (("--tokenizer", args.tokenizer), ("--cache", args.cache),
+                                                    ("--preprocess-workers", args.preprocess_workers != 1 or None))
+                       if value is not None]
+            if ignored:
+                parser.error(f"--load-corpus reads an already preprocessed corpus; {', '.join(ignored)} cannot be "
+                             "used with it")
+
+    # This method warns on stderr when a saved corpus was preprocessed otherwise than this stage would now
+    # preprocess the csv files with the tokenizer it was saved with (other stopwords, word list or rules)
+    def check_saved_corpus(self, saved, directory):
+        if saved.fingerprint is None or saved.tokenizer is None:
+            print(f"Warning: {directory} does not record how it was preprocessed, it cannot be checked", file=sys.stderr)
+            return
+        try:
+            fingerprint = Preprocessor(tokenizer=saved.tokenizer, **self.variant).fingerprint()
+        except resources.MissingResourceError as error:
+            print(f"Warning: {directory} cannot be checked against the current preprocessing: {error}",
+                  file=sys.stderr)
+            return
+        if fingerprint != saved.fingerprint:
+            print(f"Warning: {directory} was preprocessed with other settings than the current ones (fingerprint "
+                  f"{saved.fingerprint}, now {fingerprint}); its statistics may differ from a run on the csv files",
+                  file=sys.stderr)
+
+    def needs(self, args):
+        # The approximate mode streams the assignments, a saved corpus needs nothing from the pipeline
+        if args.approximate or args.load_corpus is not None:
+            return [], False
+        if args.corpus_state is not None:
+            return [], True
+        return [self.variant], False
+
+    def run(self, pipeline, args):
+        from corpus_statistics import (calculate_token_to_type_ratio, calculate_zipfs_law, least_common_words,
+                                       most_common_words)
+        from corpus_stats import CorpusStats
+
+        if args.approximate:
+            self.run_approximate(pipeline, args)
+            return
+
+        # The transcripts are encoded once as token ids; one bincount over them gives the frequency table
+        # that holds everything the statistics below need
+        if args.load_corpus is not None:
+            # The saved ids are mapped from disk and counted; no csv file is read
+            with profiling.section("load corpus"):
+                saved = load_corpus(args.load_corpus)
+                self.check_saved_corpus(saved, args.load_corpus)
+                corpus = saved.stats()
+        elif args.corpus_state is None:
+            encoded = pipeline.encoded_corpus(**self.variant)
+            if args.export_corpus is not None:
+                with profiling.section("export corpus") as section:
+                    preprocessor = pipeline.preprocessor(**self.variant)
+                    save_corpus(encoded, args.export_corpus, preprocessor.fingerprint(), preprocessor.tokenizer)
+                    section.add_items(encoded.num_tokens)
+            corpus = encoded.stats()
+        else:
+            # Incremental mode: only the new assignments are counted and added to the stored table
+            preprocessor = pipeline.preprocessor(**self.variant)
+            with open_state(args.corpus_state, f"corpus|{preprocessor.fingerprint()}") as state:
+                new_data = state.new_assignments(pipeline.assignments)
+                new_counts = EncodedCorpus.from_token_lists(pipeline.preprocess(new_data, **self.variant)).stats().counts
+                state.add_assignments(new_data)
+                state.add_token_counts(new_counts)
+                state.commit()
+                corpus = CorpusStats(state.token_counts())
+            print(f"Incremental: {len(new_data)} new assignments")
+        # print the size of the corpus
+        print("Corpus Size:", corpus.size)
+
+        # calculate the TTR
+        token_to_type_ratio = calculate_token_to_type_ratio(corpus)
+        print(f"Token-to-Type Ratio (TTR): {token_to_type_ratio:.2f}")
+
+        # cacluclate Zipf's law
+        zipf_plot = args.zipf_plot or default_zipf_plot(args)
+        zipf_exponent = calculate_zipfs_law(corpus, plot=not args.no_plot, output_path=zipf_plot,
+                                            method=args.zipf_fit)
+        print(f"Zipf exponent ({args.zipf_fit}): {zipf_exponent:.3f}")
+
+        # Find and print the top 5 common words
+        print("Most appeared words")
+        for word, count in most_common_words(corpus, num_words=5):
+            print(f'{word}: {count}')
+
+        # Find and print the bottom 5 common words
+        print("Least appeared words")
+        for word, count in least_common_words(corpus, num_words=5):
+            print(f'{word}: {count}')
+
+        # Print the number of unique words in the corpus
+        print("Number of distinct words:")
+        print(corpus.num_types)
+
+    # Approximate mode: the transcripts stream from the csv files into fixed-size sketches, and every
+    # estimate is printed with its error bound
+    def run_approximate(self, pipeline, args):
+        from corpus_statistics import calculate_token_to_type_ratio, create_approximate_stats, most_common_words
+
+        corpus = create_approximate_stats(pipeline.iter_assignments(), pipeline.preprocessor(**self.variant),
+                                          workers=pipeline.workers, chunk_size=pipeline.chunk_size,
+                                          precision=args.hll_precision, epsilon=args.cms_epsilon,
+                                          delta=args.cms_delta, heavy_hitters=args.heavy_hitters)
+        # Two standard errors: the estimates are within this with about 95% probability
+        type_error = 2 * corpus.type_error
+        print(f"Approximate mode: {len(corpus.types.registers)} HyperLogLog registers, Count-Min sketch "
+              f"{corpus.frequencies.depth} x {corpus.frequencies.width}, {corpus.heavy_hitters} heavy hitters "
+              f"({corpus.nbytes / 2**20:.1f} MiB)")
+        print("Corpus Size:", corpus.size)
+
+        token_to_type_ratio = calculate_token_to_type_ratio(corpus)
+        print(f"Token-to-Type Ratio (TTR): {token_to_type_ratio:.2f} (±{type_error:.1%} at 95%)")
+        print("Zipf exponent: not computed in approximate mode")
+
+        print(f"Most appeared words (counts overestimate by at most {corpus.count_error:.0f} "
+              f"with probability {1 - corpus.count_error_probability:.0%})")
+        for word, count in most_common_words(corpus, num_words=5):
+            print(f'{word}: {count}')
+        print("Least appeared words: not available in approximate mode")
+
+        print("Number of distinct words:")
+        print(f"{corpus.num_types} (±{type_error:.1%} at 95%)")
+
+# The pairwise similarity of inter-transcriber_similarity.py: every pair of transcripts of an audio file,
+# optionally with WER/CER, in threshold mode or incrementally, written to the result sinks
+class SimilarityStage(Stage):
+    name = "similarity"
+    # Lowercase and remove punctuation; stopwords stay in for the similarity
+    variant = {"remove_stopwords": False}
+
+    def add_arguments(self, parser, standalone=False):
+        parser.add_argument("--workers", type=_positive_int, default=1,
+                            help="number of processes the audio files are spread across (default: 1)")
+        parser.add_argument("--error-rates", action="store_true",
+                            help="also report WER, CER and the substitutions/insertions/deletions of every pair")
+        parser.add_argument("--alignments", metavar="PATH",
+                            help="write the word alignment of every pair to this file (implies --error-rates)")
+        parser.add_argument("--below", type=float, metavar="THRESHOLD",
+                            help="threshold mode: only list the pairs whose similarity is below THRESHOLD, deciding "
+                                 "most pairs with cheap bounds instead of a full Levenshtein")
+        self.state_option = "--state" if standalone else "--similarity-state"
+        parser.add_argument(self.state_option, dest="similarity_state", metavar="PATH",
+                            help="incremental mode: keep the assignments and pair similarities in this file, so a "
+                                 "run only processes new AssignmentIds and compares the pairs they create")
+        add_sink_arguments(parser)
+
+    def prepare(self, parser, args):
+        if args.below is not None and (args.error_rates or args.alignments):
+            parser.error("--below cannot be combined with --error-rates or --alignments, which need every alignment")
+        if args.similarity_state is not None and (args.below is not None or args.error_rates or args.alignments):
+            parser.error(f"{self.state_option} only keeps similarities; it cannot be combined with --below, "
+                         "--error-rates or --alignments")
+
+        # The rows go to the results file (--format, --output) and, unless --quiet, to the console. Only
+        # checked here, so a missing optional package (pyarrow) is reported before the long work; the file
+        # is opened once the results are ready, and a failed run leaves an earlier results file untouched
+        try:
+            check_sinks(args)
+        except (ImportError, ValueError) as error:
+            parser.error(str(error))
+
+    def needs(self, args):
+        if args.similarity_state is not None:
+            return [], True
+        return [self.variant], True
+
+    def run(self, pipeline, args):
+        stored_data = pipeline.assignments
+
+        # In incremental mode only the assignments the state has not seen yet are processed
+        state = None
+        if args.similarity_state is not None:
+            preprocessor = pipeline.preprocessor(**self.variant)
+            state = open_state(args.similarity_state, f"similarity v{SIMILARITY_VERSION}|{preprocessor.fingerprint()}")
+            stored_data = state.new_assignments(stored_data)
+            corpus = EncodedCorpus.from_token_lists(pipeline.preprocess(stored_data, **self.variant))
+        else:
+            # Every transcript is encoded once as int32 ids of one shared vocabulary; word-level work runs on the ids
+            corpus = pipeline.encoded_corpus(**self.variant)
+        # The character-level work runs on the tokens joined with spaces
+        preprocessed_transcripts = [corpus.text(index) for index in range(len(corpus))]
+
+        audio_url_to_transcripts = {}
+        audio_url_to_ids = {}
+        audio_url_to_workers = {}
+
+        for index, (entry, preprocessed_transcript) in enumerate(zip(stored_data, preprocessed_transcripts)):
+            audio_url = entry.audio_url
+
+            if audio_url not in audio_url_to_transcripts:
+                audio_url_to_transcripts[audio_url] = []
+                audio_url_to_ids[audio_url] = []
+                audio_url_to_workers[audio_url] = []
+            audio_url_to_transcripts[audio_url].append(preprocessed_transcript)
+            audio_url_to_ids[audio_url].append(corpus[index])
+            audio_url_to_workers[audio_url].append(entry.worker_id)
+
+        # With --workers the audio files are shared out across processes, the output order stays the same
+        error_rates = None
+        below_threshold = None
+        if state is not None:
+            # Only the new pairs are compared; the results are written from the state, old pairs included
+            new_pairs = update_pair_scores(state, stored_data, preprocessed_transcripts, args.workers)
+            state.commit()
+            audio_url_to_transcripts = {}
+            audio_url_to_workers = {}
+            similarities = {}
+            for audio_url in state.audio_urls():
+                audio_url_to_workers[audio_url], audio_url_to_transcripts[audio_url] = state.transcripts(audio_url)
+                similarities[audio_url] = state.pair_scores(audio_url)
+            state.close()
+            print(f"Incremental: {len(stored_data)} new assignments, {new_pairs} new pairs compared")
+        elif args.below is not None:
+            # Threshold mode: a pair is only known to be below or not, most of them from cheap bounds
+            below_threshold, pruning_stats = parallel_below_threshold(audio_url_to_transcripts, args.below, args.workers)
+        elif args.error_rates or args.alignments:
+            # The edit counts of every pair at word level over token ids and at character level give WER, CER
+            # and the operation counts; the word alignments are only kept when they are written out
+            error_rates = parallel_error_rates(audio_url_to_transcripts, audio_url_to_ids, args.workers,
+                                               alignments=args.alignments is not None)
+            similarities = {audio_url: [pair.similarity for pair in pairs] for audio_url, pairs in error_rates.items()}
+        else:
+            # All pairwise similarities are calculated in one batch, one condensed vector per audio file
+            similarities = parallel_similarity_matrices(audio_url_to_transcripts, args.workers)
+
+        fields = PAIR_FIELDS
+        if args.below is not None:
+            fields += THRESHOLD_FIELDS
+        elif args.error_rates or args.alignments:
+            fields += ERROR_RATE_FIELDS
+        with profiling.section("write results"), open_sinks(args, fields) as sink, contextlib.ExitStack() as stack:
+            alignment_file = stack.enter_context(open(args.alignments, "w")) if args.alignments else None
+            # Iterate over the audio files and the transcripts associated with them
+            for audio_url, transcripts in audio_url_to_transcripts.items():
+                # Get the audio name from the whole url
+                audio_name = extract_audio_name(audio_url)
+                workers = audio_url_to_workers[audio_url]
+                sink.begin_audio(audio_name)
+
+                # The condensed vector holds the pairs in the order i < j, row by row
+                k = 0
+                for i in range(len(transcripts)):
+                    for j in range(i + 1, len(transcripts)):
+                        k += 1
+                        row = {"audio_name": audio_name, "transcript_i": i + 1, "transcript_j": j + 1,
+                               "worker_i": workers[i], "worker_j": workers[j]}
+
+                        if below_threshold is not None:
+                            # Only the pairs below the threshold are written, without an exact similarity
+                            if below_threshold[audio_url][k - 1]:
+                                row["similarity"] = None
+                                row["below"] = args.below
+                                sink.write(row)
+                            continue
+                        row["similarity"] = float(similarities[audio_url][k - 1])
+
+                        if error_rates is not None:
+                            # Transcript i is the reference, transcript j the hypothesis
+                            pair = error_rates[audio_url][k - 1]
+                            words, characters = pair.words, pair.characters
+                            row.update(wer=pair.wer, word_substitutions=words.substitutions,
+                                       word_insertions=words.insertions, word_deletions=words.deletions,
+                                       reference_words=words.reference_length,
+                                       cer=pair.cer, char_substitutions=characters.substitutions,
+                                       char_insertions=characters.insertions, char_deletions=characters.deletions,
+                                       reference_chars=characters.reference_length)
+                        sink.write(row)
+
+                        if alignment_file is not None:
+                            ids = audio_url_to_ids[audio_url]
+                            reference_tokens = corpus.vocabulary.decode(ids[i])
+                            hypothesis_tokens = corpus.vocabulary.decode(ids[j])
+                            alignment_file.write(f"{audio_name}: Transcript {i+1} (REF) and Transcript {j+1} (HYP)\n")
+                            alignment_file.write(format_alignment(pair.words, reference_tokens, hypothesis_tokens) + "\n\n")
+                sink.end_audio()
+
+        if below_threshold is not None:
+            print(f"Pruning: {pruning_stats}")
+
+# The stages by name
+STAGES = {"corpus-stats": CorpusStatisticsStage, "similarity": SimilarityStage}
+
+# This method adds the options every stage shares: which csv files to read and how to tokenize them
+def add_pipeline_arguments(parser):
+    parser.add_argument("--corpus", choices=sorted(CORPORA), default=DEFAULT_CORPUS,
+                        help=f"which corpus of the data directory to analyse (default: {DEFAULT_CORPUS})")
+    parser.add_argument("--data-dir", metavar="DIR", default=DEFAULT_DATA_DIR,
+                        help=f"directory with the csv exports (default: {DEFAULT_DATA_DIR})")
+    parser.add_argument("--csv", action="append", metavar="FILE", dest="csv_files",
+                        help="read this csv export instead of the files of --corpus (repeat for several files)")
+    parser.add_argument("--tokenizer", choices=sorted(TOKENIZERS),
+                        help="nltk word_tokenize, or the faster regex tokenizer, which agrees with it on almost every "
+                             f"token but is not byte-identical (see benchmarks/check_tokenizer.py; default: "
+                             f"{DEFAULT_TOKENIZER})")
+    parser.add_argument("--cache", metavar="PATH",
+                        help="keep preprocessed transcripts in this cache file between runs")
+    parser.add_argument("--nltk-data", metavar="DIR",
+                        help=f"local directory with the NLTK data (default: ${resources.DATA_PATH_ENV} or NLTK's own paths)")
+    parser.add_argument("--preprocess-workers", type=_positive_int, default=1, metavar="N",
+                        help="preprocess in a pool of N processes, each with its own stopword set and lexicon "
+                             "(default: 1, in this process; not used with --cache). With N > 1 the tokenization "
+                             "is not shared: every preprocessing variant tokenizes all the texts again")
+    parser.add_argument("--chunk-size", type=_positive_int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"transcripts sent to a preprocessing worker at a time (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="write the wall time, CPU time, items and peak memory of every stage and hot function, "
+                             "and the DP cells computed, to this JSON report")
+    parser.add_argument("--profile-no-memory", action="store_true",
+                        help="with --profile, do not trace memory (tracemalloc slows allocations down)")
+
+# This method starts profiling if --profile was given
+def start_profile(args):
+    if args.profile:
+        profiling.enable(trace_memory=not args.profile_no_memory)
+
+# This method writes the --profile report and prints its summary to stderr
+def finish_profile(args):
+    profiler = profiling.disable()
+    if profiler is not None:
+        profiling.write_report(profiler, args.profile)
+        print(profiling.format_report(profiler), file=sys.stderr)
+        print(f"Profile written to {args.profile}", file=sys.stderr)
+
+# This method parses the command line and runs the stages: stage_names for a script that runs fixed stages,
+# or None for the stages named on the command line. Every stage is prepared first, then the csv files are
+# read and tokenized once for all of them
+def main(parser, stage_names=None):
+    standalone = stage_names is not None
+    add_pipeline_arguments(parser)
+    if not standalone:
+        parser.add_argument("stages", nargs="+", choices=list(STAGES), metavar="STAGE",
+                            help=f"stages to run, in order: {', '.join(STAGES)}")
+    stages = {name: STAGES[name]() for name in (stage_names or STAGES)}
+    for stage in stages.values():
+        stage.add_arguments(parser, standalone)
+    args = parser.parse_args()
+
+    selected = [stages[name] for name in dict.fromkeys(stage_names or args.stages)]
+    for stage in selected:
+        stage.prepare(parser, args)
+    # Left unset until the stages checked whether it was given
+    args.tokenizer = args.tokenizer or DEFAULT_TOKENIZER
+
+    # The NLTK data is read from a local directory, never downloaded
+    if args.nltk_data:
+        resources.set_data_path(args.nltk_data)
+
+    start_profile(args)
+    pipeline = Pipeline(args.csv_files or corpus_files(args.corpus, args.data_dir), args.tokenizer, args.cache,
+                        args.preprocess_workers, args.chunk_size)
+    needs = [stage.needs(args) for stage in selected]
+    for variants, assignments in needs:
+        pipeline.expect(variants, assignments)
+    try:
+        for stage, (variants, assignments) in zip(selected, needs):
+            with profiling.section(stage.name) as section:
+                stage.run(pipeline, args)
+                # A stage working from a saved corpus (--load-corpus) or streaming the csv files keeps no
+                # assignment, so it counts none
+                if pipeline.ingested:
+                    section.add_items(len(pipeline.assignments))
+            # What no stage to come uses is dropped
+            pipeline.release(variants, assignments)
+    except resources.MissingResourceError as error:
+        # A missing NLTK resource is a setup problem: the message says how to install it, no traceback needed
+        parser.exit(1, f"{parser.prog}: error: {error}\n")
+    finish_profile(args)
+    return pipeline
+
+if __name__ == "__main__":
+    main(argparse.ArgumentParser(description="Read and tokenize a corpus once and run the analysis stages on it"))
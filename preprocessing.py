@@ -0,0 +1,193 @@
+# This python file holds the text preprocessing shared by the corpus and similarity scripts
+import hashlib
+import re
+from functools import lru_cache
+
+import profiling
+import resources
+from lexicon import load_english_lexicon
+
+# Regex tokenizer: one precompiled pattern that finds the tokens of word_tokenize that survive the
+# isalnum() filter, i.e. runs of letters and digits that the Treebank rules split off from their
+# neighbours. It has no sentence splitter, so it treats every ". " as a sentence end and keeps "Mr", "Dr"
+# and initials that Punkt leaves as "Mr." (dropped by the filter); tests/test_tokenizer.py pins the
+# known cases and benchmarks/check_tokenizer.py measures the agreement on real transcripts.
+# Whitespace and the characters word_tokenize always splits on separate tokens
+_SEPARATORS = r"""\s;@#$%&?!*()\[\]{}<>"«»“”‘’„`\u2012-\u2015"""
+# What may follow a token: a separator, "--", "''", an ellipsis, a comma or colon not followed by a
+# digit (1,000 stays one token), or a sentence-final period
+_TOKEN_END = r"""(?:$|[""" + _SEPARATORS + r"""]|--|''|\.\.|[,:](?!\d)|\.[\])}>"'»”’]*(?:\s|$))"""
+# What may precede a token: the same, or an opening single quote that does not start a clitic ('s, 're...)
+_TOKEN_START = (r"""(?:^|(?<=[""" + _SEPARATORS + r"""])|(?<=(?<!-)--)|(?<='')|(?<=\.\.)|(?<=[,:])(?=\D)"""
+                r"""|(?<=(?<!\w)')(?!(?i:re|ve|ll|m|t|s|d|n)\b))""")
+_TOKEN_RE = re.compile(
+    _TOKEN_START
+    # A word, possibly followed by a clitic that word_tokenize splits off ('s, 'll, 're, 've, 'm, 'd)
+    + r"(?:[^\W_]+(?=" + _TOKEN_END + r"|'(?:[sSmMdD]|ll|LL|re|RE|ve|VE)?" + _TOKEN_END + r")"
+    # or the word in front of n't (don't -> do)
+    + r"|[^\W_]+?(?=(?:n't|N'T)" + _TOKEN_END + r"))")
+
+# Words word_tokenize splits in two, and where
+_SPLIT_WORDS = {"cannot": 3, "gimme": 3, "gonna": 3, "gotta": 3, "lemme": 3, "wanna": 3}
+
+# This method tokenizes text like word_tokenize followed by the isalnum() filter, without NLTK
+def regex_tokenize(text):
+    tokens = []
+    for token in _TOKEN_RE.findall(text):
+        split = _SPLIT_WORDS.get(token.lower())
+        if split is None:
+            tokens.append(token)
+        else:
+            tokens.append(token[:split])
+            tokens.append(token[split:])
+    return tokens
+
+# This method returns the tokenize function of a backend, importing NLTK only when it is used
+def _load_tokenizer(name):
+    if name == "regex":
+        return regex_tokenize
+    resources.require("punkt")
+    from nltk.tokenize import word_tokenize
+    return word_tokenize
+
+# The tokenizer backends a Preprocessor can use
+TOKENIZERS = ("nltk", "regex")
+
+# Bump whenever the tokenizing or normalizing rules change, so results cached on disk are not reused
+PREPROCESSING_VERSION = 1
+
+# Reusable preprocessing pipeline: tokenize (with NLTK's word_tokenize or the faster regex tokenizer),
+# lowercase, drop punctuation and (optionally) stopwords, stem, and drop English words. The stopword
+# set and the stemmer are built once per Preprocessor, and the per-token work is memoized in an LRU
+# cache because transcripts repeat the same words over and over. English words are dropped with the
+# prebuilt lexicon index, a frozenset loaded from disk
+class Preprocessor:
+    def __init__(self, remove_stopwords=True, stem=False, remove_english=False, tokenizer="nltk",
+                 cache_size=100000, lexicon_path=None):
+        if tokenizer not in TOKENIZERS:
+            raise ValueError(f"Unknown tokenizer {tokenizer!r}, expected one of {sorted(TOKENIZERS)}")
+        self.tokenizer = tokenizer
+        self._tokenize = _load_tokenizer(tokenizer)
+        self.remove_stopwords = remove_stopwords
+        self.stem = stem
+        self.remove_english = remove_english
+
+        self.stop_words = frozenset()
+        if remove_stopwords:
+            resources.require("stopwords")
+            from nltk.corpus import stopwords
+            self.stop_words = frozenset(stopwords.words('english'))
+
+        self.lexicon_path = lexicon_path
+        self.lexicon = None
+        if remove_english:
+            self.lexicon = load_english_lexicon(lexicon_path)
+
+        self.stemmer = None
+        if stem:
+            from nltk.stem import PorterStemmer
+            self.stemmer = PorterStemmer()
+
+        self.cache_size = cache_size
+        self._normalize = lru_cache(maxsize=cache_size)(self._normalize_token)
+        self._fingerprint = None
+
+    # This method lowercases, filters and stems one token; None means the token is dropped
+    # English words are not dropped here but per batch, see _remove_english
+    def _normalize_token(self, token):
+        token = token.lower()
+
+        # Remove punctuation and stopwords
+        if not token.isalnum() or token in self.stop_words:
+            return None
+
+        if self.stemmer is not None:
+            token = self.stemmer.stem(token)
+
+        return token
+
+    # This method normalizes the raw tokens of one transcript, before the English filter
+    def _normalize_tokens(self, raw_tokens):
+        normalize = self._normalize
+        tokens = []
+        for token in raw_tokens:
+            token = normalize(token)
+            if token is not None:
+                tokens.append(token)
+        return tokens
+
+    # This method tokenizes and normalizes one transcript, before the English filter
+    def _normalize_text(self, text):
+        return self._normalize_tokens(self._tokenize(text))
+
+    # This method drops the English words from a batch of token lists
+    @profiling.profiled("preprocessing.remove_english", items=lambda self, token_lists: len(token_lists))
+    def _remove_english(self, token_lists):
+        if self.lexicon is None:
+            return token_lists
+        english_words = self.lexicon.words
+        return [[token for token in tokens if token not in english_words] for tokens in token_lists]
+
+    # This method preprocesses one transcript into its list of tokens
+    def process(self, text):
+        return self._remove_english([self._normalize_text(text)])[0]
+
+    # This method preprocesses a batch of transcripts, returning one token list per transcript
+    # With a TranscriptCache only the transcripts it has not seen under this configuration are processed
+    # With tokenize, a function returning the raw tokens of a text, the transcripts are split with it instead
+    # of the tokenizer, so several configurations with the same tokenizer can share one tokenization (a memo)
+    @profiling.profiled("preprocessing.process_many")
+    def process_many(self, texts, disk_cache=None, tokenize=None):
+        if disk_cache is None:
+            tokenize = tokenize or self._tokenize
+            normalize_tokens = self._normalize_tokens
+            return self._remove_english([normalize_tokens(tokenize(text)) for text in texts])
+
+        texts = list(texts)
+        cached = disk_cache.get_many(texts)
+        new_texts = [text for text in dict.fromkeys(texts) if text not in cached]
+        missing = dict(zip(new_texts, self.process_many(new_texts, tokenize=tokenize)))
+        disk_cache.put_many(missing)
+        return [cached[text] if text in cached else missing[text] for text in texts]
+
+    # This method returns the raw tokens of one transcript, as the tokenizer splits it
+    def tokenize(self, text):
+        return self._tokenize(text)
+
+    # This method preprocesses transcripts lazily, batch_size at a time, yielding one token list per transcript
+    # Memory stays bounded by the batch while the English filter still runs once per batch; disk_cache and
+    # tokenize are passed on to process_many
+    def iter_process(self, texts, batch_size=1000, disk_cache=None, tokenize=None):
+        batch = []
+        for text in texts:
+            batch.append(text)
+            if len(batch) == batch_size:
+                yield from self.process_many(batch, disk_cache, tokenize)
+                batch = []
+        if batch:
+            yield from self.process_many(batch, disk_cache, tokenize)
+
+    # This method returns a hash of everything that affects the output: the rules version, the tokenizer,
+    # the stopword list, the stemmer and the English lexicon. It is the disk cache key of this configuration
+    def fingerprint(self):
+        if self._fingerprint is None:
+            digest = hashlib.sha1()
+            digest.update(f"v{PREPROCESSING_VERSION}|{self.tokenizer}|".encode())
+            if self.tokenizer == "nltk":
+                import nltk
+                digest.update(f"nltk {nltk.__version__}|".encode())
+            digest.update(("stopwords:" + " ".join(sorted(self.stop_words)) + "|").encode())
+            if self.stemmer is not None:
+                digest.update(f"stemmer:{type(self.stemmer).__name__}:{self.stemmer.mode}|".encode())
+            if self.lexicon is not None:
+                digest.update(f"english:{self.lexicon.digest}".encode())
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    # This method returns the hits, misses, maxsize and currsize of the token cache
+    def cache_info(self):
+        return self._normalize.cache_info()
+
+    # This method empties the token cache and resets its counters
+    def cache_clear(self):
+        self._normalize.cache_clear()
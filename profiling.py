@@ -0,0 +1,233 @@
+# This python file is the opt-in instrumentation of the scripts (--profile PATH): wall time, CPU time,
+# items processed and peak traced memory per stage and per hot function, and counters such as the DP
+# cells the edit distances compute, written as a JSON report. Profiling is off unless enable() is called;
+# then every hook is one check of a module global, so the instrumented code runs at full speed
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# The running Profiler, None while profiling is off
+_profiler = None
+
+# The timings of one named section (a stage or a function), summed over its calls
+class SectionRecord:
+    __slots__ = ("name", "kind", "calls", "wall_seconds", "cpu_seconds", "items", "peak_memory")
+
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+        self.calls = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.items = 0
+        # Largest traced memory while the section ran, in bytes (None without memory tracing)
+        self.peak_memory = None
+
+    def as_dict(self):
+        return {"name": self.name, "kind": self.kind, "calls": self.calls, "wall_seconds": self.wall_seconds,
+                "cpu_seconds": self.cpu_seconds, "items": self.items,
+                "items_per_second": self.items / self.wall_seconds if self.items and self.wall_seconds else None,
+                "peak_memory_bytes": self.peak_memory}
+
+# This method returns the CPU time of the process and of its finished child processes (e.g. the workers
+# of a process pool, once it is shut down)
+def _cpu_time():
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+# One running section; add_items() counts the items it processed
+class _Section:
+    __slots__ = ("profiler", "record", "wall_start", "cpu_start", "peak")
+
+    def __init__(self, profiler, record):
+        self.profiler = profiler
+        self.record = record
+
+    def add_items(self, count):
+        self.record.items += count
+
+    def __enter__(self):
+        self.profiler._enter(self)
+        self.wall_start = time.perf_counter()
+        self.cpu_start = _cpu_time()
+        return self
+
+    def __exit__(self, *exc_info):
+        record = self.record
+        record.wall_seconds += time.perf_counter() - self.wall_start
+        record.cpu_seconds += _cpu_time() - self.cpu_start
+        record.calls += 1
+        self.profiler._exit(self)
+
+# What section() returns while profiling is off
+class _NullSection:
+    __slots__ = ()
+
+    def add_items(self, count):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+_NULL_SECTION = _NullSection()
+
+# Collects the sections and counters of one run. With trace_memory, tracemalloc runs for the whole run and
+# every section records the peak traced memory while it ran; tracing slows allocations down, so timings
+# taken without it are the more accurate
+class Profiler:
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.records = {}
+        self.counters = {}
+        self._running = []
+        self._started_tracing = False
+        self._start = time.perf_counter()
+        self._cpu_start = _cpu_time()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    # This method returns a context manager timing the section name (kind "stage" or "function")
+    def section(self, name, kind="stage"):
+        record = self.records.get((kind, name))
+        if record is None:
+            record = self.records[(kind, name)] = SectionRecord(name, kind)
+        return _Section(self, record)
+
+    # The peak of tracemalloc is global, so before it is reset for a new section the peak reached so far
+    # is handed to the sections still running
+    def _enter(self, section):
+        if self.trace_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            for running in self._running:
+                running.peak = max(running.peak, peak)
+            tracemalloc.reset_peak()
+        section.peak = 0
+        self._running.append(section)
+
+    def _exit(self, section):
+        self._running.pop()
+        if self.trace_memory:
+            section.peak = max(section.peak, tracemalloc.get_traced_memory()[1])
+            if self._running:
+                self._running[-1].peak = max(self._running[-1].peak, section.peak)
+            record = section.record
+            record.peak_memory = max(record.peak_memory or 0, section.peak)
+
+    # This method adds value to the counter name
+    def count(self, name, value):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    # This method returns the report as a dict: the totals, the sections in the order they first ran and the counters
+    def report(self):
+        return {
+            "argv": sys.argv,
+            "wall_seconds": time.perf_counter() - self._start,
+            "cpu_seconds": _cpu_time() - self._cpu_start,
+            "trace_memory": self.trace_memory,
+            "sections": [record.as_dict() for record in self.records.values()],
+            "counters": dict(self.counters),
+        }
+
+    # This method stops the memory tracing this profiler started
+    def close(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+# This method turns profiling on for the rest of the run and returns the Profiler
+def enable(trace_memory=True):
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler(trace_memory)
+    return _profiler
+
+# This method turns profiling off and returns the Profiler that ran (None if none did)
+def disable():
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None:
+        profiler.close()
+    return profiler
+
+# This method returns the running Profiler, or None while profiling is off
+def active():
+    return _profiler
+
+# This method is the initializer of the worker processes of a pool; counters tells whether the parent
+# profiles. What a worker inherited from the parent is dropped: its sections would be lost with it and
+# memory tracing slows it down. With counters, a Profiler without memory tracing runs in the worker, so its
+# counters can be sent back with its results (see collect_counters) and added in the parent (add_counters)
+def init_worker(counters=False):
+    disable()
+    if counters:
+        enable(trace_memory=False)
+
+# This method returns the counters counted in this process since the last call, and starts them over;
+# None while profiling is off
+def collect_counters():
+    if _profiler is None:
+        return None
+    counters, _profiler.counters = _profiler.counters, {}
+    return counters
+
+# This method adds counters collected in another process (e.g. a worker, see collect_counters) while
+# profiling is on
+def add_counters(counters):
+    if _profiler is not None and counters:
+        for name, value in counters.items():
+            _profiler.count(name, value)
+
+# This method returns a context manager that times the section name while profiling is on, e.g.
+#     with profiling.section("tokenize") as section:
+#         ...
+#         section.add_items(len(texts))
+def section(name, kind="stage"):
+    if _profiler is None:
+        return _NULL_SECTION
+    return _profiler.section(name, kind)
+
+# This method adds value to the counter name while profiling is on
+def count(name, value):
+    if _profiler is not None:
+        _profiler.count(name, value)
+
+# This method is a decorator timing every call of a function as a "function" section while profiling is on
+# items, if given, is called with the arguments of the call and returns how many items the call processes
+def profiled(name, items=None):
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return function(*args, **kwargs)
+            with _profiler.section(name, "function") as running:
+                if items is not None:
+                    running.add_items(items(*args, **kwargs))
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# This method writes the report of a Profiler to path as JSON
+def write_report(profiler, path):
+    with open(path, "w") as report_file:
+        json.dump(profiler.report(), report_file, indent=2)
+
+# This method returns the report of a Profiler as a text table, the slowest sections first
+def format_report(profiler):
+    report = profiler.report()
+    lines = [f"{'section':<48} {'calls':>7} {'wall s':>9} {'cpu s':>9} {'items':>10} {'peak MiB':>9}"]
+    for record in sorted(report["sections"], key=lambda record: -record["wall_seconds"]):
+        peak = record["peak_memory_bytes"]
+        peak = f"{peak / 2**20:9.1f}" if peak is not None else f"{'-':>9}"
+        lines.append(f"{record['kind'] + ':' + record['name']:<48} {record['calls']:>7} {record['wall_seconds']:>9.3f} "
+                     f"{record['cpu_seconds']:>9.3f} {record['items']:>10} {peak}")
+    lines.append(f"{'total':<48} {'':>7} {report['wall_seconds']:>9.3f} {report['cpu_seconds']:>9.3f}")
+    for name, value in report["counters"].items():
+        lines.append(f"{name}: {value}")
+    return "\n".join(lines)
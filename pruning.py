@@ -0,0 +1,118 @@
+# This python file decides cheaply, where it can, whether a pair of transcripts is less similar than a
+# threshold, before any Levenshtein is run. Every bound here is exact, never an estimate:
+#   - length: the distance is at least the difference of the lengths
+#   - characters: each edit changes the count of at most one character on each side, so the distance
+#     is at least the number of characters one side has in excess of the other
+#   - q-grams: each edit destroys at most q q-grams of one string and creates at most q of the other,
+#     so the distance is at least the unmatched q-grams of either side divided by q
+#   - upper bound: once a common prefix and suffix are stripped, the distance is at most the longer rest
+# Pairs the bounds do not decide run the bit-parallel Levenshtein with the threshold as its cutoff.
+# A bound is only tried when it can decide the pair and is cheaper than the Levenshtein it may save: short
+# strings go straight to the Levenshtein, and the q-gram bound is skipped at thresholds where the q-grams of
+# the longer string are too few to ever exceed the cutoff. The profiles are built the first time they are used
+from collections import Counter
+
+from levenshtein import levenshtein_distance
+
+# Length of the q-grams of the q-gram bound
+QGRAM_SIZE = 3
+
+# Pairs of strings up to this long skip the character and q-gram bounds: the bit-parallel Levenshtein
+# holds them in one machine word and costs less than comparing their profiles
+SHORT_LENGTH = 64
+
+# Ways a pair can be decided, in the order they are tried
+DECIDED_BY = ("identical", "length", "upper_bound", "characters", "qgrams", "levenshtein")
+
+# The per-transcript data the bounds need, computed once per transcript instead of once per pair, and only
+# for the transcripts a bound is tried on
+class TranscriptProfile:
+    __slots__ = ("text", "_characters", "_qgrams")
+
+    def __init__(self, text):
+        self.text = text
+        self._characters = None
+        self._qgrams = None
+
+    @property
+    def characters(self):
+        if self._characters is None:
+            self._characters = Counter(self.text)
+        return self._characters
+
+    @property
+    def qgrams(self):
+        if self._qgrams is None:
+            text = self.text
+            self._qgrams = Counter(text[i:i + QGRAM_SIZE] for i in range(len(text) - QGRAM_SIZE + 1))
+        return self._qgrams
+
+# This method returns how many more items one multiset has than the other, the larger of both sides
+def _excess(counts_a, counts_b):
+    missing_from_b = sum((counts_a - counts_b).values())
+    missing_from_a = sum((counts_b - counts_a).values())
+    return max(missing_from_a, missing_from_b)
+
+# This method returns the length of the common prefix plus the common suffix of two strings
+def _common_ends(a, b):
+    shortest = min(len(a), len(b))
+    start = 0
+    while start < shortest and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < shortest - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    return start + end
+
+# Counts of how the pairs were decided: every pair not decided by "levenshtein" is a full DP avoided
+class PruningStats:
+    def __init__(self):
+        self.decided_by = dict.fromkeys(DECIDED_BY, 0)
+
+    @property
+    def pairs(self):
+        return sum(self.decided_by.values())
+
+    # Number of pairs no Levenshtein was run for
+    @property
+    def avoided(self):
+        return self.pairs - self.decided_by["levenshtein"]
+
+    # This method adds the counts of another PruningStats, e.g. the result of another shard
+    def merge(self, other):
+        for reason, count in other.decided_by.items():
+            self.decided_by[reason] += count
+        return self
+
+    def __str__(self):
+        decided = ", ".join(f"{reason}: {count}" for reason, count in self.decided_by.items())
+        return f"{self.pairs} pairs decided by {decided}; {self.avoided} Levenshtein computations avoided"
+
+# This method tells whether the similarity of two profiled transcripts is below min_similarity, using
+# the bounds first and the Levenshtein with a cutoff only when they do not decide. stats is updated
+def is_below(profile_a, profile_b, min_similarity, stats=None):
+    a = profile_a.text
+    b = profile_b.text
+    longest = max(len(a), len(b))
+    if a == b:
+        below, reason = False, "identical"
+    else:
+        # The same cutoff as levenshtein_similarity: similar enough when the distance is at most this
+        max_distance = int((1 - min_similarity) * longest + 1e-9)
+        if abs(len(a) - len(b)) > max_distance:
+            below, reason = True, "length"
+        elif longest - _common_ends(a, b) <= max_distance:
+            below, reason = False, "upper_bound"
+        elif longest > SHORT_LENGTH and _excess(profile_a.characters, profile_b.characters) > max_distance:
+            below, reason = True, "characters"
+        # The q-gram excess is at most the longest - QGRAM_SIZE + 1 q-grams of the longer string
+        elif (longest > SHORT_LENGTH and longest - QGRAM_SIZE + 1 > max_distance * QGRAM_SIZE
+              and _excess(profile_a.qgrams, profile_b.qgrams) > max_distance * QGRAM_SIZE):
+            below, reason = True, "qgrams"
+        else:
+            # The bit-parallel Levenshtein itself stops as soon as the distance exceeds the cutoff
+            below, reason = levenshtein_distance(a, b, max_distance) > max_distance, "levenshtein"
+
+    if stats is not None:
+        stats.decided_by[reason] += 1
+    return below
@@ -0,0 +1,81 @@
+# This python file locates the NLTK data the preprocessing needs (the Punkt tokenizer models, the
+# stopword list and the English word list). Nothing is downloaded: the data is looked up in a local
+# directory, set with the TRANSCRIPT_NLTK_DATA environment variable or set_data_path(), and in NLTK's
+# default locations. Each resource is checked once, the first time it is needed
+import os
+
+# Environment variable with the local directory holding the NLTK data
+DATA_PATH_ENV = "TRANSCRIPT_NLTK_DATA"
+
+# Where each resource lives inside an NLTK data directory, with the name to download it under. The Punkt
+# models depend on the NLTK in use: NLTK 3.9 and later read them from punkt_tab (PunktTokenizer), older
+# versions from the pickled punkt models, and neither accepts the other
+RESOURCE_PATHS = {
+    "punkt_tab": "tokenizers/punkt_tab",
+    "punkt": "tokenizers/punkt",
+    "stopwords": "corpora/stopwords",
+    "words": "corpora/words",
+}
+
+# Raised when an NLTK resource is not installed; a LookupError, as NLTK's own error is
+class MissingResourceError(LookupError):
+    pass
+
+_data_path = os.environ.get(DATA_PATH_ENV)
+_checked = set()
+
+# This method sets the local directory the NLTK data is read from
+def set_data_path(path):
+    global _data_path
+    _data_path = path
+    _checked.clear()
+
+# This method returns the local directory the NLTK data is read from, None for NLTK's own paths only
+def data_path():
+    return _data_path
+
+# This method returns the name of the resource to look for: "punkt" stands for the Punkt models of the
+# NLTK in use
+def _resolve(name):
+    if name == "punkt":
+        import nltk.tokenize
+
+        return "punkt_tab" if hasattr(nltk.tokenize, "PunktTokenizer") else "punkt"
+    return name
+
+# This method makes sure the named NLTK resources are available locally, raising MissingResourceError with
+# instructions when one is missing. Successful checks are remembered
+def require(*names):
+    missing = [name for name in names if name not in _checked]
+    if not missing:
+        return
+
+    import nltk
+
+    if _data_path is not None and _data_path not in nltk.data.path:
+        nltk.data.path.insert(0, _data_path)
+
+    for name in missing:
+        resource = _resolve(name)
+        try:
+            nltk.data.find(RESOURCE_PATHS[resource])
+        except LookupError:
+            raise MissingResourceError(
+                f"NLTK resource {resource!r} was not found in {nltk.data.path}. Install it once with "
+                f"'python -m nltk.downloader -d DIR {resource}' and point {DATA_PATH_ENV} (or --nltk-data) at DIR"
+            ) from None
+        _checked.add(name)
+
+# This method returns the file or directory a resource is read from: its directory inside an NLTK data
+# directory, or the zip file holding it. Raises MissingResourceError when it is not installed
+def locate(name):
+    require(name)
+    import nltk
+
+    try:
+        pointer = nltk.data.find(RESOURCE_PATHS[_resolve(name)])
+    except LookupError:
+        raise MissingResourceError(f"NLTK resource {_resolve(name)!r} was not found in {nltk.data.path}") from None
+    if isinstance(pointer, nltk.data.ZipFilePathPointer):
+        return pointer.zipfile.filename
+    return pointer.path
@@ -0,0 +1,249 @@
+# This python file holds the sinks the similarity scripts write their per-pair results to.
+# Rows are buffered and written in bulk. The text sink keeps the similarity_results.txt layout;
+# the CSV, JSONL and Parquet sinks write one machine-readable row per pair, so nothing has to be
+# parsed back out of the text downstream. Parquet needs the optional pyarrow package
+import abc
+import csv
+import json
+import os
+import sys
+
+# The columns of every row
+PAIR_FIELDS = ("audio_name", "transcript_i", "transcript_j", "worker_i", "worker_j", "similarity")
+# The columns added by --error-rates (transcript i is the reference)
+ERROR_RATE_FIELDS = ("wer", "word_substitutions", "word_insertions", "word_deletions", "reference_words",
+                     "cer", "char_substitutions", "char_insertions", "char_deletions", "reference_chars")
+# The column of threshold mode, where only the pairs below the threshold are written
+THRESHOLD_FIELDS = ("below",)
+
+# The type of every column, for the formats that store one. The similarities are computed in float32 (see
+# inter.py); similarity is None in threshold mode, where the column is all nulls
+FIELD_TYPES = {
+    "audio_name": "string", "transcript_i": "int64", "transcript_j": "int64",
+    "worker_i": "string", "worker_j": "string", "similarity": "float32",
+    "wer": "float64", "word_substitutions": "int64", "word_insertions": "int64", "word_deletions": "int64",
+    "reference_words": "int64",
+    "cer": "float64", "char_substitutions": "int64", "char_insertions": "int64", "char_deletions": "int64",
+    "reference_chars": "int64",
+    "below": "float64",
+}
+
+# The sinks by --format name, and the file extension of each
+FORMATS = {"text": ".txt", "csv": ".csv", "jsonl": ".jsonl", "parquet": ".parquet"}
+
+# Rows a sink holds before writing them out
+DEFAULT_BUFFER_SIZE = 10000
+
+# Base class of the sinks: rows are dicts with the sink's fields, buffered and written buffer_size at a time
+# begin_audio/end_audio mark the pairs of one audio file; only the text layout uses them
+class ResultSink(abc.ABC):
+    def __init__(self, fields, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.fields = tuple(fields)
+        self.buffer_size = buffer_size
+        self._rows = []
+
+    def begin_audio(self, audio_name):
+        pass
+
+    def end_audio(self):
+        pass
+
+    # This method adds one row, writing the buffer out when it is full
+    def write(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= self.buffer_size:
+            self.flush()
+
+    # This method writes out the buffered rows
+    def flush(self):
+        if self._rows:
+            self._write_rows(self._rows)
+            self._rows = []
+
+    # This method writes out a list of buffered rows
+    @abc.abstractmethod
+    def _write_rows(self, rows):
+        pass
+
+    # This method writes out what is left and closes the output
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# Base class of the sinks that write text to a file (or a stream such as sys.stdout, which is left open)
+class _StreamSink(ResultSink):
+    def __init__(self, output, fields, buffer_size=DEFAULT_BUFFER_SIZE, newline=None):
+        super().__init__(fields, buffer_size)
+        self._owns_stream = isinstance(output, str)
+        self.stream = open(output, "w", newline=newline) if self._owns_stream else output
+        self._float32_indexes = [index for index, field in enumerate(self.fields)
+                                 if FIELD_TYPES.get(field) == "float32"]
+
+    def close(self):
+        super().close()
+        if self._owns_stream:
+            self.stream.close()
+        else:
+            self.stream.flush()
+
+    # This method returns the values of a row in the order of the fields. A float32 column is written with
+    # the fewest digits that read back as the same float32 (0.48850784, not 0.48850783705711365)
+    def _values(self, row):
+        import numpy as np
+
+        values = [row.get(field) for field in self.fields]
+        for index in self._float32_indexes:
+            if values[index] is not None:
+                values[index] = float(str(np.float32(values[index])))
+        return values
+
+# The similarity_results.txt layout: an "Audio URL:" header per audio file, then one line per pair
+# The buffer holds the formatted lines, headers included
+class TextSink(_StreamSink):
+    def begin_audio(self, audio_name):
+        self._rows.append(f"Audio URL: {audio_name}\n")
+
+    def end_audio(self):
+        self._rows.append("\n")
+
+    def write(self, row):
+        super().write(self._format(row))
+
+    # This method returns the lines of one row
+    def _format(self, row):
+        pair = f"Similarity between Transcript {row['transcript_i']} and Transcript {row['transcript_j']}"
+        if "below" in row:
+            return f"{pair}: below {row['below']:.4f}\n"
+        line = f"{pair}: {row['similarity']:.4f}\n"
+        if "wer" in row:
+            line += (f"   WER: {row['wer']:.4f} (S={row['word_substitutions']} I={row['word_insertions']} "
+                     f"D={row['word_deletions']} N={row['reference_words']})"
+                     f"   CER: {row['cer']:.4f} (S={row['char_substitutions']} I={row['char_insertions']} "
+                     f"D={row['char_deletions']} N={row['reference_chars']})\n")
+        return line
+
+    def _write_rows(self, lines):
+        self.stream.writelines(lines)
+
+# One comma separated row per pair, with a header line
+class CsvSink(_StreamSink):
+    def __init__(self, output, fields, buffer_size=DEFAULT_BUFFER_SIZE):
+        super().__init__(output, fields, buffer_size, newline="")
+        self._writer = csv.writer(self.stream)
+        self._writer.writerow(self.fields)
+
+    def _write_rows(self, rows):
+        self._writer.writerows([self._values(row) for row in rows])
+
+# One JSON object per line and per pair
+class JsonlSink(_StreamSink):
+    def __init__(self, output, fields, buffer_size=DEFAULT_BUFFER_SIZE):
+        super().__init__(output, fields, buffer_size)
+        self._encode = json.JSONEncoder().encode
+
+    def _write_rows(self, rows):
+        fields = self.fields
+        encode = self._encode
+        self.stream.write("".join([encode(dict(zip(fields, self._values(row)))) + "\n" for row in rows]))
+
+# A Parquet file, one row group per buffer, with the column types of FIELD_TYPES; needs pyarrow
+class ParquetSink(ResultSink):
+    def __init__(self, output, fields, buffer_size=DEFAULT_BUFFER_SIZE):
+        pyarrow = _import_pyarrow()
+        super().__init__(fields, buffer_size)
+        self._pyarrow = pyarrow
+        # The schema is fixed up front: a column that is all nulls in a row group keeps its type, and a
+        # run without any pair still writes a readable, empty file
+        self.schema = pyarrow.schema([(field, pyarrow.type_for_alias(FIELD_TYPES[field])) for field in self.fields])
+        self._writer = pyarrow.parquet.ParquetWriter(output, self.schema)
+
+    def _write_rows(self, rows):
+        columns = {field: [row.get(field) for row in rows] for field in self.fields}
+        self._writer.write_table(self._pyarrow.table(columns, schema=self.schema))
+
+    def close(self):
+        super().close()
+        self._writer.close()
+
+# This method imports pyarrow and its Parquet writer, explaining how to install them when they are missing
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as error:
+        raise ImportError("The parquet format needs the pyarrow package: pip install pyarrow") from error
+    return pyarrow
+
+_SINKS = {"text": TextSink, "csv": CsvSink, "jsonl": JsonlSink, "parquet": ParquetSink}
+
+# This method opens the sink of a format writing to output (a path, or a stream for the text formats)
+def open_sink(format, output, fields, buffer_size=DEFAULT_BUFFER_SIZE):
+    if format not in _SINKS:
+        raise ValueError(f"Unknown format {format!r}, expected one of {sorted(_SINKS)}")
+    return _SINKS[format](output, fields, buffer_size)
+
+# Writes every row to several sinks, e.g. the results file and the console
+class TeeSink(ResultSink):
+    def __init__(self, sinks):
+        super().__init__(sinks[0].fields if sinks else ())
+        self.sinks = sinks
+
+    def begin_audio(self, audio_name):
+        for sink in self.sinks:
+            sink.begin_audio(audio_name)
+
+    def end_audio(self):
+        for sink in self.sinks:
+            sink.end_audio()
+
+    # Rows are passed on as they come, each sink buffers them itself
+    def write(self, row):
+        self._write_rows([row])
+
+    def _write_rows(self, rows):
+        for sink in self.sinks:
+            for row in rows:
+                sink.write(row)
+
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+# This method adds the --format, --output and --quiet options of the similarity scripts to parser
+def add_sink_arguments(parser, default_stem="similarity_results"):
+    parser.add_argument("--format", choices=list(FORMATS), default="text",
+                        help="format of the results file (default: text, the similarity_results.txt layout)")
+    parser.add_argument("--output", metavar="PATH",
+                        help=f"results file (default: {default_stem} with the extension of the format)")
+    parser.add_argument("--quiet", action="store_true", help="do not print every pair to the console")
+
+# This method returns the results file chosen on the command line
+def sink_output(args, default_stem="similarity_results"):
+    return args.output or default_stem + FORMATS[args.format]
+
+# This method checks, without opening anything, that the results chosen on the command line can be
+# written: the directory of the results file exists and the optional package of the format is installed.
+# Raises ValueError or ImportError
+def check_sinks(args, default_stem="similarity_results"):
+    directory = os.path.dirname(os.path.abspath(sink_output(args, default_stem)))
+    if not os.path.isdir(directory):
+        raise ValueError(f"The directory of the results file does not exist: {directory}")
+    if args.format == "parquet":
+        _import_pyarrow()
+
+# This method opens the sinks chosen on the command line: the results file and, unless --quiet, the console
+# The results file is created (or truncated) here, so call it once the rows are ready to be written
+def open_sinks(args, fields, default_stem="similarity_results"):
+    sinks = [open_sink(args.format, sink_output(args, default_stem), fields)]
+    if not args.quiet:
+        sinks.append(TextSink(sys.stdout, fields, buffer_size=1))
+    return TeeSink(sinks)
@@ -0,0 +1,169 @@
+# This python file holds fixed-size sketches of a stream of tokens, for corpora whose frequency table does not
+# fit in memory. Both work on 64-bit hashes of the tokens (hash_tokens), so sketches built in different
+# processes, or on different shards, are merged exactly:
+#   HyperLogLog     the number of distinct tokens, with a relative standard error of 1.04 / sqrt(2^precision)
+#   CountMinSketch  the count of any token, never below the true count and at most epsilon * (total count)
+#                   above it, with probability 1 - delta
+# Their size depends only on their parameters, never on the number or variety of the tokens
+import hashlib
+import math
+
+# Range of the HyperLogLog precision: the 64 - precision hash bits left for the rank must fit in a float64
+MIN_PRECISION = 11
+MAX_PRECISION = 18
+
+# This method returns the 64-bit hashes of tokens as a uint64 array; the hash is the same in every process
+def hash_tokens(tokens):
+    import numpy as np
+
+    blake2b = hashlib.blake2b
+    return np.fromiter((int.from_bytes(blake2b(token.encode(), digest_size=8).digest(), "little") for token in tokens),
+                       dtype=np.uint64, count=len(tokens))
+
+# Distinct count estimator: 2^precision registers of one byte, each holding the longest run of leading zero
+# bits seen among the hashes that fall in it (Flajolet et al. 2007). The estimate is the improved estimator of
+# Ertl (2017), which needs neither the linear counting switch nor the bias tables of HyperLogLog++ to be
+# unbiased from a handful of distinct tokens up
+class HyperLogLog:
+    def __init__(self, precision=14):
+        import numpy as np
+
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(f"The HyperLogLog precision must be between {MIN_PRECISION} and {MAX_PRECISION}")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    # This method adds an array of hashes (see hash_tokens); adding a hash twice changes nothing
+    def add_hashes(self, hashes):
+        import numpy as np
+
+        bits = 64 - self.precision
+        # The first precision bits choose the register, the rest give the rank: the position of their first 1 bit
+        registers = (hashes >> np.uint64(bits)).astype(np.intp)
+        rest = hashes & np.uint64((1 << bits) - 1)
+        # frexp gives the bit length, exactly, as rest < 2^53 is a float64 without rounding (0 has bit length 0)
+        ranks = (bits + 1 - np.frexp(rest.astype(np.float64))[1]).astype(np.uint8)
+        np.maximum.at(self.registers, registers, ranks)
+
+    # This method adds the hashes added to another HyperLogLog of the same precision
+    def merge(self, other):
+        import numpy as np
+
+        if other.precision != self.precision:
+            raise ValueError("Only HyperLogLogs of the same precision can be merged")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    # This method returns the estimated number of distinct hashes added
+    def estimate(self):
+        import numpy as np
+
+        m = len(self.registers)
+        bits = 64 - self.precision
+        # How many registers hold each value 0..bits + 1
+        histogram = np.bincount(self.registers, minlength=bits + 2).tolist()
+        z = m * _tau(1 - histogram[bits + 1] / m)
+        for value in range(bits, 0, -1):
+            z = 0.5 * (z + histogram[value])
+        z += m * _sigma(histogram[0] / m)
+        return m * m / (2 * math.log(2) * z)
+
+    # Relative standard error of the estimate; the estimate is within two of them with about 95% probability
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    # Size of the registers in bytes
+    @property
+    def nbytes(self):
+        return self.registers.nbytes
+
+# The two series of the estimator of Ertl, summed until they no longer change
+def _sigma(x):
+    if x == 1:
+        return math.inf
+    y = 1
+    z = x
+    while True:
+        x *= x
+        previous = z
+        z += x * y
+        y += y
+        if z == previous:
+            return z
+
+def _tau(x):
+    if x == 0 or x == 1:
+        return 0.0
+    y = 1.0
+    z = 1 - x
+    while True:
+        x = math.sqrt(x)
+        previous = z
+        y *= 0.5
+        z -= (1 - x) ** 2 * y
+        if z == previous:
+            return z / 3
+
+# Frequency estimator: depth rows of width counters; a token adds its count to one counter per row and its
+# estimate is the smallest of its counters. width = e / epsilon and depth = ln(1 / delta) bound the
+# overcount by epsilon * total with probability 1 - delta (Cormode and Muthukrishnan 2005)
+class CountMinSketch:
+    def __init__(self, epsilon=1e-4, delta=0.01):
+        import numpy as np
+
+        if not 0 < epsilon < 1 or not 0 < delta < 1:
+            raise ValueError("epsilon and delta must be between 0 and 1")
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        # The bounds the rounded-up width and depth actually give
+        self.epsilon = math.e / self.width
+        self.delta = math.exp(-self.depth)
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        # Sum of all the counts added
+        self.total = 0
+
+    # This method returns the counter of every hash in every row, as a depth x len(hashes) array. The rows
+    # use the two halves of the hash as h1 + row * h2 (Kirsch and Mitzenmacher), h2 odd so it never vanishes
+    def _columns(self, hashes):
+        import numpy as np
+
+        low = hashes & np.uint64(0xFFFFFFFF)
+        high = (hashes >> np.uint64(32)) | np.uint64(1)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((low + rows * high) % np.uint64(self.width)).astype(np.intp)
+
+    # This method adds counts (an int array) to the tokens of hashes; a hash may come more than once
+    def add_hashes(self, hashes, counts):
+        import numpy as np
+
+        columns = self._columns(hashes)
+        counts = np.asarray(counts, dtype=np.int64)
+        for row in range(self.depth):
+            np.add.at(self.table[row], columns[row], counts)
+        self.total += int(counts.sum())
+
+    # This method returns the estimated counts of the tokens of hashes
+    def estimate_hashes(self, hashes):
+        import numpy as np
+
+        columns = self._columns(hashes)
+        return self.table[np.arange(self.depth)[:, None], columns].min(axis=0)
+
+    # This method adds the counts of another CountMinSketch with the same width and depth
+    def merge(self, other):
+        if other.table.shape != self.table.shape:
+            raise ValueError("Only Count-Min sketches of the same width and depth can be merged")
+        self.table += other.table
+        self.total += other.total
+        return self
+
+    # Largest overcount of an estimate, with probability 1 - delta
+    @property
+    def error_bound(self):
+        return self.epsilon * self.total
+
+    # Size of the counters in bytes
+    @property
+    def nbytes(self):
+        return self.table.nbytes
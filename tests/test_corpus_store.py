@@ -0,0 +1,66 @@
+# Checks that a corpus saved by save_corpus maps back unchanged, and that damaged directories are rejected
+import json
+import os
+
+import numpy as np
+import pytest
+
+import corpus_store
+from corpus_store import load_corpus, save_corpus
+from vocabulary import EncodedCorpus
+
+TOKEN_LISTS = [["molweni", "nonke", "molweni"], [], ["ukuba", "nonke"], ["ewe"]]
+
+
+@pytest.fixture
+def saved(tmp_path):
+    corpus = EncodedCorpus.from_token_lists(TOKEN_LISTS)
+    directory = str(tmp_path / "corpus")
+    save_corpus(corpus, directory, fingerprint="config", tokenizer="regex")
+    return corpus, directory
+
+
+def test_round_trip(saved):
+    corpus, directory = saved
+    loaded = load_corpus(directory)
+    assert np.array_equal(loaded.ids, corpus.ids)
+    assert np.array_equal(loaded.offsets, corpus.offsets)
+    assert len(loaded) == len(corpus) == len(TOKEN_LISTS)
+    assert loaded.num_tokens == corpus.num_tokens
+    assert [loaded.tokens(i) for i in range(len(loaded))] == TOKEN_LISTS
+    assert [loaded.text(i) for i in range(len(loaded))] == [corpus.text(i) for i in range(len(corpus))]
+    assert loaded.tokens_by_id == corpus.vocabulary.tokens
+    assert (loaded.fingerprint, loaded.tokenizer) == ("config", "regex")
+
+    original, mapped = corpus.stats(), loaded.stats()
+    assert list(mapped.counts.items()) == list(original.counts.items())
+    assert (mapped.size, mapped.num_types) == (original.size, original.num_types)
+
+
+def test_empty_corpus_round_trip(tmp_path):
+    directory = str(tmp_path / "corpus")
+    save_corpus(EncodedCorpus.from_token_lists([]), directory)
+    loaded = load_corpus(directory)
+    assert len(loaded) == 0 and loaded.num_tokens == 0
+    assert loaded.stats().size == 0
+
+
+def test_version_mismatch(saved):
+    _, directory = saved
+    meta_path = os.path.join(directory, corpus_store.META_FILE)
+    with open(meta_path) as meta_file:
+        meta = json.load(meta_file)
+    meta["version"] = corpus_store.FORMAT_VERSION + 1
+    with open(meta_path, "w") as meta_file:
+        json.dump(meta, meta_file)
+    with pytest.raises(ValueError, match="format version"):
+        load_corpus(directory)
+
+
+@pytest.mark.parametrize("name", [corpus_store.IDS_FILE, corpus_store.OFFSETS_FILE])
+def test_wrong_file_size(saved, name):
+    _, directory = saved
+    with open(os.path.join(directory, name), "ab") as array_file:
+        array_file.write(b"\0" * 4)
+    with pytest.raises(ValueError, match="does not hold"):
+        load_corpus(directory)
@@ -0,0 +1,62 @@
+# Checks that the banded two-row edit counts agree with the counts of the full alignment table
+import random
+
+import pytest
+
+from error_rates import align, count_edits, encode_characters, pair_error_rates
+from levenshtein import levenshtein_similarity
+
+
+# This method returns a random sequence of ids and a copy of it with up to max_edits random edits
+def edited_pair(generator, alphabet, max_length=40, max_edits=8):
+    a = [generator.randrange(alphabet) for _ in range(generator.randint(0, max_length))]
+    b = list(a)
+    for _ in range(generator.randint(0, max_edits)):
+        position = generator.randint(0, len(b))
+        operation = generator.randrange(3)
+        if operation == 0:
+            b.insert(position, generator.randrange(alphabet))
+        elif b and position < len(b):
+            if operation == 1:
+                del b[position]
+            else:
+                b[position] = generator.randrange(alphabet)
+    return a, b
+
+
+def counts(edits):
+    return edits.hits, edits.substitutions, edits.insertions, edits.deletions
+
+
+@pytest.mark.parametrize("alphabet", [2, 3, 5, 30])
+def test_counts_match_alignment(alphabet):
+    generator = random.Random(alphabet)
+    for _ in range(1000):
+        if generator.random() < 0.5:
+            a, b = edited_pair(generator, alphabet)
+        else:
+            # Unrelated sequences: the band is as wide as the table
+            a = [generator.randrange(alphabet) for _ in range(generator.randint(0, 40))]
+            b = [generator.randrange(alphabet) for _ in range(generator.randint(0, 40))]
+        assert counts(count_edits(a, b)) == counts(align(a, b)), (a, b)
+
+
+def test_long_texts():
+    generator = random.Random(0)
+    for _ in range(5):
+        a, b = edited_pair(generator, 12, max_length=600, max_edits=60)
+        assert counts(count_edits(a, b)) == counts(align(a, b))
+
+
+def test_pair_error_rates():
+    reference = "the cat sat on the mat"
+    hypothesis = "the cat sat on a hat"
+    vocabulary = {}
+    ids = [[vocabulary.setdefault(word, len(vocabulary)) for word in text.split()] for text in (reference, hypothesis)]
+    pair = pair_error_rates(ids[0], ids[1], reference, hypothesis, alignment=True)
+    assert pair.words.operations == "====SS"
+    assert pair.wer == pytest.approx(2 / 6)
+    assert counts(pair.characters) == counts(align(encode_characters(reference), encode_characters(hypothesis)))
+    assert pair.similarity == pytest.approx(levenshtein_similarity(reference, hypothesis))
+    # Without alignment the word level keeps only its counts
+    assert not hasattr(pair_error_rates(ids[0], ids[1], reference, hypothesis).words, "operations")
@@ -0,0 +1,94 @@
+# Checks the incremental mode: batches scored through the state give the scores of one full run
+import pytest
+
+from hit_data import Assignment
+from incremental_state import IncrementalState, update_pair_scores
+from inter import similarity_matrix
+from pipeline import open_state
+
+# Preprocessed transcripts of three audio files, in the order the assignments arrive
+TRANSCRIPTS = [("a", "the cat sat on the mat"), ("b", "molweni nonke"), ("a", "the cat sat on a mat"),
+               ("c", "one two three"), ("b", "molweni"), ("a", "a cat sat on the mat"),
+               ("c", "one two three"), ("a", "the dog sat"), ("b", "molweni nonke bantu")]
+
+
+# This method returns the assignments of TRANSCRIPTS[start:end] and their transcripts
+def batch(start, end):
+    assignments = [Assignment(f"A{index}", f"W{index % 4}", f"https://x/{audio}.wav", text, "user")
+                   for index, (audio, text) in enumerate(TRANSCRIPTS[start:end], start)]
+    return assignments, [text for _, text in TRANSCRIPTS[start:end]]
+
+
+# This method returns the state's pair similarities of every audio file
+def state_scores(state):
+    return {audio_url: state.pair_scores(audio_url) for audio_url in state.audio_urls()}
+
+
+def test_two_batches_match_a_full_run(tmp_path):
+    path = str(tmp_path / "state.db")
+    with IncrementalState(path, "config") as state:
+        assert update_pair_scores(state, *batch(0, 4)) == 1
+        state.commit()
+    with IncrementalState(path, "config") as state:
+        assignments, transcripts = batch(0, len(TRANSCRIPTS))
+        new = state.new_assignments(assignments)
+        assert [assignment.assignment_id for assignment in new] == [f"A{index}" for index in range(4, 9)]
+        # Each new transcript is compared with the earlier ones of its audio file: b 1 + 2, c 1, a 2 + 3
+        assert update_pair_scores(state, new, transcripts[4:]) == 9
+        state.commit()
+        incremental = state_scores(state)
+
+    full = {}
+    for audio_url in incremental:
+        strings = [text for assignment, text in zip(*batch(0, len(TRANSCRIPTS)))
+                   if assignment.audio_url == audio_url]
+        full[audio_url] = similarity_matrix(strings, condensed=True).tolist()
+    assert incremental == full
+    assert list(incremental) == ["https://x/a.wav", "https://x/b.wav", "https://x/c.wav"]
+
+
+def test_rerun_without_new_assignments_compares_nothing(tmp_path):
+    path = str(tmp_path / "state.db")
+    assignments, transcripts = batch(0, len(TRANSCRIPTS))
+    with IncrementalState(path, "config") as state:
+        update_pair_scores(state, assignments, transcripts)
+        state.commit()
+        before = state_scores(state)
+    with IncrementalState(path, "config") as state:
+        new = state.new_assignments(assignments)
+        assert new == []
+        assert update_pair_scores(state, new, []) == 0
+        assert state_scores(state) == before
+
+
+def test_changed_fingerprint_resets_and_warns(tmp_path, capsys):
+    path = str(tmp_path / "state.db")
+    assignments, transcripts = batch(0, len(TRANSCRIPTS))
+    with open_state(path, "config") as state:
+        assert not state.reset
+        update_pair_scores(state, assignments, transcripts)
+        state.add_token_counts({"cat": 2})
+        state.commit()
+    assert "Warning" not in capsys.readouterr().err
+
+    with open_state(path, "other config") as state:
+        assert state.reset
+        assert state.previous_fingerprint == "config"
+        assert len(state.new_assignments(assignments)) == len(assignments)
+        assert state.audio_urls() == []
+        assert state.token_counts() == {}
+    warning = capsys.readouterr().err
+    assert "Warning" in warning and "started over" in warning
+
+    # The reset is saved with the new fingerprint, so the next run with it does not warn again
+    with open_state(path, "other config") as state:
+        assert not state.reset
+    assert "Warning" not in capsys.readouterr().err
+
+
+def test_uncommitted_run_is_dropped(tmp_path):
+    path = str(tmp_path / "state.db")
+    with IncrementalState(path, "config") as state:
+        update_pair_scores(state, *batch(0, 3))
+    with IncrementalState(path, "config") as state:
+        assert state.audio_urls() == []
@@ -0,0 +1,97 @@
+# Checks the bit-parallel Levenshtein engine against the textbook dynamic programming table
+import random
+
+import pytest
+
+from levenshtein import levenshtein_distance, levenshtein_similarity
+
+
+# This method is the reference: the full dynamic programming table, row by row
+def reference_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (x != y)))
+        previous = current
+    return previous[-1]
+
+
+# This method returns n random pairs of strings over alphabet, up to max_length long, many of them close
+def random_pairs(n, alphabet="abcd ", max_length=150, seed=0):
+    generator = random.Random(seed)
+    pairs = []
+    for _ in range(n):
+        a = "".join(generator.choice(alphabet) for _ in range(generator.randint(0, max_length)))
+        b = list(a)
+        for _ in range(generator.randint(0, 10)):
+            position = generator.randint(0, len(b))
+            operation = generator.randrange(3)
+            if operation == 0:
+                b.insert(position, generator.choice(alphabet))
+            elif b and position < len(b):
+                if operation == 1:
+                    del b[position]
+                else:
+                    b[position] = generator.choice(alphabet)
+        pairs.append((a, "".join(b)))
+    return pairs
+
+
+@pytest.mark.parametrize("a, b", [("", ""), ("", "abc"), ("abc", ""), ("kitten", "sitting"), ("flaw", "lawn"),
+                                  ("same", "same"), ("a" * 70, "b" * 70), ("x" * 200, "x" * 199 + "y")])
+def test_known_distances(a, b):
+    assert levenshtein_distance(a, b) == reference_distance(a, b)
+    assert levenshtein_distance(b, a) == reference_distance(a, b)
+
+
+def test_random_pairs_match_reference():
+    for a, b in random_pairs(500):
+        assert levenshtein_distance(a, b) == reference_distance(a, b), (a, b)
+
+
+# Patterns longer than 64 characters span several machine words of the bit vectors
+def test_long_patterns_match_reference():
+    for a, b in random_pairs(40, alphabet="abcdefghij", max_length=400, seed=1):
+        assert levenshtein_distance(a, b) == reference_distance(a, b)
+
+
+# Any sequence of hashable items works, e.g. the token id lists of the word level
+def test_sequences_of_ids():
+    generator = random.Random(2)
+    for _ in range(200):
+        a = [generator.randrange(6) for _ in range(generator.randint(0, 40))]
+        b = [generator.randrange(6) for _ in range(generator.randint(0, 40))]
+        assert levenshtein_distance(a, b) == reference_distance(a, b)
+
+
+# With max_distance the exact distance comes back when it is within the cutoff, max_distance + 1 otherwise
+def test_max_distance_cutoff():
+    generator = random.Random(3)
+    for a, b in random_pairs(500, seed=4):
+        distance = reference_distance(a, b)
+        max_distance = generator.randint(0, distance + 3)
+        expected = distance if distance <= max_distance else max_distance + 1
+        assert levenshtein_distance(a, b, max_distance) == expected, (a, b, max_distance)
+
+
+def test_similarity():
+    assert levenshtein_similarity("", "") == 1.0
+    assert levenshtein_similarity("kitten", "sitting") == pytest.approx(1 - 3 / 7)
+    for a, b in random_pairs(200, seed=5):
+        longest = max(len(a), len(b))
+        exact = 1 - reference_distance(a, b) / longest if longest else 1.0
+        assert levenshtein_similarity(a, b) == pytest.approx(exact)
+
+
+# With min_similarity a pair at or above it keeps its exact similarity and a pair below it may return 0.0
+def test_similarity_cutoff():
+    for min_similarity in (0.5, 0.8, 0.9):
+        for a, b in random_pairs(300, seed=6):
+            longest = max(len(a), len(b))
+            exact = 1 - reference_distance(a, b) / longest if longest else 1.0
+            similarity = levenshtein_similarity(a, b, min_similarity)
+            if exact >= min_similarity:
+                assert similarity == pytest.approx(exact)
+            else:
+                assert similarity in (0.0, pytest.approx(exact))
@@ -0,0 +1,17 @@
+# Checks the defaults the pipeline derives from the command line
+import argparse
+
+from pipeline import default_zipf_plot
+
+
+def test_default_zipf_plot_follows_the_input():
+    def args(**options):
+        defaults = {"corpus": "structured", "csv_files": None, "load_corpus": None}
+        return argparse.Namespace(**{**defaults, **options})
+
+    assert default_zipf_plot(args()) == "structured.png"
+    assert default_zipf_plot(args(corpus="unstructured")) == "unstructured.png"
+    assert default_zipf_plot(args(csv_files=["Data/batch_7.csv", "Data/other.csv"])) == "batch_7.png"
+    assert default_zipf_plot(args(load_corpus="exports/week2/")) == "week2.png"
+    # file_reader.py has no --load-corpus
+    assert default_zipf_plot(argparse.Namespace(corpus="structured", csv_files=["x/y.csv"])) == "y.png"
@@ -0,0 +1,33 @@
+# Checks that the counters of the worker processes are added to the parent's profile
+import pytest
+
+import profiling
+from inter import parallel_error_rates, parallel_similarity_matrices
+from vocabulary import Vocabulary
+
+GROUPS = {f"audio{index}": [f"the quick brown fox {index}", f"the quick brown box {index}", f"a quick fox {index}"]
+          for index in range(6)}
+
+
+# This method returns the counters of a profiled call of function
+def counters_of(function, *args, **kwargs):
+    profiling.enable(trace_memory=False)
+    try:
+        function(*args, **kwargs)
+    finally:
+        profiler = profiling.disable()
+    return profiler.counters
+
+
+@pytest.mark.parametrize("workers", [2, 3])
+def test_similarity_counters_include_workers(workers):
+    serial = counters_of(parallel_similarity_matrices, GROUPS, 1)
+    assert serial["levenshtein_cells"] > 0
+    assert counters_of(parallel_similarity_matrices, GROUPS, workers) == serial
+
+
+def test_error_rate_counters_include_workers():
+    vocabulary = Vocabulary()
+    token_ids = {key: [vocabulary.encode(string.split()) for string in strings] for key, strings in GROUPS.items()}
+    serial = counters_of(parallel_error_rates, GROUPS, token_ids, 1)
+    assert counters_of(parallel_error_rates, GROUPS, token_ids, 2) == serial
@@ -0,0 +1,51 @@
+# Checks that the cheap bounds of the threshold mode never reject a pair whose true similarity reaches the threshold
+import random
+
+from pruning import PruningStats, TranscriptProfile, is_below
+from test_levenshtein import random_pairs, reference_distance
+
+
+def reference_similarity(a, b):
+    longest = max(len(a), len(b))
+    return 1 - reference_distance(a, b) / longest if longest else 1.0
+
+
+def test_never_rejects_a_similar_pair():
+    stats = PruningStats()
+    for min_similarity in (0.3, 0.5, 0.7, 0.8, 0.9, 0.95):
+        for a, b in random_pairs(300, alphabet="abcdef ", max_length=120, seed=int(min_similarity * 100)):
+            below = is_below(TranscriptProfile(a), TranscriptProfile(b), min_similarity, stats)
+            assert below == (reference_similarity(a, b) < min_similarity - 1e-9), (a, b, min_similarity)
+    # The bounds, not only the Levenshtein, must have decided some of the pairs for this to test them
+    assert stats.avoided > 0
+
+
+# Unrelated strings of different lengths and letters exercise the length, character and q-gram bounds
+def test_unrelated_pairs():
+    generator = random.Random(7)
+    stats = PruningStats()
+    for _ in range(500):
+        a = "".join(generator.choice("abc ") for _ in range(generator.randint(0, 200)))
+        b = "".join(generator.choice("bcd ") for _ in range(generator.randint(0, 200)))
+        for min_similarity in (0.2, 0.5, 0.8):
+            below = is_below(TranscriptProfile(a), TranscriptProfile(b), min_similarity, stats)
+            assert below == (reference_similarity(a, b) < min_similarity - 1e-9), (a, b, min_similarity)
+    for reason in ("length", "characters"):
+        assert stats.decided_by[reason] > 0
+
+
+# Longer strings with substitutions only keep their length, so the upper bound and the q-gram bound decide
+def test_substituted_long_pairs():
+    generator = random.Random(8)
+    stats = PruningStats()
+    for _ in range(100):
+        a = "".join(generator.choice("abcdefgh ") for _ in range(generator.randint(70, 200)))
+        b = list(a)
+        for _ in range(generator.randint(0, 60)):
+            b[generator.randrange(len(b))] = generator.choice("abcdefgh ")
+        b = "".join(b)
+        for min_similarity in (0.7, 0.8, 0.9):
+            below = is_below(TranscriptProfile(a), TranscriptProfile(b), min_similarity, stats)
+            assert below == (reference_similarity(a, b) < min_similarity - 1e-9), (a, b, min_similarity)
+    for reason in ("upper_bound", "qgrams"):
+        assert stats.decided_by[reason] > 0
@@ -0,0 +1,81 @@
+# Checks what the result sinks write: float32 similarities in their shortest form and typed Parquet columns
+import argparse
+import csv
+import json
+
+import numpy as np
+import pytest
+
+from result_sinks import PAIR_FIELDS, THRESHOLD_FIELDS, check_sinks, open_sink
+
+ROWS = [{"audio_name": "a", "transcript_i": 1, "transcript_j": 2, "worker_i": "w1", "worker_j": "w2",
+         "similarity": float(np.float32(0.48850784))},
+        {"audio_name": "a", "transcript_i": 1, "transcript_j": 3, "worker_i": "w1", "worker_j": "w3",
+         "similarity": 1.0}]
+
+
+def test_csv_writes_shortest_float32(tmp_path):
+    path = str(tmp_path / "results.csv")
+    with open_sink("csv", path, PAIR_FIELDS, buffer_size=1) as sink:
+        for row in ROWS:
+            sink.write(row)
+    with open(path, newline="") as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == list(PAIR_FIELDS)
+    assert [row[-1] for row in rows[1:]] == ["0.48850784", "1.0"]
+
+
+def test_jsonl_writes_shortest_float32(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    with open_sink("jsonl", path, PAIR_FIELDS) as sink:
+        for row in ROWS:
+            sink.write(row)
+    with open(path) as file:
+        lines = file.read().splitlines()
+    assert '"similarity": 0.48850784' in lines[0]
+    assert json.loads(lines[1])["worker_j"] == "w3"
+
+
+def test_text_layout(tmp_path):
+    path = str(tmp_path / "results.txt")
+    with open_sink("text", path, PAIR_FIELDS, buffer_size=2) as sink:
+        sink.begin_audio("a")
+        for row in ROWS:
+            sink.write(row)
+        sink.end_audio()
+    with open(path) as file:
+        assert file.read() == ("Audio URL: a\n"
+                               "Similarity between Transcript 1 and Transcript 2: 0.4885\n"
+                               "Similarity between Transcript 1 and Transcript 3: 1.0000\n\n")
+
+
+# In threshold mode similarity is always None: the column must keep its float type, not become null
+def test_parquet_schema_with_null_column(tmp_path):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "results.parquet")
+    fields = PAIR_FIELDS + THRESHOLD_FIELDS
+    with open_sink("parquet", path, fields) as sink:
+        for row in ROWS:
+            sink.write(dict(row, similarity=None, below=0.5))
+    table = parquet.read_table(path)
+    assert str(table.schema.field("similarity").type) == "float"
+    assert str(table.schema.field("transcript_i").type) == "int64"
+    assert table.column("similarity").null_count == 2
+    assert table.column("below").to_pylist() == [0.5, 0.5]
+
+
+def test_parquet_without_rows(tmp_path):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "results.parquet")
+    with open_sink("parquet", path, PAIR_FIELDS):
+        pass
+    assert parquet.read_table(path).num_rows == 0
+
+
+def test_check_sinks_opens_nothing(tmp_path):
+    path = tmp_path / "results.csv"
+    path.write_text("earlier results\n")
+    check_sinks(argparse.Namespace(format="csv", output=str(path)))
+    assert path.read_text() == "earlier results\n"
+    with pytest.raises(ValueError):
+        check_sinks(argparse.Namespace(format="csv", output=str(tmp_path / "missing" / "results.csv")))
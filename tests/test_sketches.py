@@ -0,0 +1,65 @@
+# Checks the HyperLogLog and Count-Min sketches against their error bounds
+import numpy as np
+
+from sketches import CountMinSketch, HyperLogLog, hash_tokens
+
+
+def test_hash_tokens_is_stable():
+    hashes = hash_tokens(["word", "other", "word"])
+    assert hashes.dtype == np.uint64
+    assert hashes[0] == hashes[2] != hashes[1]
+
+
+def test_hyperloglog_within_error():
+    for precision in (11, 14):
+        for distinct in (10, 1000, 50000):
+            sketch = HyperLogLog(precision)
+            tokens = [f"token{i}" for i in range(distinct)]
+            sketch.add_hashes(hash_tokens(tokens))
+            # Adding the same tokens again changes nothing
+            sketch.add_hashes(hash_tokens(tokens[:distinct // 2]))
+            error = sketch.estimate() / distinct - 1
+            # Four standard errors: a failure would be a bug, not bad luck
+            assert abs(error) <= 4 * sketch.relative_error, (precision, distinct, error)
+
+
+def test_hyperloglog_merge_equals_union():
+    a = HyperLogLog(12)
+    b = HyperLogLog(12)
+    union = HyperLogLog(12)
+    first = hash_tokens([f"a{i}" for i in range(3000)])
+    second = hash_tokens([f"b{i}" for i in range(2000)])
+    a.add_hashes(first)
+    b.add_hashes(second)
+    union.add_hashes(np.concatenate([first, second]))
+    assert np.array_equal(a.merge(b).registers, union.registers)
+
+
+def test_count_min_within_bound():
+    rng = np.random.default_rng(0)
+    # A Zipf-like stream: few frequent tokens and a long tail
+    ids = rng.zipf(1.3, size=200000) % 20000
+    tokens = [f"w{i}" for i in range(20000)]
+    true_counts = np.bincount(ids, minlength=20000)
+    present = np.flatnonzero(true_counts)
+
+    sketch = CountMinSketch(epsilon=1e-3, delta=0.01)
+    sketch.add_hashes(hash_tokens([tokens[i] for i in present]), true_counts[present])
+    assert sketch.total == len(ids)
+
+    estimates = sketch.estimate_hashes(hash_tokens([tokens[i] for i in present]))
+    overcount = estimates - true_counts[present]
+    # Never below the true count, and above the bound for at most about delta of the tokens
+    assert (overcount >= 0).all()
+    assert np.mean(overcount > sketch.error_bound) <= 2 * sketch.delta
+
+
+def test_count_min_merge():
+    hashes = hash_tokens(["x", "y", "z"])
+    a = CountMinSketch(epsilon=0.01, delta=0.1)
+    b = CountMinSketch(epsilon=0.01, delta=0.1)
+    a.add_hashes(hashes, [1, 2, 3])
+    b.add_hashes(hashes, [4, 5, 6])
+    a.merge(b)
+    assert a.total == 21
+    assert (a.estimate_hashes(hashes) >= [5, 7, 9]).all()
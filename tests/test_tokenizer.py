@@ -0,0 +1,54 @@
+# Pins the regex tokenizer against recorded word_tokenize outputs (after the isalnum() filter)
+import pytest
+
+import resources
+from preprocessing import regex_tokenize
+
+# Text -> word_tokenize(text) filtered with isalnum(), where the regex tokenizer agrees
+AGREEING = {
+    "He's done. She'll go": ["He", "done", "She", "go"],
+    "I can't do it, they won't.": ["I", "ca", "do", "it", "they", "wo"],
+    "We paid 1,000 rand.": ["We", "paid", "rand"],
+    'She said "no" (twice)!': ["She", "said", "no", "twice"],
+    "I cannot wait, gonna go": ["I", "can", "not", "wait", "gon", "na", "go"],
+    "his mother's car": ["his", "mother", "car"],
+    "the end... then": ["the", "end", "then"],
+    "Wait -- what?": ["Wait", "what"],
+    "U.S. troops left.": ["troops", "left"],
+    "Zealand.Molweni nonke": ["nonke"],
+    "kwiMpuma randi . Kweze midlalo": ["kwiMpuma", "randi", "Kweze", "midlalo"],
+    "ndiwarhuqa .Owaba ngumphathiswa": ["ndiwarhuqa", "ngumphathiswa"],
+    "3.5 million": ["million"],
+}
+
+# Text -> (word_tokenize output, regex output) where they are known to differ: Punkt knows the
+# abbreviation and keeps "Mr." whole, so the filter drops it; the regex tokenizer ends a sentence there
+DIFFERING = {
+    "Mr. Smith went.": (["Smith", "went"], ["Mr", "Smith", "went"]),
+    "Dr. Bester said so.": (["Bester", "said", "so"], ["Dr", "Bester", "said", "so"]),
+}
+
+
+@pytest.mark.parametrize("text", sorted(AGREEING))
+def test_regex_tokenize_agrees(text):
+    assert regex_tokenize(text) == AGREEING[text]
+
+
+@pytest.mark.parametrize("text", sorted(DIFFERING))
+def test_regex_tokenize_known_differences(text):
+    expected, actual = DIFFERING[text]
+    assert regex_tokenize(text) == actual
+    assert actual != expected
+
+
+# Checks the recorded outputs themselves where the Punkt models are installed
+@pytest.mark.parametrize("text", sorted(AGREEING) + sorted(DIFFERING))
+def test_recorded_outputs_match_word_tokenize(text):
+    pytest.importorskip("nltk")
+    try:
+        resources.require("punkt")
+    except resources.MissingResourceError:
+        pytest.skip("Punkt models are not installed")
+    from nltk.tokenize import word_tokenize
+    expected = AGREEING[text] if text in AGREEING else DIFFERING[text][0]
+    assert [token for token in word_tokenize(text) if token.isalnum()] == expected
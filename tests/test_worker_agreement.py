@@ -0,0 +1,51 @@
+# Checks the robust z-scores of worker_agreement: the fallback when the MAD is 0 and the minimum pair count
+import itertools
+import math
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from worker_agreement import worker_agreement
+
+
+# This method returns the pair table of audio files each transcribed once by every worker of workers
+def all_pairs(audio_names, workers, similarity):
+    rows = []
+    for audio_name in audio_names:
+        for (i, worker_i), (j, worker_j) in itertools.combinations(enumerate(workers, 1), 2):
+            rows.append({"audio_name": audio_name, "transcript_i": i, "transcript_j": j,
+                         "worker_i": worker_i, "worker_j": worker_j, "similarity": similarity(worker_i, worker_j)})
+    return pd.DataFrame(rows)
+
+
+def low_w5(worker_i, worker_j):
+    return 0.25 if "w5" in (worker_i, worker_j) else 0.75
+
+
+def test_zero_mad_falls_back_to_mean_absolute_deviation():
+    # w1 to w4 share the median, so the MAD is 0; w5 is still scored and flagged
+    pairs = all_pairs(["a", "b", "c"], ["w1", "w2", "w3", "w4", "w5"], low_w5)
+    workers = worker_agreement(pairs)
+    assert workers.loc[["w1", "w2", "w3", "w4"], "robust_z"].tolist() == [0.0] * 4
+    assert math.isfinite(workers.loc["w5", "robust_z"])
+    assert workers.loc["w5", "robust_z"] < -3.5
+    assert workers.index[workers["outlier"]].tolist() == ["w5"]
+
+
+def test_equal_agreement_flags_no_one():
+    pairs = all_pairs(["a", "b"], ["w1", "w2", "w3"], lambda worker_i, worker_j: 0.75)
+    workers = worker_agreement(pairs)
+    assert workers["robust_z"].tolist() == [0.0] * 3
+    assert not workers["outlier"].any()
+
+
+def test_workers_with_few_pairs_are_not_scored():
+    pairs = pd.concat([all_pairs(["a", "b", "c"], ["w1", "w2", "w3", "w4", "w5"], low_w5),
+                       all_pairs(["d"], ["w6", "w7"], lambda worker_i, worker_j: 0.0)], ignore_index=True)
+    workers = worker_agreement(pairs, min_pairs=3)
+    assert workers.loc[["w6", "w7"], "robust_z"].isna().all()
+    assert workers.index[workers["outlier"]].tolist() == ["w5"]
+    # w6 and w7 do not move the median and MAD of the others
+    alone = worker_agreement(all_pairs(["a", "b", "c"], ["w1", "w2", "w3", "w4", "w5"], low_w5), min_pairs=3)
+    assert workers.loc["w5", "robust_z"] == pytest.approx(alone.loc["w5", "robust_z"])
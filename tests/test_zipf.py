@@ -0,0 +1,50 @@
+# Checks the Zipf fits on spectra with a known exponent and the Zipf-Mandelbrot option of --zipf-fit
+import numpy as np
+import pytest
+
+from zipf import FIT_METHODS, fit_zipf, fit_zipf_mandelbrot
+
+
+# This method returns an exact spectrum frequency = exp(c) * (rank + b)^-s, one type per frequency
+def mandelbrot_spectrum(s, b, c=12.0, num_ranks=2000):
+    ranks = np.arange(1, num_ranks + 1)
+    return np.exp(c - s * np.log(ranks + b)), np.ones(num_ranks, dtype=np.int64)
+
+
+def test_lsq_recovers_zipf_exponent():
+    frequencies, num_types = mandelbrot_spectrum(1.1, 0.0)
+    s, c = fit_zipf(frequencies, num_types, "lsq")
+    assert s == pytest.approx(1.1)
+    assert c == pytest.approx(12.0)
+
+
+def test_mandelbrot_recovers_offset():
+    offset = float(np.geomspace(0.01, 100.0, 80)[60])  # a point of the default grid
+    frequencies, num_types = mandelbrot_spectrum(1.3, offset)
+    s, b, c = fit_zipf_mandelbrot(frequencies, num_types)
+    assert (s, b, c) == pytest.approx((1.3, offset, 12.0))
+    # fit_zipf returns the line first and the offset last, so (s, c) reads the same for every method
+    assert fit_zipf(frequencies, num_types, "mandelbrot") == (s, c, b)
+
+
+def test_mandelbrot_fits_better_than_lsq_on_offset_data():
+    frequencies, num_types = mandelbrot_spectrum(1.3, 10.0)
+    assert fit_zipf(frequencies, num_types, "lsq")[0] < 1.25
+    assert fit_zipf(frequencies, num_types, "mandelbrot")[0] == pytest.approx(1.3, abs=0.02)
+
+
+def test_zipf_fit_option_plots_mandelbrot(tmp_path):
+    pytest.importorskip("matplotlib")
+    from corpus_statistics import calculate_zipfs_law
+
+    assert "mandelbrot" in FIT_METHODS
+    tokens = [f"w{rank}" for rank in range(1, 200) for _ in range(int(5000 / (rank + 3)))]
+    output = tmp_path / "zipf.png"
+    exponent = calculate_zipfs_law(tokens, output_path=str(output), method="mandelbrot")
+    assert exponent > 0
+    assert output.stat().st_size > 0
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        fit_zipf(np.array([3, 1]), np.array([1, 1]), "cubic")
@@ -0,0 +1,116 @@
+# This python file is the on-disk cache of preprocessed transcripts, so reruns only preprocess
+# the assignments that are new or changed since the last export
+import argparse
+import hashlib
+import sqlite3
+
+# Persistent, content-addressed store of preprocessing results in a SQLite file.
+# Entries are keyed by hash(preprocessing fingerprint, transcript), so a different stopword list,
+# stemmer, tokenizer or lexicon never reuses old results. Every open of the cache is a new generation;
+# entries remember the last generation that used them and the least recently used are evicted once
+# the cache holds more than max_entries
+class TranscriptCache:
+    def __init__(self, path, fingerprint, max_entries=1_000_000):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key BLOB PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                tokens TEXT NOT NULL,
+                last_used INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            INSERT OR IGNORE INTO meta VALUES ('generation', 0);
+        """)
+        with self.connection:
+            self.connection.execute("UPDATE meta SET value = value + 1 WHERE name = 'generation'")
+        self.generation = self.connection.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # This method returns the cache key of a transcript under this fingerprint
+    def _key(self, text):
+        return hashlib.sha1(f"{self.fingerprint}\0{text}".encode()).digest()
+
+    # This method looks up many transcripts at once and returns {text: tokens} for the ones cached
+    def get_many(self, texts):
+        keys = {}
+        for text in texts:
+            keys[self._key(text)] = text
+
+        found = {}
+        key_list = list(keys)
+        # SQLite limits the number of parameters of one statement
+        for start in range(0, len(key_list), 500):
+            batch = key_list[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.connection.execute(
+                f"SELECT key, tokens FROM entries WHERE key IN ({placeholders})", batch).fetchall()
+            for key, tokens in rows:
+                found[keys[key]] = tokens.split()
+            with self.connection:
+                self.connection.execute(
+                    f"UPDATE entries SET last_used = ? WHERE key IN ({placeholders})", [self.generation, *batch])
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    # This method stores {text: tokens} results; tokens never contain whitespace so they are stored space-joined
+    def put_many(self, results):
+        if not results:
+            return
+        rows = [(self._key(text), self.fingerprint, " ".join(tokens), self.generation)
+                for text, tokens in results.items()]
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", rows)
+        self.evict()
+
+    # This method drops the least recently used entries until at most max_entries are left
+    def evict(self):
+        count = self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            with self.connection:
+                self.connection.execute(
+                    "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY last_used LIMIT ?)",
+                    (excess,))
+
+    # This method invalidates cached results: those of other preprocessing configurations (stale=True),
+    # or everything
+    def clear(self, stale=False):
+        with self.connection:
+            if stale:
+                self.connection.execute("DELETE FROM entries WHERE fingerprint != ?", (self.fingerprint,))
+            else:
+                self.connection.execute("DELETE FROM entries")
+
+    # This method returns the number of entries per preprocessing fingerprint
+    def stats(self):
+        return dict(self.connection.execute("SELECT fingerprint, COUNT(*) FROM entries GROUP BY fingerprint"))
+
+    def close(self):
+        self.connection.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or empty a transcript cache file")
+    parser.add_argument("path")
+    parser.add_argument("--clear", action="store_true", help="remove every cached entry")
+    args = parser.parse_args()
+
+    with TranscriptCache(args.path, fingerprint="") as cache:
+        if args.clear:
+            cache.clear()
+        for fingerprint, count in cache.stats().items():
+            print(f"{fingerprint}: {count} entries")
@@ -0,0 +1,159 @@
+# This python file holds the integer encoding of tokens shared by the corpus and similarity pipelines.
+# A Vocabulary maps every token to an int32 id once, at ingestion, and an EncodedCorpus stores the
+# transcripts as one contiguous array of ids with the offsets where each transcript starts. Counting
+# is then a bincount over the ids and distances run over int arrays instead of strings
+from array import array
+
+# Token -> id table that hands out the next id to a token it has not seen, the first time it is looked up
+class _TokenIds(dict):
+    __slots__ = ("tokens",)
+
+    def __init__(self):
+        super().__init__()
+        self.tokens = []
+
+    def __missing__(self, token):
+        token_id = len(self.tokens)
+        self[token] = token_id
+        self.tokens.append(token)
+        return token_id
+
+# Two-way mapping between tokens and int32 ids; ids are given out in the order the tokens are first seen
+class Vocabulary:
+    def __init__(self, tokens=()):
+        self._ids = _TokenIds()
+        for token in tokens:
+            self._ids[token]
+
+    def __len__(self):
+        return len(self._ids.tokens)
+
+    def __contains__(self, token):
+        return token in self._ids
+
+    def __iter__(self):
+        return iter(self._ids.tokens)
+
+    # The tokens in id order: tokens[i] is the token with id i
+    @property
+    def tokens(self):
+        return self._ids.tokens
+
+    # This method returns the id of token, adding it to the vocabulary if it is new
+    def add(self, token):
+        return self._ids[token]
+
+    # This method returns the id of token, or None when it is not in the vocabulary
+    def get(self, token):
+        return self._ids.get(token)
+
+    # This method returns the ids of tokens as an int32 array, adding the new tokens to the vocabulary
+    def encode(self, tokens):
+        import numpy as np
+
+        if not isinstance(tokens, (list, tuple)):
+            tokens = list(tokens)
+        return np.fromiter(map(self._ids.__getitem__, tokens), dtype=np.int32, count=len(tokens))
+
+    # This method returns the tokens of an array (or any iterable) of ids
+    def decode(self, ids):
+        if hasattr(ids, "tolist"):
+            ids = ids.tolist()
+        tokens = self._ids.tokens
+        return [tokens[token_id] for token_id in ids]
+
+# Transcripts encoded with a Vocabulary: the ids of all transcripts back to back in one int32 array,
+# and offsets[i]:offsets[i + 1] the slice of transcript i. Transcripts are appended one at a time
+class EncodedCorpus:
+    def __init__(self, vocabulary=None):
+        self.vocabulary = vocabulary if vocabulary is not None else Vocabulary()
+        # Growable buffers; the NumPy views below are built from them on demand
+        self._ids = array("i")
+        self._offsets = array("q", [0])
+        self._arrays = None
+
+    # This method builds the encoded corpus of a list (or any iterable) of token lists
+    @classmethod
+    def from_token_lists(cls, token_lists, vocabulary=None):
+        corpus = cls(vocabulary)
+        corpus.extend(token_lists)
+        return corpus
+
+    # This method encodes and appends one transcript, given as its tokens
+    def append(self, tokens):
+        self._ids.frombytes(self.vocabulary.encode(tokens).tobytes())
+        self._offsets.append(len(self._ids))
+        self._arrays = None
+
+    # This method encodes and appends many transcripts
+    def extend(self, token_lists):
+        for tokens in token_lists:
+            self.append(tokens)
+
+    # This method appends transcripts that are already encoded with the ids of this vocabulary, given as
+    # their ids back to back and their offsets from 0 (e.g. a chunk encoded in a worker process and mapped
+    # onto this vocabulary)
+    def extend_encoded(self, ids, offsets):
+        import numpy as np
+
+        base = len(self._ids)
+        self._ids.frombytes(np.ascontiguousarray(ids, dtype=np.int32).tobytes())
+        self._offsets.frombytes((np.asarray(offsets[1:], dtype=np.int64) + base).tobytes())
+        self._arrays = None
+
+    # This method returns the ids and offsets as NumPy arrays, copied once after each change
+    def _as_arrays(self):
+        import numpy as np
+
+        if self._arrays is None:
+            self._arrays = (np.array(self._ids, dtype=np.int32), np.array(self._offsets, dtype=np.int64))
+        return self._arrays
+
+    # The ids of all the transcripts, back to back
+    @property
+    def ids(self):
+        return self._as_arrays()[0]
+
+    # Where each transcript starts in ids, plus the total number of tokens at the end
+    @property
+    def offsets(self):
+        return self._as_arrays()[1]
+
+    # Number of transcripts
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    # This method returns the ids of transcript i as a view into ids
+    def __getitem__(self, i):
+        ids, offsets = self._as_arrays()
+        return ids[offsets[i]:offsets[i + 1]]
+
+    def __iter__(self):
+        ids, offsets = self._as_arrays()
+        for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist()):
+            yield ids[start:end]
+
+    # This method returns the tokens of transcript i
+    def tokens(self, i):
+        return self.vocabulary.decode(self[i])
+
+    # This method returns the text of transcript i, its tokens joined with spaces
+    def text(self, i):
+        return " ".join(self.tokens(i))
+
+    # Number of tokens in the corpus
+    @property
+    def num_tokens(self):
+        return len(self._ids)
+
+    # This method returns how often each id occurs, as an array indexed by id
+    def counts(self):
+        import numpy as np
+
+        return np.bincount(self.ids, minlength=len(self.vocabulary))
+
+    # This method returns the CorpusStats of the corpus, counted with a bincount
+    def stats(self):
+        from corpus_stats import CorpusStats
+
+        return CorpusStats.from_counts(self.counts(), self.vocabulary)
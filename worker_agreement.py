@@ -0,0 +1,116 @@
+# This python file rolls the pairwise similarity results up into per-worker agreement: how much each
+# worker's transcripts agree with the other transcripts of the same audio files, how far the worker is
+# from the consensus of those files, and which workers are outliers. Everything is a pandas group-by over
+# the pair-score table, so thousands of workers are ranked in seconds.
+# Input: a results file of inter-transcriber_similarity.py written with --format csv, jsonl or parquet
+# Run with: python worker_agreement.py similarity_results.csv
+import argparse
+import os
+
+# Robust z-scores below minus this are flagged as outliers (Iglewicz and Hoaglin recommend 3.5)
+DEFAULT_OUTLIER_Z = 3.5
+
+# Workers with fewer pairs than this are not flagged, their scores are too noisy
+DEFAULT_MIN_PAIRS = 3
+
+# This method reads a results file written by the result sinks; the format is taken from the extension
+def read_pair_scores(path):
+    import pandas as pd
+
+    extension = os.path.splitext(path)[1].lower()
+    columns = ["audio_name", "transcript_i", "transcript_j", "worker_i", "worker_j", "similarity"]
+    if extension == ".csv":
+        pairs = pd.read_csv(path, usecols=columns, dtype={"audio_name": str, "worker_i": str, "worker_j": str})
+    elif extension == ".jsonl":
+        pairs = pd.read_json(path, lines=True, dtype={"audio_name": str, "worker_i": str, "worker_j": str})
+    elif extension == ".parquet":
+        pairs = pd.read_parquet(path, columns=columns)
+    else:
+        raise ValueError(f"Cannot read {path}: expected a .csv, .jsonl or .parquet results file")
+    # Pairs of threshold mode have no exact similarity and cannot be aggregated
+    return pairs[columns].dropna(subset=["similarity"])
+
+# This method turns the pair table into one row per (pair, side): every pair counts for both its workers
+def _pair_sides(pairs):
+    import pandas as pd
+
+    sides = []
+    for transcript, worker in (("transcript_i", "worker_i"), ("transcript_j", "worker_j")):
+        side = pairs[["audio_name", transcript, worker, "similarity"]]
+        sides.append(side.set_axis(["audio_name", "transcript", "worker", "similarity"], axis=1))
+    return pd.concat(sides, ignore_index=True)
+
+# This method returns the per-worker agreement table, the lowest mean agreement first:
+#   pairs, audio_files            how many pairs and audio files the worker's transcripts are in
+#   mean_agreement, median_agreement  of the similarities of those pairs
+#   consensus_delta               mean of (transcript's mean similarity to the others of its audio file
+#                                 - mean similarity of all the pairs of that file); below 0 means the
+#                                 worker agrees less with the others than they agree among themselves
+#   robust_z                      0.6745 * (mean_agreement - median over workers) / MAD, the median and the
+#                                 MAD taken over the workers with at least min_pairs pairs; NaN for the others
+#   outlier                       robust_z below -outlier_z
+def worker_agreement(pairs, min_pairs=DEFAULT_MIN_PAIRS, outlier_z=DEFAULT_OUTLIER_Z):
+    import numpy as np
+
+    sides = _pair_sides(pairs)
+
+    # Consensus: each transcript's mean similarity to the rest of its audio file, against the file's mean
+    audio_mean = pairs.groupby("audio_name")["similarity"].mean()
+    transcripts = sides.groupby(["audio_name", "transcript", "worker"], sort=False)["similarity"].mean().reset_index()
+    transcripts["delta"] = transcripts["similarity"] - transcripts["audio_name"].map(audio_mean)
+
+    by_worker = sides.groupby("worker", sort=False)
+    workers = by_worker["similarity"].agg(pairs="size", mean_agreement="mean", median_agreement="median")
+    workers["audio_files"] = by_worker["audio_name"].nunique()
+    workers["consensus_delta"] = transcripts.groupby("worker", sort=False)["delta"].mean()
+
+    # Robust z-score of the mean agreement: median and median absolute deviation instead of mean and std.
+    # Workers with too few pairs are left out of the median and the MAD and get no score
+    workers["robust_z"] = np.nan
+    ranked = workers["pairs"] >= min_pairs
+    agreement = workers.loc[ranked, "mean_agreement"]
+    if len(agreement):
+        median = agreement.median()
+        deviation = agreement - median
+        mad = deviation.abs().median()
+        if mad > 0:
+            workers.loc[ranked, "robust_z"] = 0.6745 * deviation / mad
+        else:
+            # Over half the workers share the median: fall back to the mean absolute deviation, scaled to
+            # match the standard deviation of a normal distribution (sqrt(pi / 2)); all equal means no outlier
+            mean_ad = deviation.abs().mean()
+            workers.loc[ranked, "robust_z"] = deviation / (1.253314 * mean_ad) if mean_ad > 0 else 0.0
+    workers["outlier"] = workers["robust_z"] < -outlier_z
+
+    columns = ["pairs", "audio_files", "mean_agreement", "median_agreement", "consensus_delta", "robust_z", "outlier"]
+    return workers[columns].sort_values("mean_agreement", kind="stable")
+
+# This method returns the observed disagreement of the whole table: the mean of 1 - similarity over all pairs
+# (the D_o of Krippendorff's alpha with 1 - similarity as the distance)
+def observed_disagreement(pairs):
+    return float((1 - pairs["similarity"]).mean())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-worker agreement and outliers from the pairwise similarity results")
+    parser.add_argument("results", help="results file of inter-transcriber_similarity.py (.csv, .jsonl or .parquet)")
+    parser.add_argument("--min-pairs", type=int, default=DEFAULT_MIN_PAIRS,
+                        help=f"only flag workers with at least this many pairs (default: {DEFAULT_MIN_PAIRS})")
+    parser.add_argument("--outlier-z", type=float, default=DEFAULT_OUTLIER_Z,
+                        help=f"flag workers whose robust z-score is below minus this (default: {DEFAULT_OUTLIER_Z})")
+    parser.add_argument("--output", metavar="PATH", help="also write the per-worker table to this csv file")
+    parser.add_argument("--top", type=int, default=20, help="number of workers to print (default: 20)")
+    args = parser.parse_args()
+
+    pairs = read_pair_scores(args.results)
+    workers = worker_agreement(pairs, args.min_pairs, args.outlier_z)
+    if args.output:
+        workers.to_csv(args.output, index_label="worker")
+
+    print(f"{len(pairs)} pairs, {len(workers)} workers, observed disagreement {observed_disagreement(pairs):.4f}")
+    ranked = workers[workers["robust_z"].notna()]
+    if len(ranked) < len(workers):
+        print(f"{len(workers) - len(ranked)} workers with fewer than {args.min_pairs} pairs are not ranked")
+    print("Lowest agreement first:")
+    print(ranked.head(args.top).to_string(float_format=lambda value: f"{value:.4f}"))
+    outliers = workers.index[workers["outlier"]]
+    print(f"Outliers ({len(outliers)}): {', '.join(outliers) if len(outliers) else 'none'}")
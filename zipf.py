@@ -0,0 +1,153 @@
+# This python file fits Zipf's law to a corpus and plots it
+# The fits only need numpy, matplotlib is imported by plot_zipf alone; both are imported on first use.
+# Every function takes the frequency spectrum of a corpus (CorpusStats.frequency_spectrum()): the
+# distinct frequencies in descending order and the number of types with each frequency
+FIT_METHODS = ("lsq", "mle", "mandelbrot")
+
+
+# This method returns log(rank) for ranks 1..V and the [start, end) rank slice of each frequency
+def _rank_runs(num_types):
+    import numpy as np
+
+    ends = np.cumsum(num_types)
+    starts = ends - num_types
+    log_ranks = np.log(np.arange(1, int(ends[-1]) + 1)) if len(ends) else np.empty(0)
+    return log_ranks, starts, ends
+
+
+# This method fits log(frequency) = c - s * log(rank) by least squares over all V types.
+# Types sharing a frequency occupy a run of ranks, so the sums are taken per run from cumulative sums
+# Returns (s, c)
+def fit_zipf_lsq(frequencies, num_types):
+    import numpy as np
+
+    log_ranks, starts, ends = _rank_runs(num_types)
+    n = len(log_ranks)
+    if n < 2 or len(frequencies) < 2:
+        return float("nan"), float("nan")
+
+    cumulative = np.concatenate(([0.0], np.cumsum(log_ranks)))
+    sum_x = cumulative[-1]
+    sum_xx = np.dot(log_ranks, log_ranks)
+    log_frequencies = np.log(frequencies)
+    sum_y = np.dot(num_types, log_frequencies)
+    sum_xy = np.dot(cumulative[ends] - cumulative[starts], log_frequencies)
+
+    slope = (n * sum_xy - sum_x * sum_y) / (n * sum_xx - sum_x ** 2)
+    intercept = (sum_y - slope * sum_x) / n
+    return float(-slope), float(intercept)
+
+
+# This method fits the exponent s of P(rank) = rank^-s / H(V, s) by maximum likelihood, treating every
+# token as a draw of its word's rank. The log-likelihood is concave in s, so the root of its derivative
+# is found by bisection. Returns (s, log(N / H(V, s))) so the fitted line is on the same scale as lsq
+def fit_zipf_mle(frequencies, num_types, max_exponent=10.0, tolerance=1e-10):
+    import numpy as np
+
+    log_ranks, starts, ends = _rank_runs(num_types)
+    if len(log_ranks) < 2:
+        return float("nan"), float("nan")
+
+    num_tokens = float(np.dot(frequencies, num_types))
+    cumulative = np.concatenate(([0.0], np.cumsum(log_ranks)))
+    # Mean log(rank) of the tokens; the fitted distribution must match it
+    mean_log_rank = np.dot(frequencies, cumulative[ends] - cumulative[starts]) / num_tokens
+
+    # Mean log(rank) under the model, decreasing in s
+    def model_mean_log_rank(s):
+        weights = np.exp(-s * log_ranks)
+        return np.dot(weights, log_ranks) / weights.sum()
+
+    low, high = 0.0, max_exponent
+    while high - low > tolerance:
+        middle = (low + high) / 2
+        if model_mean_log_rank(middle) > mean_log_rank:
+            low = middle
+        else:
+            high = middle
+    s = (low + high) / 2
+    harmonic = np.exp(-s * log_ranks).sum()
+    return float(s), float(np.log(num_tokens / harmonic))
+
+
+# This method fits the exponent s, the Zipf line returned as (s, c) with log(frequency) = c - s * log(rank).
+# "mandelbrot" returns (s, c, b) with log(frequency) = c - s * log(rank + b)
+def fit_zipf(frequencies, num_types, method="lsq"):
+    if method == "lsq":
+        return fit_zipf_lsq(frequencies, num_types)
+    if method == "mle":
+        return fit_zipf_mle(frequencies, num_types)
+    if method == "mandelbrot":
+        s, b, c = fit_zipf_mandelbrot(frequencies, num_types)
+        return s, c, b
+    raise ValueError(f"Unknown Zipf fit method {method!r}, expected one of {FIT_METHODS}")
+
+
+# This method fits the Zipf-Mandelbrot law log(frequency) = c - s * log(rank + b) by least squares.
+# For each offset b on a grid the line is fitted in closed form; the best (s, b, c) is returned
+def fit_zipf_mandelbrot(frequencies, num_types, offsets=None):
+    import numpy as np
+
+    if offsets is None:
+        offsets = np.concatenate(([0.0], np.geomspace(0.01, 100.0, 80)))
+    if int(np.sum(num_types)) < 3 or len(frequencies) < 2:
+        return float("nan"), float("nan"), float("nan")
+
+    ranks = np.arange(1, int(np.sum(num_types)) + 1, dtype=np.float64)
+    log_frequencies = np.repeat(np.log(frequencies), num_types)
+    n = len(ranks)
+    sum_y = log_frequencies.sum()
+
+    best = None
+    for b in offsets:
+        x = np.log(ranks + b)
+        sum_x = x.sum()
+        slope = (n * np.dot(x, log_frequencies) - sum_x * sum_y) / (n * np.dot(x, x) - sum_x ** 2)
+        intercept = (sum_y - slope * sum_x) / n
+        residual = log_frequencies - (intercept + slope * x)
+        error = np.dot(residual, residual)
+        if best is None or error < best[0]:
+            best = (error, float(-slope), float(b), float(intercept))
+    return best[1], best[2], best[3]
+
+
+# This method picks at most max_points ranks spaced evenly in log space and their frequencies,
+# so a vocabulary of any size plots as a readable, quickly drawn set of points
+def decimate_spectrum(frequencies, num_types, max_points=1000):
+    import numpy as np
+
+    ends = np.cumsum(num_types)
+    num_ranks = int(ends[-1]) if len(ends) else 0
+    if num_ranks == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    ranks = np.unique(np.geomspace(1, num_ranks, min(max_points, num_ranks)).round().astype(np.int64))
+    # Rank r has the frequency of the run whose end is the first one >= r
+    return ranks, np.asarray(frequencies)[np.searchsorted(ends, ranks, side="left")]
+
+
+# This method saves a log-log rank/frequency plot to output_path, decimated to max_points points.
+# fit is an optional (s, c) or (s, c, b) curve from fit_zipf drawn over the points
+def plot_zipf(frequencies, num_types, output_path, max_points=1000, fit=None):
+    import matplotlib
+    matplotlib.use("Agg")  # no display needed, only the image file
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    ranks, rank_frequencies = decimate_spectrum(frequencies, num_types, max_points)
+
+    # Log-log plot
+    plt.figure(figsize=(10, 6))
+    plt.loglog(ranks, rank_frequencies, marker='o', linestyle='None')
+    if fit is not None and len(ranks):
+        s, c = fit[:2]
+        b = fit[2] if len(fit) > 2 else 0.0
+        label = f"fit: s = {s:.3f}" + (f", b = {b:.3f}" if len(fit) > 2 else "")
+        plt.loglog(ranks, np.exp(c - s * np.log(ranks + b)), label=label)
+        plt.legend()
+    plt.xlabel('Rank')
+    plt.ylabel('Frequency')
+    plt.title("Zipf's Law")
+    plt.grid(True)
+
+    plt.savefig(output_path)
+    plt.close()